@@ -1,6 +1,19 @@
-import pandas as pd
+import contextlib
+import functools
+import os
+import re
 from datetime import datetime, timedelta
 
+from archive import ReservationArchive
+from changes import ChangeLog, Replica, event_name, row_key
+from lazy_import import LazyImport
+from metrics import REGISTRY, helper, instrument
+from schema import SCHEMAS, append, set_value, stored_records, stored_values
+from storage import CsvStorage, JournalStorage, SqliteStorage
+
+np = LazyImport("numpy")
+pd = LazyImport("pandas")
+
 
 class Room:
     def __init__(self, room_number, status = "Available"):
@@ -97,20 +110,18 @@ class Guest:
 
 
 class Reservation:
-    def __init__(self, name, contact, room_type, reserved_date, day, is_check_in = "un-check-in"):
+    def __init__(self, name, contact, room_type, reserved_date, day, is_check_in = "un-check-in",
+                 reservation_id = None):
         self.name = name
         self.contact = contact
         self.type = room_type
         self.reserved_date = str(reserved_date)
         self.day = day
         self.is_check_in = is_check_in
-        self.reservation_id = datetime.now().strftime("%y%m%d%H%M%S")
-        if room_type == "SingleRoom":
-            self.amount = float(SingleRoom().get_price()) * float(self.day)
-        elif room_type == "DoubleRoom":
-            self.amount = float(DoubleRoom().get_price()) * float(self.day)
-        elif room_type == "LuxuryRoom":
-            self.amount = float(LuxuryRoom().get_price()) * float(self.day)
+        # the id is given by the system when the reservation is added, see new_reservation_ids
+        self.reservation_id = reservation_id
+        # the price is given by the rate table of the system when the reservation is added, see pricing.py
+        self.amount = None
 
     def to_dict(self):
         return {
@@ -126,50 +137,535 @@ class Reservation:
         }
 
 
+def mutation(method):
+    # the operation changes the tables: it runs holding the lock of the data directory, see locked()
+    @functools.wraps(method)
+    def locked_method(self, *args, **kwargs):
+        with self.locked():
+            return method(self, *args, **kwargs)
+    return locked_method
+
+
+@instrument
 class HotelManagementSystem:
     def __init__(self, rooms_file = "rooms.csv", guests_file = "guests.csv", reservations_file = "reservations.csv",
-                 house_keeping_file = "housekeeping_schedule.csv", feedback_file = "feedback.csv"):
+                 house_keeping_file = "housekeeping_schedule.csv", feedback_file = "feedback.csv", journal = False,
+                 cache = False, database = None, columnar = False, rates_file = "rates.csv", member_discount = 0.0,
+                 archive_every = None, change_log = False, waitlist_file = "waitlist.csv"):
         self.rooms_file = rooms_file
         self.guests_file = guests_file
         self.reservations_file = reservations_file
         self.housekeeping_file = house_keeping_file
         self.feedback_file = feedback_file
+        # the orders waiting for a room of their type at check in, see waitlist.py
+        self.waitlist_file = waitlist_file
+        # the nightly rates per room type and date, and the part of the price members do not pay (0.1 is 10%, none
+        # by default: the members pay the same price as the other guests unless a discount is given)
+        self.rates_file = rates_file
+        self.member_discount = member_discount
+        self.table_files = {
+            "rooms": self.rooms_file,
+            "guests": self.guests_file,
+            "reservations": self.reservations_file,
+            "housekeeping_schedule": self.housekeeping_file,
+            "feedback": self.feedback_file,
+            "waitlist": self.waitlist_file
+        }
 
-        # load the data from csv file to dataframe
-        self.rooms = self.load_data(self.rooms_file)
-        self.guests = self.load_data(self.guests_file)
-        self.reservations = self.load_data(self.reservations_file)
-        self.housekeeping_schedule = self.load_data(self.housekeeping_file)
-        self.feedback = self.load_data(self.feedback_file)
-
-    def load_data(self, file_path):
+        # journal mode appends every change to "<file>.journal" instead of rewriting the csv file,
+        # cache keeps the parsed tables in .hms_cache to start faster next time,
+        # columnar keeps reservations, guests and feedback in the memory mapped format of columnar.py
+        cache_dir = ".hms_cache" if cache else None
+        column_files = [self.reservations_file, self.guests_file, self.feedback_file] if columnar else []
+        # the column types of the tables in memory, see schema.py
+        schemas = {self.table_files[table]: schema for table, schema in SCHEMAS.items()}
+        self.storage = JournalStorage(cache_dir=cache_dir, columnar=column_files, schemas=schemas) if journal \
+            else CsvStorage(cache_dir, column_files, schemas)
+        if database is not None:
+            # a sqlite database file instead of the csv files, the csv files are imported the first time
+            self.storage = SqliteStorage(database, schemas)
+        # with autosave off the changes stay in memory until flush(), used by the batch runner
+        self.autosave = True
+        self.unsaved_tables = set()
+        # the version of every loaded table, and the tables changed since the versions were last bumped
+        self.versions = {}
+        self.changed_tables = set()
+        # the rows inserted / updated / deleted by this system, tells batch.py whether a failed operation changed
+        # the tables before it went wrong
+        self.row_changes = 0
+        self.lock_depth = 0
+        # the housekeeping staff working every hour, and the minutes a room type takes (None for the defaults)
+        self.housekeeping_staff = 3
+        self.cleaning_minutes = None
+        # the Checked-out orders are moved to the monthly archive files once there are archive_every of them
+        # in the reservations table (None to keep them in the table, archive_reservations() moves them on demand)
+        self.archive = ReservationArchive(self.reservations_file, SCHEMAS["reservations"])
+        self.archive_every = archive_every
+        # with change_log every change of the rows is an event of the change log in "changes/" next to the data,
+        # for the systems following the hotel (see changes.py). the events wait in pending_events until their
+        # tables are saved
+        self.changes = ChangeLog(os.path.join(os.path.dirname(os.path.abspath(self.rooms_file)), "changes")) \
+            if change_log else None
+        self.pending_events = []
+
+        # the tables are loaded from the csv files the first time they are used, see __getattr__
+
+    def __getattr__(self, name):
+        # only called for the attributes that are not set yet: the tables, their indexes and the calendar
+        table_files = self.__dict__.get("table_files")
+        if table_files is None:
+            raise AttributeError(name)
+        if name in table_files:
+            # load the data from csv file to dataframe, and build the dictionary indexes of the table
+            version = self.storage.version(table_files[name])
+            self.use_table(name, self.load_data(table_files[name]), version)
+            return self.__dict__[name]
+        for table, index_names in TABLE_INDEXES.items():
+            if name in index_names:
+                getattr(self, table)
+                return self.__dict__[name]
+        if name == "calendar":
+            # booked rooms per night and room type, used to refuse overbooked reservations
+            from occupancy import OccupancyCalendar
+            self.calendar = OccupancyCalendar.from_tables(self.rooms, self.reservations)
+            return self.calendar
+        if name == "pricing":
+            # the rate table, the running sums of the nightly rates are made for the dates quoted
+            from pricing import RateTable
+            self.pricing = RateTable.from_csv(self.rates_file, self.member_discount)
+            return self.pricing
+        if name == "housekeeping_plan":
+            # today's cleanings in hour slots, changed in place by the requests and the room status changes
+            from housekeeping import HousekeepingPlan
+            today = datetime.now().strftime("%y-%m-%d")
+            requests = self.housekeeping_schedule
+            if "Date" in requests.columns:
+                requests = requests[requests["Date"] == pd.Timestamp(datetime.now().date())]
+            self.housekeeping_plan = HousekeepingPlan.from_tables(today, self.rooms, requests,
+                                                                  self.housekeeping_staff, self.cleaning_minutes)
+            return self.housekeeping_plan
+        if name == "analytics":
+            # per day totals of the rooms sold, the revenue and the feedback rates, kept up to date by index_rows
+            from analytics import Analytics
+            self.analytics = Analytics.from_tables(self.rooms, self.reservation_history(), self.feedback)
+            return self.analytics
+        if name == "guest_search":
+            # the sorted name and contact keys of the guests for the CRM searches, kept up to date by index_rows
+            from guest_search import GuestSearch
+            self.guest_search = GuestSearch.from_tables(self.guests)
+            return self.guest_search
+        if name == "waitlist_queue":
+            # the Waiting orders of the waitlist in one queue per room type, kept up to date by index_rows
+            from waitlist import Waitlist
+            self.waitlist_queue = Waitlist.from_tables(self.waitlist, self.is_member)
+            return self.waitlist_queue
+        if name == "feedback_index":
+            # the words of the comments and the rating totals per guest, tier and day, kept up to date by index_rows
+            from feedback_index import FeedbackIndex
+            self.feedback_index = FeedbackIndex.from_tables(self.feedback, self.guests)
+            return self.feedback_index
+        if name == "checked_out_count":
+            # the Checked-out orders still in the reservations table, kept up to date by index_rows / unindex_row
+            self.checked_out_count = int((self.reservations["is_check-in"] == "Checked-out").sum())
+            return self.checked_out_count
+        raise AttributeError(f"'HotelManagementSystem' object has no attribute '{name}'")
+
+    @helper
+    def use_table(self, table, data, version):
+        # the table as it was loaded (here, or by a worker process of group.py) at the version, with its indexes
+        self.versions[table] = version
+        setattr(self, table, data)
+        REGISTRY.count(self.table_files[table], rows_loaded=len(data))
+        self.rebuild_indexes(table)
+
+    @helper
+    def stats(self, export_path = None):
+        # the calls, latencies, rows and bytes of the operations and tables of this process (see metrics.py),
+        # written as a prometheus text file too when export_path is given
+        if export_path is not None:
+            REGISTRY.export(export_path)
+        return REGISTRY.snapshot()
+
+    @helper
+    def loaded_tables(self):
+        return [table for table in self.table_files if table in self.__dict__]
+
+    @helper
+    def refresh(self):
+        # forget the tables another process has changed since they were loaded, they are loaded again when used
+        for table in self.loaded_tables():
+            if table in self.unsaved_tables:
+                continue
+            if self.storage.version(self.table_files[table]) != self.versions.get(table):
+                self.forget(table)
+        plan = self.__dict__.get("housekeeping_plan")
+        if plan is not None and plan.day != datetime.now().strftime("%y-%m-%d"):
+            # a new day, a new plan
+            del self.__dict__["housekeeping_plan"]
+
+    @helper
+    def forget(self, table):
+        # drop the table and everything made from it, they are loaded again from the files when used
+        self.__dict__.pop(table, None)
+        for name in TABLE_INDEXES.get(table, ()):
+            self.__dict__.pop(name, None)
+        if table in ("rooms", "reservations"):
+            self.__dict__.pop("calendar", None)
+        if table == "reservations":
+            self.__dict__.pop("checked_out_count", None)
+        if table in ("rooms", "housekeeping_schedule"):
+            self.__dict__.pop("housekeeping_plan", None)
+        if table in ("rooms", "reservations", "feedback"):
+            self.__dict__.pop("analytics", None)
+        if table == "guests":
+            self.__dict__.pop("guest_search", None)
+        if table in ("guests", "waitlist"):
+            self.__dict__.pop("waitlist_queue", None)
+        if table in ("guests", "feedback"):
+            self.__dict__.pop("feedback_index", None)
+
+    def set_housekeeping_staff(self, staff, minutes = None):
+        # change the staff (and the minutes per room type), the plan is made again the next time it is used
+        self.housekeeping_staff = int(staff)
+        self.cleaning_minutes = minutes
+        self.__dict__.pop("housekeeping_plan", None)
+
+    @helper
+    @contextlib.contextmanager
+    def locked(self):
+        # hold the lock of the data directory while changing the tables, so two processes never change the
+        # same data at once. the tables changed by other processes are reloaded first, and the versions of the
+        # tables changed here are bumped with their save. the change events are prepared before the tables are
+        # saved and appended after, an operation stopped in between has its saved events appended by the next one
+        if self.lock_depth:
+            self.lock_depth += 1
+            try:
+                yield
+            finally:
+                self.lock_depth -= 1
+            return
+        saved = False
+        committed = False
+        prepared = None
         try:
-            return pd.read_csv(file_path)
-        except FileNotFoundError:                                                                                       #没找到文件会自动生成一个空的dataframe
-            return pd.DataFrame()
+            with self.storage.lock(self.rooms_file):
+                self.lock_depth = 1
+                try:
+                    self.refresh()
+                    self.recover_changes()
+                    with self.storage.transaction():
+                        yield
+                        versions = {table: self.storage.stage_version(self.table_files[table])
+                                    for table in self.changed_tables - self.unsaved_tables}
+                        if self.pending_events and not self.unsaved_tables:
+                            prepared = self.changes.prepare(self.pending_events, versions)
+                    saved = True
+                    self.versions.update(versions)
+                finally:
+                    self.lock_depth = 0
+                    if prepared or not saved:
+                        # the events are prepared, or the changes are not saved
+                        self.pending_events = []
+                    for table in self.changed_tables - self.unsaved_tables:
+                        if not saved:
+                            # the changes are not saved, the table is loaded again from the file
+                            self.forget(table)
+                        self.changed_tables.discard(table)
+            committed = True
+        finally:
+            # with sqlite the tables are saved when the lock is given back, the events are appended after that.
+            # when saving failed half way, only the events of the tables saved are
+            if prepared:
+                if committed:
+                    self.changes.commit(prepared)
+                else:
+                    self.recover_changes()
+
+    @helper
+    def recover_changes(self):
+        # the events prepared by an operation that stopped before appending them, see ChangeLog.recover
+        if self.changes is not None:
+            self.changes.recover(lambda table: self.storage.version(self.table_files[table]))
+
+    @helper
+    def find(self, table, **conditions):
+        # the rows of the table matching all the conditions (column=value or column=[values]),
+        # searched by the storage when it can, so the table does not have to be loaded
+        if table not in self.__dict__:
+            rows = self.storage.find(self.table_files[table], conditions)
+            if rows is not None:
+                REGISTRY.count(self.table_files[table], rows_scanned=len(rows))
+                return rows
+        data = getattr(self, table)
+        REGISTRY.count(self.table_files[table], rows_scanned=len(data))
+        return matching(data, conditions)
+
+    @helper
+    def load_data(self, file_path):
+        return self.storage.load(file_path)                                                                             #没找到文件会自动生成一个空的dataframe
 
+    @helper
     def save_data(self, file_path, data):
-        data.to_csv(file_path, index=False)
-        with open(file_path, "a") as f:
-            f.flush()
+        self.storage.save(file_path, data)
+
+    @helper
+    def insert_rows(self, table, rows):
+        # append new rows to the table, only the new rows are written in journal mode
+        data = getattr(self, table)
+        start = len(data)
+        data = append(SCHEMAS.get(table), data, rows)
+        setattr(self, table, data)
+        self.index_rows(table, data.iloc[start:])
+        self.record_changes(table, "insert", data.iloc[start:])
+        self.changed_tables.add(table)
+        self.row_changes += len(data) - start
+        REGISTRY.count(self.table_files[table], rows_written=len(data) - start)
+        if self.autosave:
+            self.storage.insert(self.table_files[table], data, start)
+        else:
+            self.unsaved_tables.add(table)
+
+    @helper
+    def update_row(self, table, index, changes):
+        # change some columns of one row of the table
+        data = getattr(self, table)
+        self.unindex_row(table, index)
+        for column, value in changes.items():
+            set_value(SCHEMAS.get(table), data, index, column, value)
+        self.index_rows(table, data.loc[[index]])
+        self.record_changes(table, "update", data.loc[[index]], changes)
+        self.changed_tables.add(table)
+        self.row_changes += 1
+        REGISTRY.count(self.table_files[table], rows_written=1)
+        if self.autosave:
+            self.storage.update(self.table_files[table], data, index, changes)
+        else:
+            self.unsaved_tables.add(table)
 
+    @helper
+    def record_changes(self, table, kind, rows, changes = None):
+        # the events of the rows inserted / updated / deleted, in the text the files have
+        if self.changes is None:
+            return
+        schema = SCHEMAS.get(table)
+        changes = stored_values(schema, changes) if changes else None
+        for row in stored_records(schema, rows):
+            event = {"event": event_name(table, kind, row, changes), "table": table, "kind": kind,
+                     "key": row_key(table, row), "row": row}
+            if changes:
+                event["changes"] = changes
+            self.pending_events.append(event)
+
+    def change_events(self, after = 0, limit = 1000):
+        # the events of the change log numbered after `after`
+        if self.changes is None:
+            return []
+        return self.changes.read(after, limit)
+
+    def replica(self):
+        # a copy of the tables with the number of the last change it has, to keep up to date with sync()
+        if self.changes is None:
+            raise ValueError("The change log is off (change_log=False).")
+        with self.locked():
+            tables = {table: getattr(self, table) for table in self.table_files}
+            return Replica(self.changes, tables, self.changes.last_sequence())
+
+    @mutation
+    def flush(self):
+        # save the tables changed while autosave was off
+        for table in sorted(self.unsaved_tables):
+            self.save_data(self.table_files[table], getattr(self, table))
+        self.unsaved_tables.clear()
+
+    @helper
+    def discard_unsaved(self):
+        # forget the changes made while autosave was off instead of saving them
+        for table in self.unsaved_tables:
+            self.forget(table)
+            self.changed_tables.discard(table)
+        self.unsaved_tables.clear()
+        self.pending_events = []
+
+    @helper
+    def build_indexes(self, tables = None):
+        # the dictionary indexes of the tables (all of them by default), see TABLE_INDEXES
+        tables = TABLE_INDEXES if tables is None else tables
+        indexes = {name: {} for table in tables for name in TABLE_INDEXES.get(table, ())}
+        for table in tables:
+            self.index_rows(table, getattr(self, table), indexes)
+        return indexes
+
+    @helper
+    def rebuild_indexes(self, table = None):
+        for name, index in self.build_indexes(None if table is None else [table]).items():
+            setattr(self, name, index)
+
+    def check_indexes(self, repair = True):
+        # compare the indexes with the ones built from the tables, and rebuild them if they are different.
+        # every index out of sync is listed with the number of keys missing, extra and pointing elsewhere
+        mismatches = []
+        for name, index in self.build_indexes().items():
+            current = getattr(self, name)
+            if current != index:
+                mismatches.append({"index": name, "missing": len(index.keys() - current.keys()),
+                                   "extra": len(current.keys() - index.keys()),
+                                   "different": sum(1 for key in index.keys() & current.keys()
+                                                    if index[key] != current[key])})
+                print(f"index {name} is out of sync with the tables")
+        if mismatches and repair:
+            self.rebuild_indexes()
+        if not mismatches:
+            return outcome(True, "the indexes are in sync with the tables", mismatches=[], repaired=False)
+        message = f"{len(mismatches)} indexes out of sync" + (", rebuilt" if repair else "")
+        return outcome(False, message, mismatches=mismatches, repaired=repair)
+
+    @helper
+    def index_rows(self, table, rows, indexes = None):
+        # add the rows of the table to the indexes
+        if indexes is None:
+            # new or changed rows, the analytics totals follow them (a rebuild of the indexes is not a change)
+            if "analytics" in self.__dict__:
+                self.analytics.add_rows(table, rows)
+            if table == "guests" and "guest_search" in self.__dict__:
+                self.guest_search.add_rows(rows)
+            if "waitlist_queue" in self.__dict__:
+                if table == "waitlist":
+                    self.waitlist_queue.add_rows(rows, self.is_member)
+                elif table == "guests" and "membership" in rows.columns:
+                    for name, contact, member in zip(rows["name"], rows["contact"], rows["membership"]):
+                        self.waitlist_queue.set_member(guest_key(name, contact), bool(member))
+            if "feedback_index" in self.__dict__:
+                if table == "feedback":
+                    self.feedback_index.add_rows(rows, self.is_member)
+                elif table == "guests" and "membership" in rows.columns:
+                    for name, contact, member in zip(rows["name"], rows["contact"], rows["membership"]):
+                        self.feedback_index.set_member(guest_key(name, contact), bool(member))
+            if table == "reservations" and "checked_out_count" in self.__dict__:
+                self.checked_out_count += int((rows["is_check-in"] == "Checked-out").sum())
+            indexes = {name: getattr(self, name) for name in TABLE_INDEXES.get(table, ())}
+        if table == "rooms" and "Room Number" in rows.columns:
+            for index, number, room_type, status in zip(rows.index, rows["Room Number"], rows["Room Type"],
+                                                        rows["Status"]):
+                indexes["room_index"][str(number)] = index
+                if status == "Available":
+                    indexes["available_rooms"].setdefault(room_type, {})[str(number)] = index
+            if "housekeeping_plan" in self.__dict__:
+                for number, room_type, status in zip(rows["Room Number"], rows["Room Type"], rows["Status"]):
+                    self.housekeeping_plan.set_room(str(number), room_type, status)
+        elif table == "guests" and "name" in rows.columns:
+            keys = zip(rows["name"].astype(str).str.strip(), rows["contact"].astype(str).str.strip())
+            indexes["guest_index"].update(zip(keys, rows.index))
+        elif table == "reservations" and "reservation_id" in rows.columns:
+            indexes["reservation_index"].update(zip(rows["reservation_id"].astype(str), rows.index))
+            # only the un-check-in and Checked-in orders are in the other indexes
+            active = rows[rows["is_check-in"].isin(["un-check-in", "Checked-in"])]
+            for index, name, contact, number, status in zip(active.index, active["guest_name"], active["contact"],
+                                                            active["room_number"], active["is_check-in"]):
+                indexes["guest_reservations"].setdefault(guest_key(name, contact), {})[index] = str(number)
+                if status == "Checked-in":
+                    indexes["room_reservation"][str(number)] = index
+
+    @helper
+    def unindex_row(self, table, index):
+        row = getattr(self, table).loc[index]
+        if "analytics" in self.__dict__:
+            self.analytics.add_rows(table, getattr(self, table).loc[[index]], -1)
+        if table == "guests" and "guest_search" in self.__dict__:
+            self.guest_search.add_rows(getattr(self, table).loc[[index]], -1)
+        if table == "waitlist" and "waitlist_queue" in self.__dict__:
+            self.waitlist_queue.add_rows(getattr(self, table).loc[[index]], self.is_member, -1)
+        if table == "feedback" and "feedback_index" in self.__dict__:
+            self.feedback_index.add_rows(getattr(self, table).loc[[index]], self.is_member, -1)
+        if table == "reservations" and "checked_out_count" in self.__dict__:
+            self.checked_out_count -= int(row["is_check-in"] == "Checked-out")
+        if table == "rooms":
+            number = str(row["Room Number"])
+            self.available_rooms.get(row["Room Type"], {}).pop(number, None)
+            if self.room_index.get(number) == index:
+                del self.room_index[number]
+        elif table == "guests":
+            key = guest_key(row["name"], row["contact"])
+            if self.guest_index.get(key) == index:
+                del self.guest_index[key]
+        elif table == "reservations":
+            reserve_id = str(row["reservation_id"])
+            if self.reservation_index.get(reserve_id) == index:
+                del self.reservation_index[reserve_id]
+            key = guest_key(row["guest_name"], row["contact"])
+            orders = self.guest_reservations.get(key, {})
+            orders.pop(index, None)
+            if not orders:
+                self.guest_reservations.pop(key, None)
+            number = str(row["room_number"])
+            if self.room_reservation.get(number) == index:
+                del self.room_reservation[number]
+
+    @helper
+    def rows_from(self, table, source, defaults):
+        # the rows to add in bulk as a dataframe, from a csv file, a dataframe or a list of objects / dicts
+        if isinstance(source, str):
+            rows = pd.read_csv(source)
+        elif isinstance(source, pd.DataFrame):
+            rows = source.copy()
+        else:
+            rows = pd.DataFrame([item.to_dict() if hasattr(item, "to_dict") else dict(item) for item in source])
+        for column, value in defaults.items():
+            rows[column] = rows[column].fillna(value) if column in rows.columns else value
+        columns = getattr(self, table).columns
+        if len(columns):
+            rows = rows.reindex(columns=columns)
+        return rows.reset_index(drop=True)
+
+    @helper
+    def bulk_report(self, rows, result, what):
+        # add the accept / reject result of every row and print a summary
+        report = rows.copy()
+        report["result"] = result
+        added = int((result == "added").sum())
+        print(f"{added} {what} added, {len(result) - added} rejected")
+        return report
+
+    def compact(self, background = False):
+        # fold the journals back into the csv files
+        for table in self.loaded_tables():
+            self.storage.compact(self.table_files[table], getattr(self, table), background)
+
+    @mutation
     def add_room(self, room):
         room_number = room.get_room_number()
         room_type = room.get_room_type()
 
-        if not self.rooms[
-            (self.rooms["Room Number"] == room_number) & (self.rooms["Room Type"] == room_type)
-        ].empty:
+        room_index = self.room_index.get(str(room_number))
+        if room_index is not None and self.rooms.loc[room_index, "Room Type"] == room_type:
             print(f"room {room_number} has been exist")
+            return outcome(False, f"room {room_number} has been exist")
         else:
 
-            new_room = pd.DataFrame([room.to_dict()])
-            self.rooms = pd.concat([self.rooms, new_room], ignore_index=True)
-            self.save_data(self.rooms_file, self.rooms)
+            self.insert_rows("rooms", [room.to_dict()])
+            if "calendar" in self.__dict__:
+                self.calendar.add_room(room_type)
             print(f"room {room_number} added successfully")
+            return outcome(True, f"room {room_number} added successfully", room_number=room_number)
+
+    @mutation
+    def add_rooms(self, rooms):
+        # add many rooms with one concat and one save, return every row with its result
+        new_rooms = self.rows_from("rooms", rooms, {"Status": "Available"})
+        keys = pd.MultiIndex.from_frame(new_rooms[["Room Number", "Room Type"]].astype(str))
+        existing = pd.MultiIndex.from_frame(self.rooms[["Room Number", "Room Type"]].astype(str))
+        result = pd.Series("added", index=new_rooms.index)
+        result[keys.isin(existing) | keys.duplicated()] = "exist"
+        accepted = new_rooms[result == "added"]
+        if not accepted.empty:
+            self.insert_rows("rooms", accepted)
+            if "calendar" in self.__dict__:
+                for room_type, count in accepted["Room Type"].value_counts().items():
+                    self.calendar.add_room(room_type, count)
+        return self.bulk_report(new_rooms, result, "rooms")
 
     def get_available_rooms(self):
-        available_rooms = self.rooms[self.rooms["Status"] == "Available"]
+        self.refresh()
+        available_rooms = self.find("rooms", Status="Available")
         available_sroom = available_rooms[available_rooms["Room Type"] == "SingleRoom"]
         print(f"{available_sroom.size} Available Single Room")
         available_droom = available_rooms[available_rooms["Room Type"] == "DoubleRoom"]
@@ -179,19 +675,129 @@ class HotelManagementSystem:
         print("available room list：")
         print(available_rooms.to_string(index=False))
 
+    def availability(self, room_type, start, nights = 1):
+        # number of rooms of the type free for all the nights from start (YYYYMMDD)
+        return self.calendar.availability(room_type, start, nights)
+
+    @mutation
     def add_reservation(self, order):
+        # refuse the reservation when the room type is fully booked for one of the nights
+        if self.availability(order.type, order.reserved_date, order.day) <= 0:
+            message = (f"Sorry {order.name}, there is no {order.type} available for {order.day} night(s) "
+                       f"from {order.reserved_date}.")
+            print(message)
+            return outcome(False, message)
+
+        order.amount = self.quote(order.type, order.reserved_date, order.day, order.name, order.contact)
+        if order.amount is None:
+            print(f"Sorry {order.name}, there is no rate for {order.type} on {order.reserved_date}.")
+            return outcome(False, f"Sorry {order.name}, there is no rate for {order.type} on {order.reserved_date}.")
+        if order.reservation_id is None:
+            order.reservation_id = self.new_reservation_ids()[0]
+        elif str(order.reservation_id).strip() in self.reservation_index:
+            print(f"Reservation {order.reservation_id} already exists.")
+            return outcome(False, f"Reservation {order.reservation_id} already exists.")
+
         # add reservation
-        new_reservation = pd.DataFrame([order.to_dict()])
-        self.reservations = pd.concat([self.reservations, new_reservation], ignore_index=True)
-        self.save_data(self.reservations_file, self.reservations)
+        self.insert_rows("reservations", [order.to_dict()])
+        self.calendar.book(len(self.reservations) - 1, order.type, order.reserved_date, order.day)
 
         # Print Reservation Info
         checkin_date = datetime.strptime(order.reserved_date, "%Y%m%d")
         days_to_add = order.day
         checkout_date = checkin_date + timedelta(days=days_to_add)
-        print(f"Dear {order.name}, Your reservation of one {order.type} from {checkin_date.strftime('%Y-%m-%d')} "
-              f"to {checkout_date.strftime('%Y-%m-%d')} is received!"
-              f"\nOrder Number: {order.reservation_id}")
+        message = (f"Dear {order.name}, Your reservation of one {order.type} from {checkin_date.strftime('%Y-%m-%d')} "
+                   f"to {checkout_date.strftime('%Y-%m-%d')} is received!"
+                   f"\nOrder Number: {order.reservation_id}")
+        print(message)
+        return outcome(True, message, reservation_id=order.reservation_id, order_amount=order.amount)
+
+    @mutation
+    def add_reservations(self, orders):
+        # add many reservations with one concat and one save, every order is checked against the calendar in turn
+        new_orders = self.rows_from("reservations", orders, {"room_number": "Un-Arrange",
+                                                             "is_check-in": "un-check-in"})
+        # the orders without a reservation_id get new ids, in one block
+        missing = new_orders["reservation_id"].isna()
+        if missing.any():
+            ids = new_orders["reservation_id"]
+            new_orders["reservation_id"] = (ids.astype("Int64") if ids.dtype.kind == "f" else ids).astype(object)
+            new_orders.loc[missing, "reservation_id"] = self.new_reservation_ids(int(missing.sum()))
+            with contextlib.suppress(ValueError, TypeError):
+                new_orders["reservation_id"] = new_orders["reservation_id"].astype("int64")
+        # the orders without an order_amount are priced with the rate table
+        unpriced = new_orders["order_amount"].isna()
+        if unpriced.any():
+            new_orders.loc[unpriced, "order_amount"] = self.reprice(new_orders[unpriced])
+        reserve_ids = new_orders["reservation_id"].astype(str).str.strip()
+        result = pd.Series("added", index=new_orders.index)
+        result[reserve_ids.isin(list(self.reservation_index)) | reserve_ids.duplicated()] = "duplicate"
+        from occupancy import to_nights
+        nights = to_nights(new_orders["reserved_date"])
+        active = new_orders["is_check-in"].isin(["un-check-in", "Checked-in"])
+        result = result.tolist()
+        row = len(self.reservations)
+        for i, (room_type, night, day, is_active) in enumerate(zip(new_orders["room_type"], nights,
+                                                                   new_orders["day"], active)):
+            if result[i] != "added":
+                continue
+            if is_active:
+                if np.isnat(night):
+                    result[i] = "invalid date"
+                    continue
+                if self.calendar.availability(room_type, night, int(day)) <= 0:
+                    result[i] = "fully booked"
+                    continue
+                self.calendar.book(row, room_type, night, int(day))
+            row += 1
+        result = pd.Series(result, index=new_orders.index)
+        accepted = new_orders[result == "added"]
+        if not accepted.empty:
+            self.insert_rows("reservations", accepted)
+        return self.bulk_report(new_orders, result, "reservations")
+
+    @helper
+    def is_member(self, name, contact):
+        guest_index = self.guest_index.get(guest_key(name, contact))
+        return guest_index is not None and bool(self.guests.loc[guest_index, "membership"])
+
+    def quote(self, room_type, start, nights, name = None, contact = None):
+        # the price of a stay from start (YYYYMMDD), with the member discount when the guest is a member
+        member = name is not None and self.is_member(name, contact)
+        return self.pricing.quote(room_type, start, nights, member)
+
+    def reprice(self, orders = None):
+        # the price of every order of the dataframe (all the reservations by default) with the current rates,
+        # NaN when there is no rate. nothing is saved, the orders keep their order_amount
+        orders = self.reservations if orders is None else orders
+        members = pd.Series(False, index=orders.index)
+        if len(self.guests):
+            member_keys = [key for key, index in self.guest_index.items() if self.guests.loc[index, "membership"]]
+            keys = pd.MultiIndex.from_arrays([orders["guest_name"].astype(str).str.strip(),
+                                              orders["contact"].astype(str).str.strip()])
+            members = keys.isin(member_keys) if member_keys else members.to_numpy()
+        amounts = self.pricing.quote_many(orders["room_type"], orders["reserved_date"], orders["day"], members)
+        return pd.Series(amounts, index=orders.index, name="order_amount")
+
+    @helper
+    def new_reservation_ids(self, count = 1):
+        # ids never used before by any process: the creation time yymmddHHMMSS followed by a 4 digit sequence
+        return self.storage.allocate_ids(self.reservations_file, count)
+
+    def reserve(self, client_name, client_contact, room_type, reserved_date, days):
+        # make a reservation without asking anything, the same checks as make_reservation
+        if room_type not in ROOM_TYPES:
+            return outcome(False, f"Unknown room type {room_type}.")
+        try:
+            valid_date = datetime.strptime(str(reserved_date), "%Y%m%d")
+        except ValueError:
+            return outcome(False, "Invalid date format! Please enter the date in YYYYMMDD format.")
+        if valid_date <= datetime.now():
+            return outcome(False, "The reservation date must be in the future.")
+        if int(days) <= 0:
+            return outcome(False, "The number of days must be greater than 0.")
+        return self.add_reservation(Reservation(client_name, int(client_contact), room_type, int(reserved_date),
+                                                int(days)))
 
     def make_reservation(self, client_name, client_contact):
         # client_name = input("Please Enter Your Name >> ")
@@ -238,31 +844,107 @@ class HotelManagementSystem:
                 print("Invalid input! Please enter a positive integer.")
 
         # establish and save reservation in the list.
-        self.add_reservation(Reservation(client_name, int(client_contact), room_type, int(reserved_date), int(days)))
+        return self.reserve(client_name, client_contact, room_type, reserved_date, days)
 
         # save client info
         # reserving_guest = Guest(client_name, client_contact)
         # self.add_guest(reserving_guest)
 
 
-    def view_reservations(self):
+    def view_reservations(self, status = None, start = None, end = None):
+        # all the reservations, or only the un-check-in / Checked-in / Checked-out ones, reserved from start to end
+        # (YYYYMMDD). the archived orders are Checked-out, only the months of the dates are read for them
+        try:
+            if status in (None, "Checked-out"):
+                conditions = {} if status is None else {"is_check-in": status}
+                reservations = self.reservation_history(start, end, **conditions)
+            else:
+                reservations = self.reservation_history(start, end, archived=False, **{"is_check-in": status})
+        except ValueError as error:
+            print(error)
+            return self.reservations.iloc[:0]
         print("\ncurrent list：")
-        print(self.reservations.to_string(index=False))
+        print(reservations.to_string(index=False))
+        return reservations
+
+    def reservation_history(self, start = None, end = None, archived = True, **conditions):
+        # the reservations matching the conditions (column=value), in the table and in the archive, reserved from
+        # start to end (YYYYMMDD, both included, no limit when None)
+        from occupancy import to_night, to_nights
+        first, last = [None if value is None else to_night(value) for value in (start, end)]
+        if start is not None and first is None or end is not None and last is None:
+            raise ValueError("Invalid date format! Please enter the date in YYYYMMDD format.")
+        parts = [matching(part, conditions) for part in self.archive.read(start, end)] if archived else []
+        parts.append(self.find("reservations", **conditions))
+        history = parts[0]
+        for part in parts[1:]:
+            history = append(SCHEMAS["reservations"], history, part)
+        if len(parts) > 1:
+            # an order archived but still in the table (the table was not saved after archiving) is the table's row
+            history = history.drop_duplicates("reservation_id", keep="last").reset_index(drop=True)
+        if start is not None or end is not None:
+            nights = to_nights(history["reserved_date"])
+            keep = ~np.isnat(nights)
+            if first is not None:
+                keep &= nights >= first
+            if last is not None:
+                keep &= nights <= last
+            history = history[keep]
+        return history
+
+    @mutation
+    def archive_reservations(self, before = None):
+        # move the Checked-out orders (only the ones reserved before the date YYYYMMDD, when given) to the archive
+        from occupancy import to_night, to_nights
+        done = self.reservations["is_check-in"] == "Checked-out"
+        if before is not None:
+            if to_night(before) is None:
+                print("Invalid date format! Please enter the date in YYYYMMDD format.")
+                return outcome(False, "Invalid date format! Please enter the date in YYYYMMDD format.")
+            done &= to_nights(self.reservations["reserved_date"]) < to_night(before)
+        if not done.any():
+            return outcome(True, "0 reservations archived", archived=0)
+        # the archive first: after a crash before the table is saved the orders are in both, reservation_history
+        # keeps the table's row and the next archiving replaces the archived copy, so no order is lost or doubled
+        months = self.archive.add(self.reservations[done])
+        self.record_changes("reservations", "delete", self.reservations[done])
+        self.reservations = self.reservations[~done].reset_index(drop=True)
+        # the rows have new positions, the indexes and the calendar are made again
+        self.rebuild_indexes("reservations")
+        self.__dict__.pop("calendar", None)
+        if "checked_out_count" in self.__dict__:
+            self.checked_out_count -= int(done.sum())
+        self.changed_tables.add("reservations")
+        self.row_changes += int(done.sum())
+        if self.autosave:
+            # saved whole with the other changes of the transaction, the changes of the rows waiting in it have
+            # the old positions
+            self.storage.replace(self.reservations_file, self.reservations)
+        else:
+            self.unsaved_tables.add("reservations")
+        message = f"{int(done.sum())} reservations archived in {', '.join(months)}"
+        print(message)
+        return outcome(True, message, archived=int(done.sum()), months=sorted(months))
 
+    @mutation
     def room_status_modify(self, room_number):
         # locate the Index of Modifying Room
-        room_index = self.rooms[self.rooms["Room Number"] == room_number].index
-        if not room_index.empty:
+        room_index = self.room_index.get(str(room_number))
+        if room_index is not None:
             # obtain the current status of the room
-            current_status = self.rooms.loc[room_index, "Status"].iloc[0]
+            current_status = self.rooms.loc[room_index, "Status"]
             # switch room status
             new_status = "Occupied" if current_status == "Available" else "Available"
-            # update info
-            self.rooms.loc[room_index, "Status"] = new_status
-            self.save_data(self.rooms_file, self.rooms)  # 保存到文件
-            print(f"room {room_number}'s status is modify from' {current_status} to  {new_status}。")
+            # update info, a room Available again goes to the first order on the waitlist in the same transaction
+            with self.storage.transaction():
+                self.update_row("rooms", room_index, {"Status": new_status})  # 保存到文件
+                print(f"room {room_number}'s status is modify from' {current_status} to  {new_status}。")
+                assigned = self.assign_waiting(str(room_number)) if new_status == "Available" else None
+            return outcome(True, f"room {room_number} is {new_status}", room_number=room_number, status=new_status,
+                           assigned=assigned)
         else:
             print(f"can't find the room {room_number}，can't update the status。")
+            return outcome(False, f"can't find the room {room_number}")
 
     def check_in(self):
         while True:
@@ -270,218 +952,528 @@ class HotelManagementSystem:
             reserve_id = input("Enter the reservation_id >> ")
             if validate_text(reserve_id, "back"):
                 return
-            else:
-                order_index = self.reservations[
-                    (self.reservations["reservation_id"] == int(reserve_id)) &
-                    (self.reservations["is_check-in"] == "un-check-in")
-                    ].index
-                if not order_index.empty:
-                    room_type = str(self.reservations.loc[order_index, "room_type"].iloc[0])
-                    available_rooms = self.rooms[
-                        (self.rooms["Status"] == "Available") &
-                        (self.rooms["Room Type"] == room_type)
-                        ]
-                    if not available_rooms.empty:
-                        # 获取第一间可用房间的房号
-                        room_number_arranged = available_rooms.iloc[0]["Room Number"]
-                        print(f"System Automatically arranged the Room[{room_number_arranged}] for this order")
-
-                        # update the reservation list
-                        self.reservations.loc[order_index, "room_number"] = room_number_arranged
-                        self.reservations.loc[order_index, "is_check-in"] = "Checked-in"
-                        self.save_data(self.reservations_file, self.reservations)
-
-                        # update the rooms list
-                        self.room_status_modify(room_number_arranged)
-                        return
-                    else:
-                        print(f"No available rooms for {room_type}.")
-                else:
-                    print("Unfound Valid Reservation.")
-                    return self.check_in()
+            result = self.check_in_order(reserve_id)
+            if result["ok"] or result.get("position"):
+                # checked in, or waiting for a room
+                return
+
+    @mutation
+    def check_in_order(self, reserve_id, wait = True):
+        # check in the un-check-in order and arrange the first available room of its type.
+        # without one the order joins the waitlist (when wait), and gets the next room of its type set Available
+        order_index = self.reservation_index.get(str(reserve_id).strip())
+        if order_index is None or self.reservations.loc[order_index, "is_check-in"] != "un-check-in":
+            print("Unfound Valid Reservation.")
+            return outcome(False, "Unfound Valid Reservation.")
+        room_type = str(self.reservations.loc[order_index, "room_type"])
+        available_rooms = self.available_rooms.get(room_type)
+        if not available_rooms:
+            if wait:
+                return self.join_waitlist(order_index)
+            print(f"No available rooms for {room_type}.")
+            return outcome(False, f"No available rooms for {room_type}.")
+
+        # 获取第一间可用房间的房号
+        room_number_arranged = next(iter(available_rooms))
+        print(f"System Automatically arranged the Room[{room_number_arranged}] for this order")
+
+        # the reservation and the room are saved in one transaction
+        with self.storage.transaction():
+            # update the reservation list
+            self.update_row("reservations", order_index,
+                            {"room_number": room_number_arranged, "is_check-in": "Checked-in"})
+            self.calendar.check_in(order_index)
+            self.leave_waitlist(reserve_id, "Assigned", room_number_arranged)
+
+            # update the rooms list
+            self.room_status_modify(room_number_arranged)
+        return outcome(True, f"Room[{room_number_arranged}] is arranged for this order", reservation_id=reserve_id,
+                       room_number=room_number_arranged)
+
+    @mutation
+    def check_in_arrivals(self, date = None, wait = True):
+        # check in all the un-check-in orders arriving on the date (YYYYMMDD, today by default) at once.
+        # the orders on the waitlist get the available rooms of their type first, in the order of the waitlist.
+        # then the longest stays get a room first, in the order of the room numbers, when the occupancy calendar
+        # has a room of the type for every night of the stay (else the guest would have to move during the stay).
+        # the arrivals without a room join the waitlist (when wait). all the changes are saved together
+        from occupancy import to_night, to_nights
+        day = to_night(date if date is not None else datetime.now().strftime("%Y%m%d"))
+        if day is None:
+            print("Invalid date format! Please enter the date in YYYYMMDD format.")
+            return outcome(False, "Invalid date format! Please enter the date in YYYYMMDD format.")
+
+        with self.storage.transaction():
+            waited = []
+            for room_type, rooms in list(self.available_rooms.items()):
+                for number in sorted(rooms, key=room_order)[:self.waitlist_queue.count(room_type)]:
+                    entry = self.assign_waiting(number)
+                    if entry is None:
+                        break
+                    waited.append(entry)
+
+            waiting = self.reservations[self.reservations["is_check-in"] == "un-check-in"]
+            arriving = waiting[to_nights(waiting["reserved_date"]) == day]
+            free = {room_type: sorted(rooms, key=room_order, reverse=True)
+                    for room_type, rooms in self.available_rooms.items()}
+            assigned = []
+            unassigned = []
+            for index in arriving["day"].astype(int).sort_values(ascending=False, kind="stable").index:
+                order = self.reservations.loc[index]
+                rooms = free.get(order["room_type"], [])
+                if rooms and not self.calendar.overbooked(order["room_type"], day, int(order["day"])):
+                    assigned.append((index, rooms.pop()))
+                    continue
+                reason = "no available room" if not rooms else "no room free for the whole stay"
+                unassigned.append({"reservation_id": order["reservation_id"], "guest_name": order["guest_name"],
+                                   "room_type": order["room_type"], "reason": reason})
+                if wait and not rooms:
+                    unassigned[-1]["position"] = self.join_waitlist(index)["position"]
+
+            for index, number in assigned:
+                self.update_row("reservations", index, {"room_number": number, "is_check-in": "Checked-in"})
+                self.calendar.check_in(index, day)
+                self.update_row("rooms", self.room_index[number], {"Status": "Occupied"})
+                self.leave_waitlist(self.reservations.loc[index, "reservation_id"], "Assigned", number)
+        assignments = [{"reservation_id": self.reservations.loc[index, "reservation_id"],
+                        "guest_name": self.reservations.loc[index, "guest_name"], "room_number": number}
+                       for index, number in assigned]
+        message = f"{len(assignments)} arrivals checked in, {len(unassigned)} without a room"
+        if waited:
+            message += f", {len(waited)} orders of the waitlist checked in"
+        print(message)
+        return outcome(True, message, assignments=assignments, unassigned=unassigned, waitlist=waited)
 
     def check_out(self):
         while True:
             # check out with the room number
             room_to_checkout = input("Enter the Room Number >> ")
-            if not validate_text(room_to_checkout, "back"):
-                reserve_index = self.reservations[
-                    (self.reservations["room_number"] == room_to_checkout) &
-                    (self.reservations["is_check-in"] == "Checked-in")
-                    ].index
-                if not reserve_index.empty:
-                    room_index = self.rooms[self.rooms["Room Number"] == room_to_checkout].index
-                    # print(reserve_index, room_index)
-                    order_amount = float(self.reservations.loc[reserve_index, "order_amount"].iloc[0])
-                    print(f"The Amount for this order is ${order_amount}\n")
-
-                    # update the reservation list
-                    self.reservations.loc[reserve_index, "is_check-in"] = "Checked-out"
-                    self.save_data(self.reservations_file, self.reservations)
-
-                    # update the room list
-                    self.rooms.loc[room_index, "Status"] = "Available"
-                    self.save_data(self.rooms_file, self.rooms)
-                    break
-                else:
-                    print("Not a valid Room Number to check out! ")
-                    return self.check_out()
-            else:
+            if validate_text(room_to_checkout, "back"):
+                return
+            elif self.check_out_room(room_to_checkout)["ok"]:
                 return
 
+    @mutation
+    def check_out_room(self, room_to_checkout):
+        room_to_checkout = str(room_to_checkout).strip()
+        reserve_index = self.room_reservation.get(room_to_checkout)
+        if reserve_index is None:
+            print("Not a valid Room Number to check out! ")
+            return outcome(False, "Not a valid Room Number to check out!")
+        room_index = self.room_index[room_to_checkout]
+        # print(reserve_index, room_index)
+        order_amount = float(self.reservations.loc[reserve_index, "order_amount"])
+        print(f"The Amount for this order is ${order_amount}\n")
+
+        with self.storage.transaction():
+            # update the reservation list
+            self.update_row("reservations", reserve_index, {"is_check-in": "Checked-out"})
+            self.calendar.check_out(reserve_index)
+
+            # update the room list, the first order on the waitlist for its type gets it at once
+            self.update_row("rooms", room_index, {"Status": "Available"})
+            assigned = self.assign_waiting(room_to_checkout)
+            # the orders archived leave the table in the same transaction as the check out
+            if self.archive_every and self.checked_out_count >= self.archive_every:
+                self.archive_reservations()
+        return outcome(True, f"The Amount for this order is ${order_amount}", room_number=room_to_checkout,
+                       order_amount=order_amount, assigned=assigned)
+
+    @helper
+    def join_waitlist(self, order_index):
+        # the un-check-in order waits for a room of its type: members first, then the earliest check in dates,
+        # then the ones waiting the longest
+        order = self.reservations.loc[order_index]
+        reserve_id = str(order["reservation_id"])
+        if reserve_id not in self.waitlist_queue:
+            self.insert_rows("waitlist", [{
+                "reservation_id": order["reservation_id"], "guest_name": order["guest_name"],
+                "contact": order["contact"], "room_type": order["room_type"],
+                "reserved_date": order["reserved_date"], "joined": datetime.now().isoformat(timespec="microseconds"), "status": "Waiting",
+                "room_number": "Un-Arrange"}])
+        position = self.waitlist_queue.position(reserve_id)
+        message = f"No available rooms for {order['room_type']}, the order is number {position} on the waitlist."
+        print(message)
+        return outcome(False, message, reservation_id=reserve_id, position=position)
+
+    @helper
+    def leave_waitlist(self, reserve_id, status = "Left", room_number = None):
+        # take the order out of the waitlist, the row keeps what happened to it
+        if str(reserve_id).strip() not in self.waitlist_queue:
+            return False
+        row = self.waitlist_queue.entries[str(reserve_id).strip()][3]
+        changes = {"status": status}
+        if room_number is not None:
+            changes["room_number"] = room_number
+        self.update_row("waitlist", row, changes)
+        return True
+
+    @mutation
+    def cancel_waiting(self, reserve_id):
+        if not self.leave_waitlist(reserve_id):
+            print(f"The order {reserve_id} is not on the waitlist.")
+            return outcome(False, f"The order {reserve_id} is not on the waitlist.")
+        print(f"The order {reserve_id} has left the waitlist.")
+        return outcome(True, f"The order {reserve_id} has left the waitlist.", reservation_id=str(reserve_id))
+
+    @helper
+    def assign_waiting(self, room_number):
+        # check the first order waiting for the type of the Available room in to it, in the transaction of the
+        # caller. returns the order checked in, None when nobody is waiting
+        room_index = self.room_index[room_number]
+        room_type = str(self.rooms.loc[room_index, "Room Type"])
+        while True:
+            entry = self.waitlist_queue.pop(room_type)
+            if entry is None:
+                return None
+            order_index = self.reservation_index.get(entry[4])
+            if order_index is not None and self.reservations.loc[order_index, "is_check-in"] == "un-check-in":
+                break
+            # checked in another way, or not a reservation any more
+            self.update_row("waitlist", entry[3], {"status": "Left"})
+        # the waitlist first: when a later change fails, the waitlist is loaded again with the order in it
+        self.update_row("waitlist", entry[3], {"status": "Assigned", "room_number": room_number})
+        self.update_row("reservations", order_index, {"room_number": room_number, "is_check-in": "Checked-in"})
+        self.calendar.check_in(order_index)
+        self.update_row("rooms", room_index, {"Status": "Occupied"})
+        guest_name = self.reservations.loc[order_index, "guest_name"]
+        print(f"System Automatically arranged the Room[{room_number}] for the waiting order {entry[4]} of {guest_name}")
+        return {"reservation_id": entry[4], "guest_name": guest_name, "room_number": room_number}
+
+    def view_waitlist(self, room_type = None):
+        # the orders waiting for a room (of the type), in the order they will get one
+        table = self.waitlist_queue.table(room_type)
+        if table.empty:
+            print("Nobody is waiting for a room.")
+        else:
+            print(table.to_string(index=False))
+        return table
+
+    @mutation
     def add_guest(self, guest):
         name = guest.get_name()
         contact = guest.get_contact()
         # check if the guest exist
-        existing_guest = self.guests[
-            (self.guests["name"] == name) &
-            (self.guests["contact"].astype(str) == str(contact))
-            ]
-
-        if not existing_guest.empty:
+        if guest_key(name, contact) in self.guest_index:
             print(f"\n The customer {name} has been exist in the list 。")
-            return
+            return outcome(False, f"The customer {name} has been exist in the list.")
 
         # add guest to dataset
-        new_guest = pd.DataFrame([guest.to_dict()])
-        self.guests = pd.concat([self.guests, new_guest], ignore_index=True)
-        self.save_data(self.guests_file, self.guests)
+        self.insert_rows("guests", [guest.to_dict()])
         print(f"\nCustom {name} is added successfully！")
-
+        return outcome(True, f"Custom {name} is added successfully!")
+
+    @mutation
+    def add_guests(self, guests):
+        # add many guests with one concat and one save, return every row with its result
+        new_guests = self.rows_from("guests", guests, {"membership": False})
+        keys = pd.Series([guest_key(name, contact) for name, contact in zip(new_guests["name"],
+                                                                            new_guests["contact"])])
+        result = pd.Series("added", index=new_guests.index)
+        result[keys.isin(self.guest_index.keys()) | keys.duplicated()] = "exist"
+        accepted = new_guests[result == "added"]
+        if not accepted.empty:
+            self.insert_rows("guests", accepted)
+        return self.bulk_report(new_guests, result, "guests")
+
+    @mutation
     def register_to_member(self, name, contact):
         # locate the Index of Modifying Room
-        self.guests = self.load_data(self.guests_file)
-        guest_index = self.guests[
-            (self.guests["name"] == name) &
-            (self.guests["contact"] == int(contact))].index
+        guest_index = self.guest_index.get(guest_key(name, contact))
 
-        if not guest_index.empty:  # check if the guest is a member.
-            current_status = self.guests.loc[guest_index, "membership"].iloc[0]
+        if guest_index is not None:  # check if the guest is a member.
+            current_status = self.guests.loc[guest_index, "membership"]
             if current_status:
                 print(f"Dear {name} is already a member, there is no need to apply again.")
+                return outcome(False, f"Dear {name} is already a member, there is no need to apply again.")
             else:
                 # switch the status
                 new_status = True
                 # undate information
-                self.guests.loc[guest_index, "membership"] = new_status
-                self.save_data(self.guests_file, self.guests)  # 保存到文件
+                self.update_row("guests", guest_index, {"membership": new_status})  # 保存到文件
                 print(f"Customer {name} has been upgraded to membership.")
+                return outcome(True, f"Customer {name} has been upgraded to membership.")
         else:
             print(f"Unfound Guest {name}, unable to modify membership.")
+            return outcome(False, f"Unfound Guest {name}, unable to modify membership.")
+
+    def search_guests(self, name = None, contact = None, limit = 20, history = False):
+        # the guests whose name (or a word of it) and / or contact start with the text typed, found with the sorted
+        # keys of guest_search.py instead of a scan. history adds the orders of every guest in the reservations
+        # table: their number, the nights and the first night of the last one
+        self.refresh()
+        found = self.guests.loc[self.guest_search.search(name, contact, limit)]
+        if history:
+            found = self.with_history(found)
+        return found
+
+    def guests_with_phone(self, contact):
+        # the guests with the same phone as contact, written with or without the country code and separators
+        self.refresh()
+        return self.guests.loc[self.guest_search.by_phone(contact)]
+
+    def duplicate_guests(self, threshold = 0.85):
+        # the pairs of guests that are likely the same person, for the dedup pass: the same phone with a similar
+        # name, or a similar name with a phone one digit apart. threshold is the similarity of the names (0-1)
+        self.refresh()
+        pairs = self.guest_search.duplicates(self.guests, threshold)
+        print(f"{len(pairs)} possible duplicate guests found.")
+        return pairs
+
+    @helper
+    def with_history(self, guests):
+        from occupancy import to_nights
+        orders = matching(self.reservations, {"contact": guests["contact"].tolist()})
+        orders = pd.DataFrame({
+            "key": ["\t".join(guest_key(name, contact)) for name, contact in zip(orders["guest_name"],
+                                                                                  orders["contact"])],
+            "nights": pd.to_numeric(orders["day"], errors="coerce").to_numpy(),
+            "first_night": to_nights(orders["reserved_date"])
+        })
+        stays = orders.groupby("key").agg(reservations=("nights", "size"), nights=("nights", "sum"),
+                                          last_stay=("first_night", "max"))
+        keys = pd.Series(["\t".join(guest_key(name, contact)) for name, contact in zip(guests["name"],
+                                                                                       guests["contact"])],
+                         index=guests.index)
+        guests = guests.copy()
+        guests["reservations"] = keys.map(stays["reservations"]).fillna(0).astype(int)
+        guests["nights"] = keys.map(stays["nights"]).fillna(0).astype(int)
+        guests["last_stay"] = keys.map(stays["last_stay"])
+        return guests
+
+    @helper
+    def checked_in_rooms(self, name, contact):
+        # the room numbers of the guest's Checked-in orders
+        if "reservations" not in self.__dict__:
+            # search the storage without loading the reservations, when it can
+            rows = self.storage.find(self.reservations_file, {"guest_name": str(name).strip(),
+                                                               "contact": str(contact).strip(),
+                                                               "is_check-in": "Checked-in"})
+            if rows is not None:
+                return [str(room) for room in rows["room_number"]]
+        orders = self.guest_reservations.get(guest_key(name, contact), {})
+        return [room for index, room in orders.items() if self.reservations.loc[index, "is_check-in"] == "Checked-in"]
 
     def housekeeping_request(self, name, contact):
-        def time_input(room):
+        def time_input():
             while True:  # 循环直到用户输入有效的时间
                 try:
                     get_available_time = int(input("Please input the available hour for housekeeping (24-hour) >> "))
-                    if 0 <= get_available_time <= 24:
-                        print(f"Dear {name}, housekeeping service for Room [{room}] is scheduled within "
-                              f"{get_available_time:02d}:00 - {get_available_time + 1:02d}:00.")
+                    if 0 <= get_available_time <= 23:
                         return get_available_time
                     else:
-                        print("Invalid input! Please enter a number between 0 and 24.")
+                        print("Invalid input! Please enter a number between 0 and 23.")
                 except ValueError:
                     print("Invalid input! Please enter a valid number.")
 
-        def add_housekeeping_schedule(room, time):
-            date = datetime.now()
-            add_data = {
-                "Room": room,
-                "Schedule Time": time,
-                "Date": datetime.now().strftime("%y-%m-%d")
-            }
-            add_schedule = pd.DataFrame([add_data])
-            self.housekeeping_schedule = pd.concat([self.housekeeping_schedule, add_schedule], ignore_index=True)
-            self.save_data(self.housekeeping_file, self.housekeeping_schedule)
-
-        get_room_number = self.reservations[
-            (self.reservations["guest_name"] == name) &
-            (self.reservations["contact"] == contact) &
-            (self.reservations["is_check-in"] == "Checked-in")
-            ]
-        if not get_room_number.empty:
-            # print(int(len(get_room_number)))
-            if int(len(get_room_number)) == 1:
-                room_num = get_room_number["room_number"].iloc[0]
-                available_hour = time_input(room_num)
-                period = f"{available_hour:02d}:00-{available_hour + 1:02d}:00"
-                add_housekeeping_schedule(room_num, period)
-                # print(period)
-            elif int(len(get_room_number)) > 1:
-                print(f"You have checked in for following room:\n"
-                      f"{get_room_number["room_number"].to_string(index=False)}")
-                room_num = input(f"Dear {name}, please enter the Room Number for housekeeping request >> ")
-                available_hour = time_input(room_num)
-                period = f"{available_hour:02d}:00-{available_hour + 1:02d}:00"
-                add_housekeeping_schedule(room_num, period)
-                # print(period)
+        get_room_number = self.checked_in_rooms(name, contact)
+        if not get_room_number:
+            print(f"Dear {name}, Can not find your Check-in record!")
+            return
+        # print(int(len(get_room_number)))
+        if len(get_room_number) == 1:
+            room_num = get_room_number[0]
         else:
+            print("You have checked in for following room:\n" + "\n".join(get_room_number))
+            room_num = input(f"Dear {name}, please enter the Room Number for housekeeping request >> ")
+        self.refresh()
+        free_hours = self.housekeeping_plan.free_hours(str(room_num).strip())
+        print("The housekeeping staff is free at: " + ", ".join(f"{hour:02d}:00" for hour in free_hours))
+        return self.request_housekeeping(name, contact, time_input(), room_num)
+
+    @mutation
+    def request_housekeeping(self, name, contact, hour, room_number = None):
+        # schedule the housekeeping of the guest's room at the hour, the room is needed when the guest has more rooms
+        get_room_number = self.checked_in_rooms(name, contact)
+        if not get_room_number:
             print(f"Dear {name}, Can not find your Check-in record!")
-
-    def housekeeping_schedule_display(self):
-        timetable = self.housekeeping_schedule
-        timetable['Date'] = pd.to_datetime(timetable['Date'], format="%y-%m-%d")
-        current_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        # filtering the pass data
-        request_timetable = timetable[timetable['Date'] >= current_date]
-        request_timetable = request_timetable.drop(columns=['Date'])
-        # insert the status of the room in the request_timetable
-        request_timetable = request_timetable.merge(self.rooms[['Room Number', 'Status']],
-                                                    left_on='Room', right_on='Room Number',
-                                                    how='left').drop(columns=['Room Number'])
-
-        # get the Available status room number to arrange the housekeeping schedule
-        available_rooms = self.rooms[self.rooms["Status"] == "Available"].copy()
-
-        room_type_mapping = {
-            "SingleRoom": "09:00-14:00",
-            "DoubleRoom": "09:00-14:00",
-            "LuxuryRoom": "07:00-09:00"
+            return outcome(False, f"Dear {name}, Can not find your Check-in record!")
+        if room_number is None and len(get_room_number) == 1:
+            room_number = get_room_number[0]
+        if room_number is None or str(room_number).strip() not in get_room_number:
+            print(f"Dear {name}, please choose one of your rooms: {', '.join(get_room_number)}")
+            return outcome(False, f"Dear {name}, please choose one of your rooms: {', '.join(get_room_number)}")
+        room_number = str(room_number).strip()
+        if not 0 <= int(hour) <= 23:
+            print("Invalid input! Please enter a number between 0 and 23.")
+            return outcome(False, "Invalid input! Please enter a number between 0 and 23.")
+
+        hour = int(hour)
+        if not self.housekeeping_plan.request(room_number, hour):
+            later = self.housekeeping_plan.next_free_hour(room_number, hour)
+            message = f"Dear {name}, the housekeeping staff is fully booked at {hour:02d}:00."
+            if later is not None:
+                message += f" The next free time is {later:02d}:00 - {later + 1:02d}:00."
+            print(message)
+            return outcome(False, message, next_free_hour=later)
+        period = f"{hour:02d}:00-{hour + 1:02d}:00"
+        add_data = {
+            "Room": room_number,
+            "Schedule Time": period,
+            "Date": datetime.now().strftime("%y-%m-%d")
         }
-        available_rooms["Schedule Time"] = available_rooms["Room Type"].map(room_type_mapping)
-        default_timetable = available_rooms[["Room Number", "Schedule Time", "Status"]].copy()
-        default_timetable = default_timetable.rename(columns={"Room Number": "Room"})
-
-        # combine the request list and default list.
-        combine_timetable = pd.concat([request_timetable, default_timetable], ignore_index=True)
-
-        # sorting the combined timetable with the schedule time
-        # building a temporary column used to sort
-        combine_timetable["Start Time"] = pd.to_datetime(combine_timetable["Schedule Time"].str.split('-').str[0]
-                                                         , format='%H:%M')
-
-        # sorting by temporary column and drop the temporary colum
-        combine_timetable = (combine_timetable.sort_values(by="Start Time").drop(columns="Start Time")
-                             .reset_index(drop=True))
+        self.insert_rows("housekeeping_schedule", [add_data])
+        message = (f"Dear {name}, housekeeping service for Room [{room_number}] is scheduled within "
+                   f"{hour:02d}:00 - {hour + 1:02d}:00.")
+        print(message)
+        return outcome(True, message, room_number=room_number, period=period)
 
+    def housekeeping_schedule_display(self):
+        # the guest requests and the cleanings of the available rooms, in hour slots the staff can do
+        self.refresh()
         print(f"Today's Housekeeping Schedule")
-        print(combine_timetable)
+        print(self.housekeeping_plan.table())
 
     def fb(self, name, contact):
         rate = int(input("Please Rate for your experience in Hotel(1-10) >> "))
         comment = str(input("Please feel free to leave comment to us >> "))
+        return self.post_feedback(name, contact, rate, comment)
+
+    @mutation
+    def post_feedback(self, name, contact, rate, comment):
         new_feedback = {
             "name": name,
             "contact": contact,
-            "rate": rate,
-            "comment": comment
+            "rate": int(rate),
+            "comment": str(comment),
+            "date": int(datetime.now().strftime("%Y%m%d"))
         }
-        fb_df = pd.DataFrame([new_feedback])
-        self.feedback = pd.concat([self.feedback, fb_df], ignore_index=True)
-        self.save_data(self.feedback_file, self.feedback)
+        self.insert_rows("feedback", [new_feedback])
         # print(self.feedback)
-
-    def message_delivery(self, obj, msg_type):
-        if obj == "member":
-            TA = True
-            TA_df = self.guests[self.guests["membership"] == TA]
-        elif obj == "regular":
-            TA = False
-            TA_df = self.guests[self.guests["membership"] == TA]
-        elif obj == "all":
-            TA_df = self.guests
-        print(f"{msg_type} Messages have been sent to following customers:")
-        print(TA_df)
+        return outcome(True, f"Thanks {name} for the feedback!")
+
+    def search_feedback(self, words = None, member = None, min_rate = None, max_rate = None, start = None,
+                        end = None, limit = 100):
+        # the feedback with all the words in the comment ("nois*" for the words starting with nois), from the
+        # members (True) or the other guests (False), rated from min_rate to max_rate, from start to end (YYYYMMDD).
+        # found with the inverted index of feedback_index.py, the newest first
+        self.refresh()
+        try:
+            rows = self.feedback_index.search(words, member, min_rate, max_rate, start, end)
+        except ValueError as error:
+            print(error)
+            return self.feedback.iloc[:0]
+        return self.feedback.loc[rows[::-1][:limit]]
+
+    def feedback_ratings(self, start = None, end = None, member = None, name = None, contact = None):
+        # the number, average and histogram of the rates of the members / the other guests / everyone from start to
+        # end, or the number and average of the rates of one guest
+        self.refresh()
+        if name is not None:
+            return self.feedback_index.guest_ratings(name, contact)
+        return self.feedback_index.ratings(member, start, end)
+
+    def analytics_report(self, start, end):
+        # occupancy, ADR, RevPAR and revenue per room type, and the feedback rates, from start to end (YYYYMMDD)
+        self.refresh()
+        try:
+            report = self.analytics.report(start, end)
+            ratings = self.analytics.rating_report(start, end)
+        except ValueError as error:
+            print(error)
+            return outcome(False, str(error))
+        print(f"Hotel Report {start} - {end}")
+        print(report.to_string(index=False))
+        print(f"{ratings['count']} ratings, average {ratings['average']}")
+        return outcome(True, f"Hotel Report {start} - {end}", report=report.to_dict("records"), ratings=ratings)
+
+    def check_analytics(self, repair = True):
+        # compare the analytics totals with the ones made again from the tables, and replace them if they differ
+        from analytics import Analytics
+        rebuilt = Analytics.from_tables(self.rooms, self.reservation_history(), self.feedback)
+        same = "analytics" not in self.__dict__ or self.analytics.same(rebuilt)
+        if not same:
+            print("analytics are out of sync with the tables")
+            if repair:
+                self.analytics = rebuilt
+        return same
+
+    def chunks(self, table, chunk_size = 10000):
+        # the rows of the table chunk_size at a time. a loaded table is used as it is, with its unsaved changes,
+        # else the storage reads the rows without loading the whole table
+        if table in self.__dict__:
+            data = self.__dict__[table]
+            for start in range(0, len(data), chunk_size):
+                yield data.iloc[start:start + chunk_size]
+        else:
+            yield from self.storage.chunks(self.table_files[table], chunk_size)
+
+    def message_delivery(self, obj, msg_type, message = None, sink = None, campaign = None, **conditions):
+        # send a message to the guests of obj (all / member / regular) matching the conditions (column=value).
+        # {name} and {contact} in the message are the guest's. the guests sent to are recorded under the campaign
+        # name (or a messaging.Campaign), so running the same campaign again only sends to the guests left
+        from messaging import SEGMENTS, Campaign
+        if obj not in SEGMENTS:
+            print("The Member to deliver message should be all / member / regular.")
+            return outcome(False, "The Member to deliver message should be all / member / regular.")
+        if not isinstance(campaign, Campaign):
+            name = campaign or f"{msg_type}-{obj}-{datetime.now().strftime('%Y%m%d')}"
+            # the braces of the message type are text, not fields of the template
+            text = str(msg_type).replace("{", "{{").replace("}", "}}")
+            campaign = Campaign(name, message or "Dear {name}, " + f"we have a new {text} for you!", sink)
+        self.refresh()
+        counts = campaign.run(self.chunks("guests", campaign.chunk_size), {**SEGMENTS[obj], **conditions})
+        print(f"{msg_type} Messages have been sent to {counts['sent']} customers "
+              f"({counts['failed']} failed, {counts['skipped']} sent before).")
+        return outcome(counts["failed"] == 0, f"{msg_type} Messages have been sent to {counts['sent']} customers",
+                       receivers=counts["sent"], **counts)
+
+
+# the dictionary indexes built for every table
+TABLE_INDEXES = {
+    "rooms": (
+        "room_index",          # room number -> row
+        "available_rooms"      # room type -> {room number: row} of the Available rooms
+    ),
+    "guests": (
+        "guest_index",         # (name, contact) -> row
+    ),
+    "reservations": (
+        "reservation_index",   # reservation_id -> row
+        "guest_reservations",  # (name, contact) -> {row: room number} of the un-check-in and Checked-in orders
+        "room_reservation"     # room number -> row of the Checked-in order
+    )
+}
+
+
+ROOM_TYPES = {
+    "SingleRoom": SingleRoom,
+    "DoubleRoom": DoubleRoom,
+    "LuxuryRoom": LuxuryRoom
+}
+
+
+def outcome(ok, message, **data):
+    # the structured result returned by the operations, the message is the one printed on the console
+    data["ok"] = ok
+    data["message"] = message
+    return data
+
+
+def matching(data, conditions):
+    # the rows of the dataframe matching all the conditions (column=value or column=[values])
+    mask = pd.Series(True, index=data.index)
+    for column, value in conditions.items():
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        if data[column].dtype.kind in "iuf":
+            # "100000001" typed in or from a url is the number 100000001
+            values = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").dropna().tolist()
+        elif data[column].dtype.kind == "M":
+            # 20250102 is the date
+            from occupancy import to_nights
+            values = pd.Series(to_nights(values)).dropna().tolist()
+        mask &= data[column].isin(values)
+    return data[mask]
+
+
+def room_order(number):
+    # the room numbers in the order of their numbers: S9 before S10
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", str(number))]
+
+
+def guest_key(name, contact):
+    # the key of a guest in the indexes, the contact could be read as a number or typed in as a text
+    return str(name).strip(), str(contact).strip()
 
 
 def validate_text(input_text, target_text):
@@ -490,120 +1482,144 @@ def validate_text(input_text, target_text):
 
 
 # Main Program
-print("Welcome the Hotel Management System! ")
-hms = HotelManagementSystem()
-while True:
-    print("Options:")
-    print("Enter 1. Customer Page")
-    print("Enter 2. Administrator Page")
-    print("Enter E. Exit")
-    choice1 = input("\nEnter your Operation Code >> ")
-    if choice1 == "1":
-        customer_name = input("Please Enter Your Name >> ")
-        customer_contact = int(input("Please Enter Your Contact >> "))
-        reserving_guest = Guest(customer_name, customer_contact)
-        hms.add_guest(reserving_guest)
-        while True:
-            print("Options for Customer:")
-            print("Enter 1. Make a Reservation")
-            print("Enter 2. Register to membership")
-            print("Enter 3. Request a Housekeeping")
-            print("Enter 4. Feedback")
-            print("Enter E. Back to Main Manu")
-            choice2 = input("\nEnter your Operation Code >> ")
-            if choice2 == "1":
-                hms.make_reservation(customer_name, customer_contact)
-            elif choice2 == "2":
-                hms.register_to_member(customer_name, customer_contact)
-            elif choice2 == "3":
-                hms.housekeeping_request(customer_name, customer_contact)
-            elif choice2 == "4":
-                hms.fb(customer_name, customer_contact)
-            elif choice2 == "e":
-                break
-            else:
-                print("Invalid choice. Please try again.")
-    elif choice1 == "2":
-        while True:
-            print("Options for Administrator:")
-            print("Enter 1. Manage Reservation")
-            print("Enter 2. Check in")
-            print("Enter 3. Check out")
-            print("Enter 4. View Housekeeping Schedule")
-            print("Enter 5. Manage Rooms")
-            print("Enter 6. Customer Relationship Management")
-            print("Enter E. Back to the Main Manu")
-            choice3 = input("\nEnter your Operation Code >> ")
-            if choice3 == "1":
-                while True:
-                    print("Options for Manage Reservation:")
-                    print("Enter 1. Make Reservation")
-                    print("Enter 2. Check Reservation")
-                    print("Enter E. Back to the Admin Page")
-                    choice4 = input("\nEnter your Operation Code >> ")
-                    if choice4 == "1":
-                        customer_name = input("Please Enter Your Name >> ")
-                        customer_contact = input("Please Enter Your Contact >> ")
-                        hms.make_reservation(customer_name, customer_contact)
-                    elif choice4 == "2":
-                        hms.view_reservations()
-                    elif choice4.lower() == "e":
-                        break
-                    else:
-                        print("Invalid choice. Please try again.")
-            elif choice3 == "2":
-                hms.check_in()
-            elif choice3 == "3":
-                hms.check_out()
-            elif choice3 == "4":
-                hms.housekeeping_schedule_display()
-            elif choice3 == "5":
-                while True:
-                    print("Options for Manage Reservation:")
-                    print("Enter 1. View Available Rooms")
-                    print("Enter 2. View All the Rooms Status")
-                    print("Enter 3. Modify Room Status")
-                    print("Enter E. Back to the Admin Page")
-                    choice5 = input("\nEnter your Operation Code >> ")
-                    if choice5 == "1":
-                        hms.get_available_rooms()
-                    elif choice5 == "2":
-                        print(hms.rooms)
-                    elif choice5 == "3":
-                        room_num = input("Input the room number for the operation >> ")
-                        hms.room_status_modify(room_num)
-                    elif choice5.lower() == "e":
-                        break
-                    else:
-                        print("Invalid choice. Please try again.")
-            elif choice3 == "6":
-                while True:
-                    print("Options for CRM:")
-                    print("Enter 1. View Membership Guests")
-                    print("Enter 2. Upgrade Guest to Membership")
-                    print("Enter 3. Message to Guests")
-                    print("Enter E. Back to the Admin Page")
-                    choice6 = input("\nEnter your Operation Code >> ")
-                    if choice6 == "1":
-                        member_df = hms.guests[hms.guests["membership"] == True]
-                        print(member_df)
-                    elif choice6 == "2":
-                        guest_to_upgrade = input("Input the Guest Name >> ")
-                        guest_to_upgrade_number = input("Input the Guest Contact >> ")
-                        hms.register_to_member(guest_to_upgrade, guest_to_upgrade_number)
-                    elif choice6 == "3":
-                        receivers = input("The Member to deliver message \n"
-                                          "(all / member/ regular) >> ").lower()
-                        content = input("Input the Content of the message >> ")
-                        hms.message_delivery(receivers, content)
-
-                    elif choice6.lower() == "e":
-                        break
-                    else:
-                        print("Invalid choice. Please try again.")
-            elif choice3.lower() == "e":
-                break
-    elif choice1.lower() == "e":
-        break
-    else:
-        print("Invalid choice. Please try again.")
\ No newline at end of file
+def main():
+    print("Welcome the Hotel Management System! ")
+    hms = HotelManagementSystem()
+    while True:
+        print("Options:")
+        print("Enter 1. Customer Page")
+        print("Enter 2. Administrator Page")
+        print("Enter E. Exit")
+        choice1 = input("\nEnter your Operation Code >> ")
+        if choice1 == "1":
+            customer_name = input("Please Enter Your Name >> ")
+            customer_contact = int(input("Please Enter Your Contact >> "))
+            reserving_guest = Guest(customer_name, customer_contact)
+            hms.add_guest(reserving_guest)
+            while True:
+                print("Options for Customer:")
+                print("Enter 1. Make a Reservation")
+                print("Enter 2. Register to membership")
+                print("Enter 3. Request a Housekeeping")
+                print("Enter 4. Feedback")
+                print("Enter E. Back to Main Manu")
+                choice2 = input("\nEnter your Operation Code >> ")
+                if choice2 == "1":
+                    hms.make_reservation(customer_name, customer_contact)
+                elif choice2 == "2":
+                    hms.register_to_member(customer_name, customer_contact)
+                elif choice2 == "3":
+                    hms.housekeeping_request(customer_name, customer_contact)
+                elif choice2 == "4":
+                    hms.fb(customer_name, customer_contact)
+                elif choice2 == "e":
+                    break
+                else:
+                    print("Invalid choice. Please try again.")
+        elif choice1 == "2":
+            while True:
+                print("Options for Administrator:")
+                print("Enter 1. Manage Reservation")
+                print("Enter 2. Check in")
+                print("Enter 3. Check out")
+                print("Enter 4. View Housekeeping Schedule")
+                print("Enter 5. Manage Rooms")
+                print("Enter 6. Customer Relationship Management")
+                print("Enter 7. View Waitlist")
+                print("Enter E. Back to the Main Manu")
+                choice3 = input("\nEnter your Operation Code >> ")
+                if choice3 == "1":
+                    while True:
+                        print("Options for Manage Reservation:")
+                        print("Enter 1. Make Reservation")
+                        print("Enter 2. Check Reservation")
+                        print("Enter E. Back to the Admin Page")
+                        choice4 = input("\nEnter your Operation Code >> ")
+                        if choice4 == "1":
+                            customer_name = input("Please Enter Your Name >> ")
+                            customer_contact = input("Please Enter Your Contact >> ")
+                            hms.make_reservation(customer_name, customer_contact)
+                        elif choice4 == "2":
+                            hms.view_reservations()
+                        elif choice4.lower() == "e":
+                            break
+                        else:
+                            print("Invalid choice. Please try again.")
+                elif choice3 == "2":
+                    hms.check_in()
+                elif choice3 == "3":
+                    hms.check_out()
+                elif choice3 == "4":
+                    hms.housekeeping_schedule_display()
+                elif choice3 == "5":
+                    while True:
+                        print("Options for Manage Reservation:")
+                        print("Enter 1. View Available Rooms")
+                        print("Enter 2. View All the Rooms Status")
+                        print("Enter 3. Modify Room Status")
+                        print("Enter E. Back to the Admin Page")
+                        choice5 = input("\nEnter your Operation Code >> ")
+                        if choice5 == "1":
+                            hms.get_available_rooms()
+                        elif choice5 == "2":
+                            print(hms.rooms)
+                        elif choice5 == "3":
+                            room_num = input("Input the room number for the operation >> ")
+                            hms.room_status_modify(room_num)
+                        elif choice5.lower() == "e":
+                            break
+                        else:
+                            print("Invalid choice. Please try again.")
+                elif choice3 == "6":
+                    while True:
+                        print("Options for CRM:")
+                        print("Enter 1. View Membership Guests")
+                        print("Enter 2. Upgrade Guest to Membership")
+                        print("Enter 3. Message to Guests")
+                        print("Enter 4. Search Guests")
+                        print("Enter 5. Find Duplicate Guests")
+                        print("Enter 6. Search Feedback")
+                        print("Enter E. Back to the Admin Page")
+                        choice6 = input("\nEnter your Operation Code >> ")
+                        if choice6 == "1":
+                            member_df = hms.guests[hms.guests["membership"] == True]
+                            print(member_df)
+                        elif choice6 == "2":
+                            guest_to_upgrade = input("Input the Guest Name >> ")
+                            guest_to_upgrade_number = input("Input the Guest Contact >> ")
+                            hms.register_to_member(guest_to_upgrade, guest_to_upgrade_number)
+                        elif choice6 == "3":
+                            receivers = input("The Member to deliver message \n"
+                                              "(all / member/ regular) >> ").lower()
+                            content = input("Input the Content of the message >> ")
+                            hms.message_delivery(receivers, content)
+                        elif choice6 == "4":
+                            name_prefix = input("The start of the name (empty for any) >> ").strip() or None
+                            contact_prefix = input("The start of the contact (empty for any) >> ").strip() or None
+                            print(hms.search_guests(name_prefix, contact_prefix, history=True).to_string(index=False))
+                        elif choice6 == "5":
+                            print(hms.duplicate_guests().to_string(index=False))
+                        elif choice6 == "6":
+                            words = input("The words of the comments (empty for any) >> ").strip() or None
+                            tier = input("From (all / member / regular) >> ").strip().lower()
+                            max_rate = input("The highest rate (empty for any) >> ").strip() or None
+                            member = {"member": True, "regular": False}.get(tier)
+                            print(hms.search_feedback(words, member, max_rate=max_rate).to_string(index=False))
+                            print(hms.feedback_ratings(member=member))
+
+                        elif choice6.lower() == "e":
+                            break
+                        else:
+                            print("Invalid choice. Please try again.")
+                elif choice3 == "7":
+                    hms.view_waitlist()
+                elif choice3.lower() == "e":
+                    break
+        elif choice1.lower() == "e":
+            break
+        else:
+            print("Invalid choice. Please try again.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+from lazy_import import LazyImport
+from occupancy import to_night, to_nights
+
+np = LazyImport("numpy")
+pd = LazyImport("pandas")
+
+# the stays the rooms were sold for, and the stays still on the books
+SOLD = ("Checked-in", "Checked-out")
+BOOKED = ("un-check-in",)
+RATES = 10
+# below this many rows the nights are added one slice at a time, above it with one running sum over all the days
+SLICE_ROWS = 64
+
+
+def day_numbers(values):
+    # YYYYMMDD values as numpy day numbers (days since 1970-01-01), and which of them are valid dates.
+    # a column with empty cells is read as floats, 20250102.0 is 20250102
+    values = pd.Series(values)
+    if values.dtype.kind == "f":
+        values = values.astype("Int64")
+    days = to_nights(values)
+    valid = ~np.isnat(days)
+    return np.where(valid, days.astype(np.int64), 0), valid
+
+
+class Analytics:
+    # the per day totals the reports are made of: for every night and room type the rooms sold and booked and their
+    # revenue in cents, and for every day the histogram of the feedback rates. the rows of the tables are added (and
+    # taken away with sign -1 before they change), so the totals follow the tables without reading them again, and a
+    # report over a period is a few slices of the arrays whatever the number of reservations.
+    # the revenue of a stay is spread over its nights in whole cents, the rest of the division on the first night,
+    # so the totals kept up to date are exactly the totals made again from the tables.
+    def __init__(self, first_day = None, days = 366):
+        self.room_types = {}
+        self.capacity = np.zeros(0, dtype=np.int64)
+        self.first_day = int(np.datetime64("today", "D").astype(np.int64)) if first_day is None else first_day
+        # days x room types
+        self.sold = np.zeros((days, 0), dtype=np.int64)
+        self.sold_revenue = np.zeros((days, 0), dtype=np.int64)
+        self.booked = np.zeros((days, 0), dtype=np.int64)
+        self.booked_revenue = np.zeros((days, 0), dtype=np.int64)
+        # days x rates 1-10, and the sum of the rates per day; the feedback without a date is kept aside
+        self.ratings = np.zeros((days, RATES), dtype=np.int64)
+        self.rating_sum = np.zeros(days, dtype=np.int64)
+        self.undated_ratings = np.zeros(RATES, dtype=np.int64)
+        self.undated_rating_sum = 0
+
+    @classmethod
+    def from_tables(cls, rooms, reservations, feedback):
+        # the full rebuild: every row of the tables added at once
+        analytics = cls()
+        analytics.add_rows("rooms", rooms)
+        analytics.add_rows("reservations", reservations)
+        analytics.add_rows("feedback", feedback)
+        return analytics
+
+    def day_arrays(self):
+        return ("sold", "sold_revenue", "booked", "booked_revenue", "ratings", "rating_sum")
+
+    def column(self, room_type):
+        # the column of the room type, a new room type gets a new column with no rooms
+        if room_type not in self.room_types:
+            self.room_types[room_type] = len(self.room_types)
+            self.capacity = np.append(self.capacity, 0)
+            for name in ("sold", "sold_revenue", "booked", "booked_revenue"):
+                array = getattr(self, name)
+                setattr(self, name, np.hstack([array, np.zeros((len(array), 1), dtype=np.int64)]))
+        return self.room_types[room_type]
+
+    def cover(self, first, last):
+        # make the arrays reach from the day first to the day last (excluded), they grow in front or at the end
+        days = len(self.rating_sum)
+        grow_front = max(self.first_day - first, 0)
+        grow_back = max(last - (self.first_day + days), 0)
+        if grow_front:
+            grow_front = max(grow_front, days)
+        if grow_back:
+            grow_back = max(grow_back, days)
+        if not grow_front and not grow_back:
+            return
+        for name in self.day_arrays():
+            array = getattr(self, name)
+            shape = array.shape[1:]
+            setattr(self, name, np.concatenate([np.zeros((grow_front,) + shape, dtype=np.int64), array,
+                                                np.zeros((grow_back,) + shape, dtype=np.int64)]))
+        self.first_day -= grow_front
+
+    def add_rows(self, table, rows, sign = 1):
+        # add the rows of the table to the totals, sign -1 takes them away
+        if rows is None or rows.empty:
+            return
+        if table == "rooms" and "Room Type" in rows.columns:
+            for room_type, count in rows["Room Type"].value_counts().items():
+                if not count:
+                    # a category without rooms
+                    continue
+                column = self.column(room_type)
+                self.capacity[column] += sign * int(count)
+        elif table == "reservations" and "reservation_id" in rows.columns:
+            self.add_stays(rows, sign)
+        elif table == "feedback" and "rate" in rows.columns:
+            self.add_ratings(rows, sign)
+
+    def add_stays(self, rows, sign = 1):
+        status = rows["is_check-in"]
+        stays = rows[status.isin(SOLD + BOOKED)]
+        if stays.empty:
+            return
+        first, valid = day_numbers(stays["reserved_date"])
+        nights = pd.to_numeric(stays["day"], errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+        valid &= nights > 0
+        if not valid.any():
+            return
+        stays = stays[valid]
+        first = first[valid]
+        nights = nights[valid]
+        cents = np.round(pd.to_numeric(stays["order_amount"], errors="coerce").fillna(0).to_numpy() * 100) \
+            .astype(np.int64)
+        for room_type in stays["room_type"].unique():
+            self.column(room_type)
+        self.cover(int(first.min()), int((first + nights).max()))
+        columns = stays["room_type"].map(self.room_types).to_numpy(dtype=np.int64)
+        start = first - self.first_day
+        sold = stays["is_check-in"].isin(SOLD).to_numpy()
+        for mask, rooms, revenue in ((sold, self.sold, self.sold_revenue), (~sold, self.booked, self.booked_revenue)):
+            if not mask.any():
+                continue
+            self.spread(rooms, start[mask], nights[mask], columns[mask], np.full(int(mask.sum()), sign))
+            per_night = cents[mask] // nights[mask]
+            self.spread(revenue, start[mask], nights[mask], columns[mask], sign * per_night)
+            # the cents left over by the division are on the first night
+            np.add.at(revenue, (start[mask], columns[mask]), sign * (cents[mask] - per_night * nights[mask]))
+
+    def spread(self, array, start, nights, columns, values):
+        # add the value of every stay to all of its nights
+        if len(start) <= SLICE_ROWS:
+            for first, count, column, value in zip(start.tolist(), nights.tolist(), columns.tolist(), values.tolist()):
+                array[first:first + count, column] += value
+            return
+        # +value at the first night and -value after the last night, the running sum is the value per night
+        change = np.zeros((len(array) + 1, array.shape[1]), dtype=np.int64)
+        np.add.at(change, (start, columns), values)
+        np.add.at(change, (start + nights, columns), -values)
+        array += np.cumsum(change[:-1], axis=0)
+
+    def add_ratings(self, rows, sign = 1):
+        rates = pd.to_numeric(rows["rate"], errors="coerce")
+        known = rates.notna().to_numpy()
+        rows = rows[known]
+        rates = rates[known].to_numpy(dtype=np.int64)
+        # the histogram has the rates 1-10, a rate out of the range is counted at the nearest end
+        bins = np.clip(rates, 1, RATES) - 1
+        if "date" in rows.columns:
+            days, dated = day_numbers(rows["date"])
+        else:
+            days, dated = np.zeros(len(rows), dtype=np.int64), np.zeros(len(rows), dtype=bool)
+        np.add.at(self.undated_ratings, bins[~dated], sign)
+        self.undated_rating_sum += sign * int(rates[~dated].sum())
+        if dated.any():
+            self.cover(int(days[dated].min()), int(days[dated].max()) + 1)
+            np.add.at(self.ratings, (days[dated] - self.first_day, bins[dated]), sign)
+            np.add.at(self.rating_sum, days[dated] - self.first_day, sign * rates[dated])
+
+    def period(self, start, end):
+        # the rows of the days from start to end (YYYYMMDD, both included), clipped to the arrays
+        first = to_night(start)
+        last = to_night(end)
+        if first is None or last is None:
+            raise ValueError("Invalid date format! Please use the YYYYMMDD format.")
+        first = int(first.astype(np.int64))
+        last = int(last.astype(np.int64)) + 1
+        if last <= first:
+            raise ValueError(f"The period ends before it starts: {start} - {end}.")
+        rows = slice(min(max(first - self.first_day, 0), len(self.rating_sum)),
+                     min(max(last - self.first_day, 0), len(self.rating_sum)))
+        return rows, last - first
+
+    def report(self, start, end):
+        # occupancy, ADR (revenue per room sold) and RevPAR (revenue per room available) of every room type and of
+        # the hotel from start to end, from the stays checked in or out; the booked columns are the stays to come
+        rows, days = self.period(start, end)
+        types = list(self.room_types)
+        table = pd.DataFrame({
+            "Room Type": types + ["All"],
+            "Rooms": np.append(self.capacity, self.capacity.sum()),
+            "Sold": np.append(self.sold[rows].sum(axis=0), self.sold[rows].sum()),
+            "Revenue": np.append(self.sold_revenue[rows].sum(axis=0), self.sold_revenue[rows].sum()) / 100,
+            "Booked": np.append(self.booked[rows].sum(axis=0), self.booked[rows].sum()),
+            "Booked Revenue": np.append(self.booked_revenue[rows].sum(axis=0), self.booked_revenue[rows].sum()) / 100
+        })
+        available = table["Rooms"] * days
+        table["Occupancy"] = (table["Sold"] / available.where(available > 0)).round(4)
+        table["ADR"] = (table["Revenue"] / table["Sold"].where(table["Sold"] > 0)).round(2)
+        table["RevPAR"] = (table["Revenue"] / available.where(available > 0)).round(2)
+        return table
+
+    def rating_report(self, start = None, end = None):
+        # the number, average and histogram of the rates given from start to end, all of them without a period
+        if start is None and end is None:
+            histogram = self.ratings.sum(axis=0) + self.undated_ratings
+            total = int(self.rating_sum.sum()) + self.undated_rating_sum
+        else:
+            rows, days = self.period(start, end)
+            histogram = self.ratings[rows].sum(axis=0)
+            total = int(self.rating_sum[rows].sum())
+        count = int(histogram.sum())
+        return {"count": count, "average": round(total / count, 2) if count else None,
+                "histogram": dict(zip(range(1, RATES + 1), histogram.tolist()))}
+
+    def same(self, other):
+        # True when the two have the same totals, the arrays are compared over the days of both
+        if self.room_types.keys() != other.room_types.keys():
+            return False
+        order = [other.room_types[room_type] for room_type in self.room_types]
+        if not np.array_equal(self.capacity, other.capacity[order]):
+            return False
+        if not np.array_equal(self.undated_ratings, other.undated_ratings) \
+                or self.undated_rating_sum != other.undated_rating_sum:
+            return False
+        first = min(self.first_day, other.first_day)
+        last = max(self.first_day + len(self.rating_sum), other.first_day + len(other.rating_sum))
+        self.cover(first, last)
+        other.cover(first, last)
+        rows = slice(first - self.first_day, last - self.first_day)
+        other_rows = slice(first - other.first_day, last - other.first_day)
+        for name in self.day_arrays():
+            mine = getattr(self, name)[rows]
+            theirs = getattr(other, name)[other_rows]
+            if mine.ndim == 2 and name != "ratings":
+                theirs = theirs[:, order]
+            if not np.array_equal(mine, theirs):
+                return False
+        return True
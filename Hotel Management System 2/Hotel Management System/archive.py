@@ -0,0 +1,61 @@
+import os
+
+from lazy_import import LazyImport
+from schema import stored, typed
+from storage import write_atomic
+
+pd = LazyImport("pandas")
+
+# the partition of the orders whose reserved_date is not a valid date
+UNDATED = "undated"
+
+
+def month_of(values):
+    # YYYYMMDD values as the month of their partition, "2025-01"
+    text = pd.Series(values).astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+    valid = text.str.fullmatch(r"\d{8}") & text.str[4:6].between("01", "12")
+    return (text.str[:4] + "-" + text.str[4:6]).where(valid, UNDATED)
+
+
+class ReservationArchive:
+    # the completed stays moved out of the reservations table, one csv file per month of the reserved date in
+    # "<reservations file>.archive/2025-01.csv". the table only keeps the orders still to come or in the hotel, so
+    # the operations do not go through the whole history, and a search of the history only opens the months asked for
+    def __init__(self, file_path, schema = None):
+        self.directory = os.path.splitext(file_path)[0] + ".archive"
+        self.schema = schema
+
+    def path(self, month):
+        return os.path.join(self.directory, f"{month}.csv")
+
+    def months(self, start = None, end = None):
+        # the months with a partition, from the month of start to the month of end (YYYYMMDD, both included)
+        if not os.path.isdir(self.directory):
+            return []
+        months = sorted(os.path.splitext(name)[0] for name in os.listdir(self.directory) if name.endswith(".csv"))
+        if start is None and end is None:
+            return months
+        first = month_of([start])[0] if start is not None else "0000-00"
+        last = month_of([end])[0] if end is not None else "9999-99"
+        if UNDATED in (first, last):
+            raise ValueError("Invalid date format! Please enter the date in YYYYMMDD format.")
+        return [month for month in months if month != UNDATED and first <= month <= last]
+
+    def add(self, rows):
+        # add the rows to the partitions of their months, an order already archived is replaced by its new row
+        os.makedirs(self.directory, exist_ok=True)
+        rows = stored(self.schema, rows)
+        written = {}
+        for month, part in rows.groupby(month_of(rows["reserved_date"]).to_numpy()):
+            path = self.path(month)
+            if os.path.exists(path):
+                part = pd.concat([pd.read_csv(path), part], ignore_index=True)
+            part = part.drop_duplicates("reservation_id", keep="last")
+            write_atomic(path, lambda f: part.to_csv(f, index=False))
+            written[month] = len(part)
+        return written
+
+    def read(self, start = None, end = None):
+        # the archived rows of the months from start to end, one month at a time
+        for month in self.months(start, end):
+            yield typed(self.schema, pd.read_csv(self.path(month)))
@@ -0,0 +1,151 @@
+import argparse
+import collections
+import contextlib
+import json
+import os
+
+from HMS import ROOM_TYPES, Guest, HotelManagementSystem, outcome
+from lazy_import import LazyImport
+
+pd = LazyImport("pandas")
+
+
+def add_room(hms, room_number, room_type, status = "Available"):
+    if room_type not in ROOM_TYPES:
+        return outcome(False, f"Unknown room type {room_type}.")
+    return hms.add_room(ROOM_TYPES[room_type](room_number, status))
+
+
+def add_guest(hms, name, contact, membership = False):
+    return hms.add_guest(Guest(name, int(contact), str(membership).strip().lower() in ("true", "1")))
+
+
+def availability(hms, room_type, start, nights = 1):
+    rooms = hms.availability(room_type, start, int(nights))
+    return outcome(True, f"{rooms} {room_type} available", rooms=rooms)
+
+
+# the operations a batch file can use, "op" of a command is the key, the other fields are the parameters
+OPERATIONS = {
+    "add_room": add_room,
+    "add_guest": add_guest,
+    "availability": availability,
+    "reserve": "reserve",
+    "check_in": "check_in_order",
+    "check_in_arrivals": "check_in_arrivals",
+    "check_out": "check_out_room",
+    "cancel_waiting": "cancel_waiting",
+    "archive_reservations": "archive_reservations",
+    "room_status_modify": "room_status_modify",
+    "register_to_member": "register_to_member",
+    "housekeeping_request": "request_housekeeping",
+    "feedback": "post_feedback",
+    "message_delivery": "message_delivery"
+}
+
+
+def read_commands(path):
+    # one command per line of a jsonl file, or one per row of a csv file with an "op" column
+    if path.endswith(".csv"):
+        commands = pd.read_csv(path, dtype=str, keep_default_na=False)
+        for command in commands.to_dict("records"):
+            yield {key: value for key, value in command.items() if value != ""}
+    else:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def failed(op, error):
+    return outcome(False, f"{type(error).__name__}: {error}", op=op)
+
+
+def run_command(hms, command):
+    # the result of one command. a command going wrong before it changed any row only fails itself; one going
+    # wrong half way raises its error, the rows it changed can not be saved (see run_commands)
+    command = dict(command)
+    op = command.pop("op", None)
+    if op not in OPERATIONS:
+        return outcome(False, f"Unknown operation {op}.", op=op)
+    operation = OPERATIONS[op]
+    row_changes = hms.row_changes
+    try:
+        if isinstance(operation, str):
+            result = getattr(hms, operation)(**command)
+        else:
+            result = operation(hms, **command)
+    except Exception as error:
+        if hms.row_changes != row_changes:
+            raise
+        # one command going wrong does not stop the others
+        return failed(op, error)
+    result["op"] = op
+    return result
+
+
+def run_commands(hms, commands):
+    # run the commands one after the other with autosave off, inside the lock of the caller who saves them at the
+    # end. when a command goes wrong half way, the changes of all the commands are dropped and the commands before
+    # it run again without it, so the tables saved never have half of an operation
+    results = []
+    kept = []
+    for command in commands:
+        results.append(None)
+        queue = collections.deque([(len(results) - 1, command)])
+        while queue:
+            position, command = queue.popleft()
+            try:
+                results[position] = run_command(hms, command)
+                kept.append((position, command))
+            except Exception as error:
+                hms.discard_unsaved()
+                results[position] = failed(command.get("op"), error)
+                queue.extendleft(reversed(kept))
+                kept = []
+    return results
+
+
+def run_batch(hms, path, quiet = True):
+    # run all the commands of the file against one system, the tables are saved once at the end.
+    # the data directory stays locked from the first command to the save, so no other process changes the
+    # tables in between; when the batch stops half way (a bad line in the file) nothing of it is saved, and a
+    # command going wrong half way leaves nothing of itself (see run_commands)
+    hms.autosave = False
+    results = []
+    try:
+        with hms.locked():
+            try:
+                with contextlib.ExitStack() as stack:
+                    if quiet:
+                        stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+                    results = run_commands(hms, read_commands(path))
+            except BaseException:
+                hms.discard_unsaved()
+                raise
+            hms.flush()
+    finally:
+        hms.autosave = True
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a file of Hotel Management System operations")
+    parser.add_argument("commands", help="jsonl or csv file of commands")
+    parser.add_argument("--results", help="write the result of every command to this jsonl file")
+    parser.add_argument("--journal", action="store_true", help="use the journal storage")
+    parser.add_argument("--change-log", action="store_true", help="write the change events to changes/")
+    args = parser.parse_args()
+
+    hms = HotelManagementSystem(journal=args.journal, change_log=args.change_log)
+    results = run_batch(hms, args.commands)
+    if args.results:
+        with open(args.results, "w") as f:
+            for result in results:
+                f.write(json.dumps(result, default=str) + "\n")
+    done = sum(result["ok"] for result in results)
+    print(f"{len(results)} commands run, {done} succeeded, {len(results) - done} failed")
+
+
+if __name__ == "__main__":
+    main()
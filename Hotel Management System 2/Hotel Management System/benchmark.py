@@ -0,0 +1,262 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import columnar
+from HMS import Guest, HotelManagementSystem
+from lazy_import import LazyImport
+from schema import SCHEMAS, memory, typed
+
+np = LazyImport("numpy")
+pd = LazyImport("pandas")
+
+TABLE_FILES = {
+    "rooms_file": "rooms.csv",
+    "guests_file": "guests.csv",
+    "reservations_file": "reservations.csv",
+    "house_keeping_file": "housekeeping_schedule.csv",
+    "feedback_file": "feedback.csv"
+}
+ROOM_MIX = {"SingleRoom": (0.5, "S", 150), "DoubleRoom": (0.35, "D", 250), "LuxuryRoom": (0.15, "L", 500)}
+COMMENTS = ["Nice stay", "Clean room", "Noisy at night", "Great breakfast", "Friendly staff", "Will come again"]
+
+
+def generate(directory, rooms = 2000, guests = 100000, years = 2, feedback = 20000, housekeeping = 500, seed = 1):
+    # write the csv files of a synthetic hotel: every room has stays one after the other from `years` ago to
+    # 90 days from now, the past ones are Checked-out, the current ones Checked-in and the future ones un-check-in
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    today = np.datetime64(datetime.now().date(), "D")
+
+    room_types = rng.choice(list(ROOM_MIX), size=rooms, p=[mix[0] for mix in ROOM_MIX.values()])
+    numbers = np.array([f"{ROOM_MIX[room_type][1]}{i:05d}" for i, room_type in enumerate(room_types)])
+
+    contacts = 100000000 + np.arange(guests)
+    names = np.array([f"Guest {i:06d}" for i in range(guests)])
+    pd.DataFrame({"name": names, "contact": contacts, "membership": rng.random(guests) < 0.2}) \
+        .to_csv(os.path.join(directory, "guests.csv"), index=False)
+
+    # the stays of every room: 1-7 nights with 0-3 free nights in between
+    days = int(years * 365) + 90
+    per_room = days // 3 + 1
+    lengths = rng.integers(1, 8, size=(rooms, per_room))
+    gaps = rng.integers(0, 4, size=(rooms, per_room))
+    starts = np.cumsum(lengths + gaps, axis=1) - lengths
+    keep = starts + lengths <= days
+    room_rows = np.broadcast_to(np.arange(rooms)[:, None], starts.shape)[keep]
+    first = today - int(years * 365) + starts[keep]
+    nights = lengths[keep]
+    last = first + nights
+    status = np.where(last <= today, "Checked-out", np.where(first <= today, "Checked-in", "un-check-in"))
+    guest_rows = rng.integers(0, guests, size=len(first))
+    prices = np.array([ROOM_MIX[room_type][2] for room_type in room_types])
+    order = np.argsort(first, kind="stable")
+    reservations = pd.DataFrame({
+        "reservation_id": 2000000000000000 + np.arange(len(first)),
+        "guest_name": names[guest_rows],
+        "contact": contacts[guest_rows],
+        "room_number": np.where(status == "un-check-in", "Un-Arrange", numbers[room_rows]),
+        "room_type": room_types[room_rows],
+        "reserved_date": pd.to_datetime(first).strftime("%Y%m%d").astype(int),
+        "day": nights,
+        "is_check-in": status,
+        "order_amount": (prices[room_rows] * nights).astype(float)
+    }).iloc[order]
+    reservations["reservation_id"] = 2000000000000000 + np.arange(len(reservations))
+    reservations.to_csv(os.path.join(directory, "reservations.csv"), index=False)
+
+    occupied = set(reservations.loc[reservations["is_check-in"] == "Checked-in", "room_number"])
+    pd.DataFrame({"Room Number": numbers, "Room Type": room_types,
+                  "Status": ["Occupied" if number in occupied else "Available" for number in numbers]}) \
+        .to_csv(os.path.join(directory, "rooms.csv"), index=False)
+
+    feedback_rows = rng.integers(0, guests, size=feedback)
+    pd.DataFrame({"name": names[feedback_rows], "contact": contacts[feedback_rows],
+                  "rate": rng.integers(1, 11, size=feedback), "comment": rng.choice(COMMENTS, size=feedback)}) \
+        .to_csv(os.path.join(directory, "feedback.csv"), index=False)
+
+    occupied = sorted(occupied)
+    cleaned = rng.choice(occupied, size=min(housekeeping, len(occupied)), replace=False) if occupied else []
+    hours = rng.integers(7, 20, len(cleaned))
+    pd.DataFrame({"Room": cleaned, "Date": datetime.now().strftime("%y-%m-%d"),
+                  "Schedule Time": [f"{hour:02d}:00-{hour + 1:02d}:00" for hour in hours]}) \
+        .to_csv(os.path.join(directory, "housekeeping_schedule.csv"), index=False)
+    return {"rooms": rooms, "guests": guests, "reservations": len(reservations), "feedback": feedback,
+            "housekeeping": len(cleaned)}
+
+
+def summary(seconds, peak):
+    seconds = np.array(seconds)
+    p50, p95, p99 = np.percentile(seconds * 1000, [50, 95, 99])
+    return {"calls": len(seconds), "p50_ms": round(float(p50), 4), "p95_ms": round(float(p95), 4),
+            "p99_ms": round(float(p99), 4), "mean_ms": round(float(seconds.mean() * 1000), 4),
+            "ops_per_s": round(float(len(seconds) / seconds.sum()), 1) if seconds.sum() else None,
+            "peak_kb": round(peak / 1024, 1)}
+
+
+def measure(calls):
+    # the first call is traced for its peak memory, the other calls are timed without tracing
+    tracemalloc.start()
+    calls[0]()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    seconds = []
+    for call in calls[1:]:
+        start = time.perf_counter()
+        call()
+        seconds.append(time.perf_counter() - start)
+    return summary(seconds or [0.0], peak)
+
+
+def run(data_dir, calls = 200, storage = None):
+    # time the core operations on a copy of the data, storage: {"journal": True} / {"columnar": True} / ...
+    storage = storage or {}
+    work_dir = tempfile.mkdtemp(prefix="hms_bench_")
+    results = {}
+    try:
+        for file_name in os.listdir(data_dir):
+            if file_name.endswith(".csv"):
+                shutil.copy(os.path.join(data_dir, file_name), work_dir)
+        files = {key: os.path.join(work_dir, name) for key, name in TABLE_FILES.items()}
+        if storage.get("database"):
+            storage = dict(storage, database=os.path.join(work_dir, "hotel.db"))
+        if storage.get("columnar"):
+            # the tables read from the columnar format have to be converted first, or the csv files are read
+            for key in ("reservations_file", "guests_file", "feedback_file"):
+                if os.path.exists(files[key]):
+                    columnar.convert_csv(files[key])
+        files["rates_file"] = os.path.join(work_dir, "rates.csv")
+
+        def startup():
+            hms = HotelManagementSystem(**files, **storage)
+            for table in ("rooms", "guests", "reservations"):
+                getattr(hms, table)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            results["startup"] = measure([startup] * 6)
+            hms = HotelManagementSystem(**files, **storage)
+            available = {room_type: len(rooms) for room_type, rooms in hms.available_rooms.items()}
+            room_type = max(available, key=available.get) if available else "SingleRoom"
+            count = max(min(calls, available.get(room_type, 0) - 1), 1)
+            # far in the future, where the generated stays do not fill the rooms
+            day = (datetime.now() + timedelta(days=500)).strftime("%Y%m%d")
+            ids = []
+
+            def reserve(i):
+                ids.append(hms.reserve(f"Bench {i}", 900000000 + i, room_type, day, 2)["reservation_id"])
+
+            results["add_reservation"] = measure([lambda i=i: reserve(i) for i in range(count + 1)])
+            rooms = []
+            results["check_in"] = measure([lambda i=i: rooms.append(hms.check_in_order(ids[i])["room_number"])
+                                           for i in range(len(ids))])
+            results["check_out"] = measure([lambda i=i: hms.check_out_room(rooms[i]) for i in range(len(rooms))])
+            results["add_guest"] = measure([lambda i=i: hms.add_guest(Guest(f"Bench {i}", 900000000 + i))
+                                            for i in range(calls + 1)])
+            results["register_to_member"] = measure([lambda i=i: hms.register_to_member(f"Bench {i}", 900000000 + i)
+                                                     for i in range(calls + 1)])
+            results["housekeeping_schedule_display"] = measure([hms.housekeeping_schedule_display] * 21)
+            results["get_available_rooms"] = measure([hms.get_available_rooms] * 21)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def memory_report(data_dir):
+    # the memory of every table as pandas reads it and with the column types of the schema, per million rows
+    rows = []
+    for name in TABLE_FILES.values():
+        path = os.path.join(data_dir, name)
+        if not os.path.exists(path):
+            continue
+        table = os.path.splitext(name)[0]
+        raw = pd.read_csv(path)
+        start = time.perf_counter()
+        data = typed(SCHEMAS.get(table), raw)
+        seconds = time.perf_counter() - start
+        per_million = 1000000 / len(raw) if len(raw) else 0
+        rows.append({"table": table, "rows": len(raw), "raw_mb": round(memory(raw) * per_million / 2 ** 20, 1),
+                     "typed_mb": round(memory(data) * per_million / 2 ** 20, 1),
+                     "typing_ms": round(seconds * 1000, 1)})
+    table = pd.DataFrame(rows).set_index("table")
+    table["saved"] = (1 - table["typed_mb"] / table["raw_mb"]).round(3)
+    print("memory per million rows")
+    print(table.to_string())
+    return table
+
+
+def compare(results, baseline, threshold = 0.2):
+    # the operations whose p50 is more than threshold (0.2 is 20%) slower than in the baseline
+    regressions = {}
+    for operation, result in results.items():
+        before = baseline.get(operation)
+        if before and before["p50_ms"] and result["p50_ms"] > before["p50_ms"] * (1 + threshold):
+            regressions[operation] = round(result["p50_ms"] / before["p50_ms"], 2)
+    return regressions
+
+
+def report(results, baseline = None, threshold = 0.2):
+    table = pd.DataFrame(results).T[["calls", "p50_ms", "p95_ms", "p99_ms", "ops_per_s", "peak_kb"]]
+    regressions = compare(results, baseline, threshold) if baseline else {}
+    if baseline:
+        table["baseline_p50_ms"] = [baseline.get(operation, {}).get("p50_ms") for operation in table.index]
+        table["regression"] = [f"x{regressions[operation]}" if operation in regressions else ""
+                               for operation in table.index]
+    print(table.to_string())
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic hotel and time the core operations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate_parser = commands.add_parser("generate", help="write the csv files of a synthetic hotel")
+    generate_parser.add_argument("directory")
+    generate_parser.add_argument("--rooms", type=int, default=2000)
+    generate_parser.add_argument("--guests", type=int, default=100000)
+    generate_parser.add_argument("--years", type=float, default=2)
+    generate_parser.add_argument("--feedback", type=int, default=20000)
+    generate_parser.add_argument("--housekeeping", type=int, default=500)
+    run_parser = commands.add_parser("run", help="time the operations on a copy of the data")
+    run_parser.add_argument("directory")
+    run_parser.add_argument("--calls", type=int, default=200)
+    run_parser.add_argument("--journal", action="store_true")
+    run_parser.add_argument("--columnar", action="store_true")
+    run_parser.add_argument("--database", action="store_true", help="use the sqlite storage")
+    run_parser.add_argument("--save", help="save the results as a baseline json file")
+    run_parser.add_argument("--compare", help="flag the regressions against a baseline json file")
+    run_parser.add_argument("--threshold", type=float, default=0.2)
+    memory_parser = commands.add_parser("memory", help="compare the memory of the tables read raw and typed")
+    memory_parser.add_argument("directory")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        print(generate(args.directory, args.rooms, args.guests, args.years, args.feedback, args.housekeeping))
+        return
+    if args.command == "memory":
+        memory_report(args.directory)
+        return
+    storage = {key: True for key in ("journal", "columnar", "database") if getattr(args, key)}
+    results = run(args.directory, args.calls, storage)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    regressions = report(results, baseline, args.threshold)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"date": datetime.now().isoformat(timespec="seconds"), "storage": storage,
+                       "results": results}, f, indent=2)
+    if regressions:
+        print(f"{len(regressions)} operations are slower than the baseline: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
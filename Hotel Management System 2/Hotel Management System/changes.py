@@ -0,0 +1,258 @@
+import bisect
+import contextlib
+import itertools
+import json
+import os
+import time
+from datetime import datetime
+
+from lazy_import import LazyImport
+from locking import FileLock
+from schema import SCHEMAS, stored_records
+from storage import write_atomic
+
+pd = LazyImport("pandas")
+
+# the events of a segment file, a reader starting at a sequence number skips at most this many lines
+SEGMENT_EVENTS = 10000
+# the key of the rows of every table in the events, the tables without one only get new rows
+TABLE_KEYS = {
+    "rooms": ["Room Number"],
+    "guests": ["name", "contact"],
+    "reservations": ["reservation_id"],
+    "waitlist": ["reservation_id"]
+}
+
+
+def event_name(table, kind, row, changes = None):
+    # what happened, from the table, the kind of change and the columns changed
+    changes = changes or {}
+    if table == "reservations":
+        if kind == "delete":
+            return "reservation_archived"
+        if kind == "insert":
+            return "reservation_created"
+        status = changes.get("is_check-in")
+        if status == "Checked-in":
+            return "checked_in"
+        if status == "Checked-out":
+            return "checked_out"
+        return "reservation_changed"
+    if table == "rooms":
+        return "room_added" if kind == "insert" else "room_status_changed" if "Status" in changes else "room_changed"
+    if table == "guests":
+        return "guest_added" if kind == "insert" else "guest_upgraded" if changes.get("membership") else \
+            "guest_changed"
+    if table == "housekeeping_schedule":
+        return "housekeeping_scheduled"
+    if table == "feedback":
+        return "feedback_posted"
+    if table == "waitlist":
+        return "waitlisted" if kind == "insert" else "waitlist_assigned" if changes.get("status") == "Assigned" \
+            else "waitlist_left"
+    return f"{table}_{kind}"
+
+
+def row_key(table, row):
+    keys = TABLE_KEYS.get(table)
+    if keys is None:
+        return None
+    return [str(row.get(key)).strip() for key in keys]
+
+
+class ChangeLog:
+    # the ordered, durable stream of the changes of the tables: one json line per changed row, numbered from 1 by
+    # seq, in segment files "changes/<first seq>.jsonl" next to the data. the events of an operation are prepared
+    # in "changes/prepared.<last seq>.<pid>.json" before its tables are saved, and appended once they are, holding the lock of the
+    # data directory, so the numbers follow the order of the changes across the processes. a consumer reads the
+    # events after the last number it has seen, the segments before that number are not opened
+    def __init__(self, directory):
+        self.directory = directory
+
+    def prepared_paths(self):
+        # the events prepared and not appended yet, in the order they were prepared
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted((int(name.split(".")[1]), name) for name in os.listdir(self.directory)
+                       if name.startswith("prepared.") and name.endswith(".json"))
+        return [os.path.join(self.directory, name) for number, name in names]
+
+    def lock(self):
+        # appending and recovering the prepared events: with sqlite the tables are saved when the lock of the data
+        # directory is given back, the prepared events are appended after that, by the operation or the next one
+        os.makedirs(self.directory, exist_ok=True)
+        return FileLock(os.path.join(self.directory, ".changes.lock"))
+
+    def prepare(self, events, versions):
+        # keep the events of the operation before its tables are saved, with the versions the tables will have
+        # then and the number of the last event before them. returns the file of the events, for commit()
+        with self.lock():
+            last = self.last_sequence()
+            prepared = {"last": last, "versions": versions, "events": events}
+            path = os.path.join(self.directory, f"prepared.{last:020d}.{os.getpid()}.json")
+            write_atomic(path, lambda f: json.dump(prepared, f, default=str))
+        return path
+
+    def commit(self, path):
+        # the tables are saved: append the prepared events, unless the next operation has done it already
+        with self.lock():
+            self.recover_file(path, lambda table: float("inf"))
+
+    def recover(self, version):
+        # append the events prepared by the operations that stopped before appending them (a crash, a failure
+        # saving the tables, or their tables saved when the lock was given back). version(table) is the version the
+        # table has now: the events of the tables that reached the version prepared were saved
+        with contextlib.ExitStack() as stack:
+            if os.path.isdir(self.directory):
+                stack.enter_context(self.lock())
+            return sum(self.recover_file(path, version) for path in self.prepared_paths())
+
+    def recover_file(self, path, version):
+        try:
+            with open(path, encoding="utf-8") as f:
+                prepared = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            # half written, the operation stopped before saving its tables
+            os.remove(path)
+            return 0
+        # when the events were being appended, the ones left
+        done = self.last_sequence() - prepared["last"]
+        events = prepared["events"]
+        if done > 0:
+            events = events[done:]
+        else:
+            events = [event for event in events if version(event["table"]) >= prepared["versions"][event["table"]]]
+        self.append(events)
+        os.remove(path)
+        return len(events)
+
+    def segments(self):
+        # the first sequence number of every segment file, in order
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(int(name[:-6]) for name in os.listdir(self.directory)
+                      if name.endswith(".jsonl") and name[:-6].isdigit())
+
+    def path(self, first):
+        return os.path.join(self.directory, f"{first:020d}.jsonl")
+
+    def last_sequence(self):
+        # the number of the last event, 0 when there is none. a line left half written by a crash is cut off, the
+        # operation it belonged to was not finished
+        segments = self.segments()
+        if not segments:
+            return 0
+        path = self.path(segments[-1])
+        with open(path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            tail = b""
+            while size and tail.count(b"\n") < 2:
+                step = min(size, 4096)
+                size -= step
+                f.seek(size)
+                tail = f.read(step) + tail
+            if tail and not tail.endswith(b"\n"):
+                f.truncate(size + tail.rfind(b"\n") + 1)
+                tail = tail[:tail.rfind(b"\n") + 1]
+        lines = tail.splitlines()
+        return json.loads(lines[-1])["seq"] if lines else segments[-1] - 1
+
+    def append(self, events):
+        # number the events and write them, returns the number of the last one
+        if not events:
+            return self.last_sequence()
+        os.makedirs(self.directory, exist_ok=True)
+        last = self.last_sequence()
+        segments = self.segments()
+        first = segments[-1] if segments else 1
+        stamp = datetime.now().isoformat(timespec="milliseconds")
+        f = None
+        try:
+            for event in events:
+                last += 1
+                if f is None or last - first >= SEGMENT_EVENTS:
+                    if f is not None:
+                        f.flush()
+                        os.fsync(f.fileno())
+                        f.close()
+                    if last - first >= SEGMENT_EVENTS:
+                        first = last
+                    f = open(self.path(first), "a", encoding="utf-8")
+                f.write(json.dumps(dict(event, seq=last, time=stamp), default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            if f is not None:
+                f.close()
+        return last
+
+    def read(self, after = 0, limit = None):
+        # the events numbered after `after`, in order, at most limit of them
+        segments = self.segments()
+        start = max(bisect.bisect_right(segments, after) - 1, 0)
+        events = []
+        for first in segments[start:]:
+            with open(self.path(first), encoding="utf-8") as f:
+                # the line of an event is its number minus the first number of the segment
+                for line in itertools.islice(f, max(after + 1 - first, 0), None):
+                    if not line.endswith("\n"):
+                        # being written
+                        return events
+                    events.append(json.loads(line))
+                    if limit is not None and len(events) >= limit:
+                        return events
+        return events
+
+    def follow(self, after = 0, interval = 0.5, idle = None):
+        # yield the events after `after` as they are written, stop after idle seconds without one (never if None)
+        waited = 0.0
+        while idle is None or waited < idle:
+            events = self.read(after, SEGMENT_EVENTS)
+            if not events:
+                time.sleep(interval)
+                waited += interval
+                continue
+            waited = 0.0
+            for event in events:
+                after = event["seq"]
+                yield event
+
+
+class Replica:
+    # a copy of the tables kept up to date from the change log: the rows by key, and the position in the log.
+    # sync() only reads the events written since the last one, whatever the size of the tables
+    def __init__(self, change_log, tables = None, sequence = 0):
+        # tables: the dataframes of the tables in memory
+        self.log = change_log
+        self.sequence = sequence
+        self.tables = {}
+        for table, rows in (tables or {}).items():
+            self.tables[table] = {}
+            for row in stored_records(SCHEMAS.get(table), rows):
+                self.put(table, row)
+
+    def put(self, table, row):
+        key = row_key(table, row)
+        # the rows of a table without key are numbered
+        key = len(self.tables.setdefault(table, {})) if key is None else tuple(key)
+        self.tables[table][key] = row
+
+    def apply(self, event):
+        if event["kind"] == "delete":
+            if event["key"] is not None:
+                self.tables.get(event["table"], {}).pop(tuple(event["key"]), None)
+        else:
+            self.put(event["table"], event["row"])
+        self.sequence = event["seq"]
+
+    def sync(self, limit = None):
+        # apply the new events, returns how many
+        events = self.log.read(self.sequence, limit)
+        for event in events:
+            self.apply(event)
+        return len(events)
+
+    def frame(self, table):
+        return pd.DataFrame(list(self.tables.get(table, {}).values()))
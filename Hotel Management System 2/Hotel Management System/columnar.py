@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import shutil
+
+from lazy_import import LazyImport
+
+np = LazyImport("numpy")
+pd = LazyImport("pandas")
+
+
+# a table in the columnar format is a directory "<name>.cols" with one generation directory per save:
+#   <name>.cols/CURRENT           the name of the current generation
+#   <name>.cols/g000001/schema.json  number of rows and how every column is stored
+#   <name>.cols/g000001/<i>.npy   numbers and booleans, or the codes of a "dictionary" text column
+#   <name>.cols/g000001/<i>.offsets.npy + <i>.bytes  the utf-8 text of a "text" column
+# every file is opened with numpy memory mapping, nothing is parsed, and only the columns asked for are read.
+
+
+def columns_path(file_path):
+    # reservations.csv -> reservations.cols
+    return os.path.splitext(file_path)[0] + ".cols"
+
+
+def _numeric(column):
+    # the column as numbers if it only holds numbers, the same way read_csv would read it back
+    if column.dtype.kind in "iufb":
+        return column.to_numpy()
+    if column.isna().any():
+        return None
+    try:
+        return pd.to_numeric(column).to_numpy()
+    except (ValueError, TypeError):
+        return None
+
+
+def _exact(values, dtype):
+    # the values that are numbers of the dtype as they are: "445" is 445, 1.5 is no value of an int column
+    kept = []
+    for value in values:
+        if isinstance(value, str):
+            try:
+                value = pd.to_numeric(value)
+            except (ValueError, TypeError):
+                continue
+        if isinstance(value, np.generic):
+            value = value.item()
+        try:
+            number = np.asarray(value).astype(dtype)
+        except (ValueError, TypeError, OverflowError):
+            continue
+        if number.item() == value:
+            kept.append(number)
+    return np.array(kept, dtype=dtype)
+
+
+def write_columns(data, path):
+    # save the dataframe as a new generation of the table, the generations before the previous one are removed
+    # afterwards. returns the number of bytes written
+    os.makedirs(path, exist_ok=True)
+    current = read_current(path)
+    generation = "g%06d" % (int(current[1:]) + 1 if current else 1)
+    directory = os.path.join(path, generation)
+    os.makedirs(directory)
+    schema = {"rows": len(data), "columns": []}
+    for i, name in enumerate(data.columns):
+        column = data[name]
+        numbers = _numeric(column)
+        entry = {"name": name}
+        if numbers is not None:
+            entry["kind"] = "numeric"
+            np.save(os.path.join(directory, f"{i}.npy"), numbers)
+        else:
+            text = column.astype(object).where(column.notna(), None)
+            values = pd.unique(text.dropna())
+            if len(values) <= max(len(text) // 2, 1) and len(values) < 2 ** 31:
+                # few different values: store them once and a code per row, -1 is empty
+                codes = pd.Categorical(text, categories=values).codes.astype(np.int32)
+                entry["kind"] = "dictionary"
+                entry["values"] = [str(value) for value in values]
+                np.save(os.path.join(directory, f"{i}.npy"), codes)
+            else:
+                encoded = [b"" if value is None else str(value).encode("utf-8") for value in text]
+                offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+                np.cumsum([len(value) for value in encoded], out=offsets[1:])
+                entry["kind"] = "text"
+                entry["nulls"] = [int(row) for row in np.flatnonzero(text.isna().to_numpy())]
+                np.save(os.path.join(directory, f"{i}.offsets.npy"), offsets)
+                with open(os.path.join(directory, f"{i}.bytes"), "wb") as f:
+                    f.write(b"".join(encoded))
+        schema["columns"].append(entry)
+    with open(os.path.join(directory, "schema.json"), "w") as f:
+        json.dump(schema, f)
+
+    # switch to the new generation in one step, then remove the old ones. the previous generation is kept until the
+    # next save, for the ColumnTables opened before the switch that have not read all their columns yet
+    temp_path = os.path.join(path, f"CURRENT.{os.getpid()}.tmp")
+    with open(temp_path, "w") as f:
+        f.write(generation)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, os.path.join(path, "CURRENT"))
+    for name in os.listdir(path):
+        if name.startswith("g") and name not in (generation, current):
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def read_current(path):
+    try:
+        with open(os.path.join(path, "CURRENT")) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def pieces(text, starts, ends):
+    # the bytes text[start:end] of every row. the part of the file from the first row to the last one is read at
+    # once when the rows fill most of it, else every row is read by itself
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if not len(starts):
+        return []
+    first, last = int(starts.min()), int(ends.max())
+    if last - first <= 2 * int((ends - starts).sum()) + 4096:
+        data = text[first:last].tobytes()
+        return [data[start:end] for start, end in zip((starts - first).tolist(), (ends - first).tolist())]
+    return [text[start:end].tobytes() for start, end in zip(starts.tolist(), ends.tolist())]
+
+
+class ColumnTable:
+    # a table in the columnar format opened for reading
+    def __init__(self, path):
+        generation = read_current(path)
+        if generation is None:
+            raise FileNotFoundError(path)
+        self.directory = os.path.join(path, generation)
+        with open(os.path.join(self.directory, "schema.json")) as f:
+            self.schema = json.load(f)
+        self.entries = {entry["name"]: (i, entry) for i, entry in enumerate(self.schema["columns"])}
+
+    def __len__(self):
+        return self.schema["rows"]
+
+    @property
+    def columns(self):
+        return list(self.entries)
+
+    def raw(self, name):
+        # the memory mapped array of a numeric column, or the codes of a dictionary column
+        i, entry = self.entries[name]
+        return np.load(os.path.join(self.directory, f"{i}.npy"), mmap_mode="r")
+
+    def column(self, name, rows = None):
+        # the values of the column (only the rows asked for) as a numpy array
+        i, entry = self.entries[name]
+        if entry["kind"] == "numeric":
+            values = self.raw(name)
+            return np.asarray(values if rows is None else values[rows])
+        if entry["kind"] == "dictionary":
+            codes = self.raw(name)
+            codes = np.asarray(codes if rows is None else codes[rows])
+            values = np.array(entry["values"] + [None], dtype=object)
+            return values[codes]
+        offsets, text = self.text(name)
+        starts = offsets[:-1] if rows is None else offsets[:-1][rows]
+        ends = offsets[1:] if rows is None else offsets[1:][rows]
+        values = np.array([value.decode("utf-8") for value in pieces(text, starts, ends)], dtype=object)
+        nulls = np.isin(np.arange(len(self)) if rows is None else rows, entry["nulls"])
+        values[nulls] = None
+        return values
+
+    def text(self, name):
+        # the offsets of a text column and its memory mapped utf-8 bytes, row i is text[offsets[i]:offsets[i + 1]].
+        # nothing is read until the rows are sliced, see pieces
+        i, entry = self.entries[name]
+        offsets = np.load(os.path.join(self.directory, f"{i}.offsets.npy"), mmap_mode="r")
+        if not offsets[-1]:
+            return offsets, np.zeros(0, dtype=np.uint8)
+        return offsets, np.memmap(os.path.join(self.directory, f"{i}.bytes"), dtype=np.uint8, mode="r")
+
+    def match(self, name, values):
+        # a boolean mask of the rows where the column is one of the values, reading only that column
+        i, entry = self.entries[name]
+        if entry["kind"] == "numeric":
+            column = self.raw(name)
+            return np.isin(column, _exact(values, column.dtype))
+        if entry["kind"] == "dictionary":
+            wanted = [code for code, value in enumerate(entry["values"]) if value in {str(v) for v in values}]
+            return np.isin(self.raw(name), wanted)
+        # only the rows as long as one of the values are decoded and compared
+        offsets, text = self.text(name)
+        wanted = {str(value).encode("utf-8") for value in values}
+        lengths = np.diff(offsets)
+        rows = np.flatnonzero(np.isin(lengths, [len(value) for value in wanted]))
+        mask = np.zeros(len(self), dtype=bool)
+        mask[rows] = [value in wanted for value in pieces(text, offsets[:-1][rows], offsets[1:][rows])]
+        mask[entry["nulls"]] = False
+        return mask
+
+    def to_frame(self, columns = None, rows = None):
+        # the table as a dataframe, only with the columns (and rows) asked for
+        columns = self.columns if columns is None else columns
+        index = pd.RangeIndex(len(self)) if rows is None else pd.Index(rows)
+        return pd.DataFrame({name: self.column(name, rows) for name in columns}, index=index)
+
+    def find(self, conditions, columns = None):
+        # the rows where every column of the conditions is one of its values
+        mask = np.ones(len(self), dtype=bool)
+        for name, value in conditions.items():
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            mask &= self.match(name, values)
+        return self.to_frame(columns, np.flatnonzero(mask))
+
+
+def convert_csv(file_path):
+    # write the csv file in the columnar format next to it
+    data = pd.read_csv(file_path)
+    write_columns(data, columns_path(file_path))
+    return columns_path(file_path)
+
+
+def export_csv(file_path):
+    # write the columnar table back to its csv file
+    data = ColumnTable(columns_path(file_path)).to_frame()
+    data.to_csv(file_path, index=False)
+    return file_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert tables between csv and the columnar format")
+    parser.add_argument("action", choices=["convert", "export"])
+    parser.add_argument("files", nargs="+", help="csv files, e.g. reservations.csv guests.csv feedback.csv")
+    args = parser.parse_args()
+    for file_path in args.files:
+        done = convert_csv(file_path) if args.action == "convert" else export_csv(file_path)
+        print(f"{file_path} -> {done}")
+
+
+if __name__ == "__main__":
+    main()
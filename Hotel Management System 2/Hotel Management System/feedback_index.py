@@ -0,0 +1,283 @@
+import bisect
+import re
+
+from analytics import RATES, Analytics
+from lazy_import import LazyImport
+from occupancy import to_night, to_nights
+
+np = LazyImport("numpy")
+pd = LazyImport("pandas")
+
+# the words of a comment: letters and digits, lower case
+WORD = re.compile(r"\w+")
+# up to this many new rows are added one by one, more with the numpy path
+SMALL_ROWS = 64
+
+
+def comment_words(comment):
+    # the words of a comment, "Noisy at night, noisy!" -> ["noisy", "at", "night", "noisy"]
+    if comment is None or comment != comment:
+        return []
+    return WORD.findall(str(comment).lower())
+
+
+def grown(array, size, fill = 0):
+    # the array with room for size items, doubled so adding one row at a time stays O(1)
+    if size <= len(array):
+        return array
+    bigger = np.full(max(size, 2 * len(array), 16), fill, dtype=array.dtype)
+    bigger[:len(array)] = array
+    return bigger
+
+
+class Postings:
+    # the sorted rows of the comments with a word, in a numpy array with room to grow at the end
+    def __init__(self, rows = ()):
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.size = len(self.rows)
+
+    def __len__(self):
+        return self.size
+
+    def view(self):
+        return self.rows[:self.size]
+
+    def add(self, rows):
+        # rows: sorted. new rows come after the ones indexed, else (a row changed) they are merged in
+        if self.size and rows[0] <= self.rows[self.size - 1]:
+            self.rows = np.union1d(self.view(), rows)
+            self.size = len(self.rows)
+            return
+        self.rows = grown(self.rows, self.size + len(rows))
+        self.rows[self.size:self.size + len(rows)] = rows
+        self.size += len(rows)
+
+    def remove(self, row):
+        view = self.view()
+        position = np.searchsorted(view, row)
+        if position < self.size and view[position] == row:
+            self.rows = np.delete(view, position)
+            self.size -= 1
+
+
+class FeedbackIndex:
+    # the search index and the rating totals of the feedback table, kept up to date by index_rows:
+    # - words: word -> Postings, the rows of the comments with the word (an inverted index), the words in a sorted
+    #   list for the searches of the words starting with a text
+    # - the rate, the day and the guest of every row in numpy arrays, to filter the rows found
+    # - per guest the number and the sum of the rates, and per membership tier the per day histograms of the rates
+    #   (an Analytics per tier, the same totals as the hotel reports)
+    # a search intersects the rows of its words, the shortest first, and filters them with the arrays, so it does not
+    # depend on the size of the table but on the rows with the words. the rows are the index labels of the table
+    def __init__(self):
+        self.words = {}
+        self.vocabulary = []
+        self.size = 0
+        self.rates = np.zeros(0, dtype=np.int16)
+        self.days = np.zeros(0, dtype="datetime64[D]")
+        self.guests = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        # guest key -> guest number, and per guest number: the key, its tier (1 for the members), its rates
+        self.guest_numbers = {}
+        self.guest_keys = []
+        self.tiers = np.zeros(0, dtype=np.int8)
+        self.guest_counts = np.zeros(0, dtype=np.int64)
+        self.guest_sums = np.zeros(0, dtype=np.int64)
+        self.tier_ratings = [Analytics(), Analytics()]
+
+    @classmethod
+    def from_tables(cls, feedback, guests):
+        # the full rebuild, the members from the guests table
+        index = cls()
+        members = set()
+        if not guests.empty and "membership" in guests.columns:
+            member_rows = guests[guests["membership"].astype(bool)]
+            members = set(zip(member_rows["name"].astype(str).str.strip(),
+                              member_rows["contact"].astype(str).str.strip()))
+        index.add_rows(feedback, lambda name, contact: (str(name).strip(), str(contact).strip()) in members)
+        return index
+
+    def guest_number(self, name, contact, is_member):
+        key = (str(name).strip(), str(contact).strip())
+        number = self.guest_numbers.get(key)
+        if number is None:
+            number = self.guest_numbers[key] = len(self.guest_keys)
+            self.guest_keys.append(key)
+            self.tiers = grown(self.tiers, number + 1)
+            self.guest_counts = grown(self.guest_counts, number + 1)
+            self.guest_sums = grown(self.guest_sums, number + 1)
+            self.tiers[number] = 1 if is_member(name, contact) else 0
+        return number
+
+    def add_rows(self, rows, is_member, sign = 1):
+        # add the rows of the feedback table, sign -1 takes them away. is_member(name, contact) gives the tier of a
+        # guest seen for the first time, the tier of the others follows set_member
+        if rows is None or rows.empty or "comment" not in rows.columns:
+            return
+        labels = rows.index.to_numpy(dtype=np.int64)
+        rates = pd.to_numeric(rows["rate"], errors="coerce").to_numpy()
+        rated = ~np.isnan(rates)
+        rates = np.where(rated, rates, -1).astype(np.int16)
+        days = to_nights(rows["date"]) if "date" in rows.columns else \
+            np.full(len(rows), np.datetime64("NaT"), dtype="datetime64[D]")
+        if len(rows) > SMALL_ROWS:
+            # the guests and the comments are repeated, each one is looked at once
+            codes, keys = pd.MultiIndex.from_arrays([rows["name"].astype(str).str.strip(),
+                                                     rows["contact"].astype(str).str.strip()]).factorize()
+            numbers = np.array([self.guest_number(name, contact, is_member) for name, contact in keys],
+                               dtype=np.int64)[codes]
+            comment_codes, comments = pd.factorize(rows["comment"])
+            comments = comments.tolist()
+        else:
+            numbers = np.array([self.guest_number(name, contact, is_member)
+                                for name, contact in zip(rows["name"].tolist(), rows["contact"].tolist())],
+                               dtype=np.int64)
+            comment_codes, comments = np.arange(len(rows)), rows["comment"].tolist()
+        if len(labels) and sign > 0:
+            size = max(self.size, int(labels.max()) + 1)
+            self.rates = grown(self.rates, size, -1)
+            self.days = grown(self.days, size, np.datetime64("NaT"))
+            self.guests = grown(self.guests, size)
+            self.alive = grown(self.alive, size, False)
+            self.size = size
+            self.rates[labels], self.days[labels], self.guests[labels] = rates, days, numbers
+        self.alive[labels] = sign > 0
+        self.add_words(labels, comment_codes, [comment_words(comment) for comment in comments], sign)
+
+        # the totals of the rows with a rate
+        numbers, rates, days = numbers[rated], rates[rated], days[rated]
+        np.add.at(self.guest_counts, numbers, sign)
+        np.add.at(self.guest_sums, numbers, sign * rates.astype(np.int64))
+        self.add_ratings(self.tiers[numbers], rates, days, sign)
+
+    def add_words(self, labels, comment_codes, comment_words_list, sign):
+        # the rows to the postings of the words of their comments: the (word, row) pairs sorted by word and row,
+        # without the pairs of a word said twice in a comment
+        lengths = np.array([len(words) for words in comment_words_list] + [0], dtype=np.int64)
+        comment_codes = np.where(comment_codes < 0, len(lengths) - 1, comment_codes)
+        flat_codes, words = pd.factorize(np.array([word for words in comment_words_list for word in words],
+                                                  dtype=object))
+        if not len(words):
+            return
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        counts = lengths[comment_codes]
+        # the position in flat_codes of every word of every row
+        positions = np.repeat(starts[comment_codes] - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts) + \
+            np.arange(int(counts.sum()))
+        word_codes = flat_codes[positions]
+        pair_rows = np.repeat(labels, counts)
+        order = np.lexsort((pair_rows, word_codes))
+        word_codes, pair_rows = word_codes[order], pair_rows[order]
+        first = np.r_[True, (word_codes[1:] != word_codes[:-1]) | (pair_rows[1:] != pair_rows[:-1])]
+        word_codes, pair_rows = word_codes[first], pair_rows[first]
+        bounds = np.flatnonzero(np.diff(word_codes)) + 1
+        new_words = []
+        for word, rows in zip(words[np.unique(word_codes)], np.split(pair_rows, bounds)):
+            postings = self.words.get(word)
+            if sign < 0:
+                if postings is not None:
+                    for row in rows.tolist():
+                        postings.remove(row)
+                continue
+            if postings is None:
+                self.words[word] = Postings(rows)
+                new_words.append(word)
+            else:
+                postings.add(rows)
+        if len(new_words) > SMALL_ROWS:
+            self.vocabulary = sorted(self.vocabulary + new_words)
+        else:
+            for word in new_words:
+                bisect.insort(self.vocabulary, word)
+
+    def add_ratings(self, tiers, rates, days, sign):
+        for tier, ratings in enumerate(self.tier_ratings):
+            mask = tiers == tier
+            if mask.any():
+                ratings.add_ratings(pd.DataFrame({"rate": rates[mask], "date": days[mask]}), sign)
+
+    def set_member(self, key, member):
+        # a guest becoming a member (or not): the rates of the guest move to the totals of the new tier
+        number = self.guest_numbers.get(key)
+        if number is None or self.tiers[number] == int(member):
+            return
+        rows = np.flatnonzero((self.guests[:self.size] == number) & self.alive[:self.size] &
+                              (self.rates[:self.size] >= 0))
+        tiers = self.tiers[np.full(len(rows), number)]
+        self.add_ratings(tiers, self.rates[rows], self.days[rows], -1)
+        self.tiers[number] = int(member)
+        self.add_ratings(tiers ^ 1, self.rates[rows], self.days[rows], 1)
+
+    def word_rows(self, word):
+        # the rows of the comments with the word, or with a word starting with it for "nois*"
+        if not word.endswith("*"):
+            postings = self.words.get(word)
+            return postings.view() if postings is not None else np.zeros(0, dtype=np.int64)
+        prefix = word[:-1]
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\U0010ffff")
+        found = [self.words[word].view() for word in self.vocabulary[start:end]]
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
+
+    def search(self, words = None, member = None, min_rate = None, max_rate = None, start = None, end = None,
+               name = None, contact = None):
+        # the rows of the feedback with all the words (a word ending with * is a prefix), from the members (True)
+        # or the other guests (False), with a rate from min_rate to max_rate and a date from start to end (YYYYMMDD)
+        terms = []
+        for word in str(words or "").lower().split():
+            parts = WORD.findall(word)
+            if word.endswith("*") and parts:
+                parts[-1] += "*"
+            terms += parts
+        if terms:
+            found = sorted((self.word_rows(term) for term in terms), key=len)
+            rows = found[0]
+            for other in found[1:]:
+                # the rows found so far looked up in the longer lists, O(rows log other)
+                positions = np.minimum(np.searchsorted(other, rows), len(other) - 1)
+                rows = rows[other[positions] == rows] if len(other) else other
+        else:
+            rows = np.arange(self.size)
+        keep = self.alive[rows]
+        if min_rate is not None:
+            keep &= self.rates[rows] >= int(min_rate)
+        if max_rate is not None:
+            keep &= (self.rates[rows] <= int(max_rate)) & (self.rates[rows] >= 0)
+        if start is not None or end is not None:
+            first = to_night(start) if start is not None else np.datetime64("0001-01-01")
+            last = to_night(end) if end is not None else np.datetime64("9999-12-31")
+            if first is None or last is None:
+                raise ValueError("Invalid date format! Please use the YYYYMMDD format.")
+            days = self.days[rows]
+            keep &= (days >= first) & (days <= last)
+        if name is not None or contact is not None:
+            number = self.guest_numbers.get((str(name).strip(), str(contact).strip()))
+            keep &= self.guests[rows] == (-1 if number is None else number)
+        if member is not None:
+            keep &= self.tiers[self.guests[rows]] == int(bool(member))
+        return rows[keep]
+
+    def ratings(self, member = None, start = None, end = None):
+        # the number, average and histogram of the rates of the tier (both without one) from start to end, all of
+        # them without a period
+        histogram = np.zeros(RATES, dtype=np.int64)
+        total = 0
+        for tier, ratings in enumerate(self.tier_ratings):
+            if member is not None and tier != int(bool(member)):
+                continue
+            if start is None and end is None:
+                histogram += ratings.ratings.sum(axis=0) + ratings.undated_ratings
+                total += int(ratings.rating_sum.sum()) + ratings.undated_rating_sum
+            else:
+                rows, days = ratings.period(start if start is not None else "00010101",
+                                            end if end is not None else "99991231")
+                histogram += ratings.ratings[rows].sum(axis=0)
+                total += int(ratings.rating_sum[rows].sum())
+        count = int(histogram.sum())
+        return {"count": count, "average": round(total / count, 2) if count else None,
+                "histogram": dict(zip(range(1, RATES + 1), histogram.tolist()))}
+
+    def guest_ratings(self, name, contact):
+        number = self.guest_numbers.get((str(name).strip(), str(contact).strip()))
+        count = int(self.guest_counts[number]) if number is not None else 0
+        return {"count": count, "average": round(int(self.guest_sums[number]) / count, 2) if count else None}
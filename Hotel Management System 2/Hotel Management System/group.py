@@ -0,0 +1,176 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from HMS import HotelManagementSystem
+from lazy_import import LazyImport
+from metrics import REGISTRY
+
+np = LazyImport("numpy")
+pd = LazyImport("pandas")
+
+# the data files of a property, all in its own directory
+PROPERTY_FILES = {
+    "rooms_file": "rooms.csv",
+    "guests_file": "guests.csv",
+    "reservations_file": "reservations.csv",
+    "house_keeping_file": "housekeeping_schedule.csv",
+    "feedback_file": "feedback.csv",
+    "rates_file": "rates.csv",
+    "waitlist_file": "waitlist.csv"
+}
+# the tables load() reads up front, the others are loaded the first time they are used as usual
+LOADED_TABLES = ("rooms", "guests", "reservations")
+
+
+def property_options(directory, options):
+    # the HotelManagementSystem arguments of the property in the directory, a sqlite database file is in it too
+    options = dict(options)
+    if options.get("database") is not None:
+        options["database"] = os.path.join(directory, options["database"])
+    return dict({key: os.path.join(directory, name) for key, name in PROPERTY_FILES.items()}, **options)
+
+
+def read_tables(directory, options, tables):
+    # run by a worker process: the tables of the property as they are loaded, with their versions
+    hms = HotelManagementSystem(**property_options(directory, options))
+    return {table: (getattr(hms, table), hms.versions[table]) for table in tables}
+
+
+class HotelGroup:
+    # the properties of a hotel group in one process, one HotelManagementSystem per data directory.
+    # group[name] is the system of a property, its operations are the ones of a single hotel and run as fast.
+    # the group queries run on all the properties at once in a thread pool (scatter) and their results are put
+    # together (gather); the tables can be loaded in parallel by threads or by worker processes.
+    # a property should not be changed by another thread while a group query runs on it
+    def __init__(self, directories, workers = None, **options):
+        # directories: {name: data directory} or a list of directories named after their folder.
+        # options: the HotelManagementSystem options of every property (journal, columnar, database="hotel.db", ...)
+        if not isinstance(directories, dict):
+            directories = {os.path.basename(os.path.normpath(directory)): directory for directory in directories}
+        self.directories = dict(directories)
+        self.options = options
+        self.workers = workers or max(min(32, len(self.directories)), 1)
+        self.properties = {name: HotelManagementSystem(**property_options(directory, options))
+                           for name, directory in self.directories.items()}
+        # the table metrics of every property apart, see metrics.py
+        for name, directory in self.directories.items():
+            REGISTRY.name_property(directory, name)
+        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="hms-group")
+
+    @classmethod
+    def from_directory(cls, root, workers = None, **options):
+        # every folder of root with a rooms.csv file is a property
+        names = sorted(name for name in os.listdir(root) if os.path.exists(os.path.join(root, name, "rooms.csv")))
+        return cls({name: os.path.join(root, name) for name in names}, workers, **options)
+
+    def __getitem__(self, name):
+        return self.properties[name]
+
+    def __iter__(self):
+        return iter(self.properties)
+
+    def __len__(self):
+        return len(self.properties)
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def scatter(self, function, names = None):
+        # function(hms) run for every property (or the ones named) at the same time, {name: result}
+        names = list(self.properties) if names is None else list(names)
+        futures = {name: self.executor.submit(function, self.properties[name]) for name in names}
+        return {name: future.result() for name, future in futures.items()}
+
+    def load(self, tables = LOADED_TABLES, processes = False):
+        # load the tables of every property in parallel: in the thread pool, or in worker processes (the parsing
+        # then runs on all the cores, the tables are sent back pickled and their indexes built here)
+        tables = list(tables)
+        start = time.perf_counter()
+        if not processes:
+            self.scatter(lambda hms: [getattr(hms, table) for table in tables])
+        else:
+            with ProcessPoolExecutor(min(self.workers, os.cpu_count() or 1)) as pool:
+                futures = {name: pool.submit(read_tables, directory, self.options, tables)
+                           for name, directory in self.directories.items()}
+                for name, future in futures.items():
+                    for table, (data, version) in future.result().items():
+                        self.properties[name].use_table(table, data, version)
+        seconds = time.perf_counter() - start
+        rows = sum(len(getattr(hms, table)) for hms in self.properties.values() for table in tables)
+        print(f"{len(self.properties)} properties loaded in {seconds:.2f}s ({rows} rows)")
+        return seconds
+
+    def availability(self, room_type, start, nights = 1):
+        # the rooms of the type free for every night of the stay in every property, the most free first
+        counts = self.scatter(lambda hms: (hms.refresh(), hms.availability(room_type, start, nights))[1])
+        table = pd.DataFrame({"Property": list(counts), "Rooms": list(counts.values())})
+        table = table.sort_values("Rooms", ascending=False, kind="stable", ignore_index=True)
+        print(f"{int(table['Rooms'].sum())} {room_type} available from {start} for {nights} nights "
+              f"in {int((table['Rooms'] > 0).sum())} of {len(table)} properties")
+        return table
+
+    def guest_stays(self, name, contact, archived = True):
+        # the orders of the guest in all the properties, with the archived ones
+        stays = self.scatter(lambda hms: hms.reservation_history(archived=archived, guest_name=str(name).strip(),
+                                                                 contact=contact))
+        found = [orders.assign(property=property_name) for property_name, orders in stays.items() if not orders.empty]
+        if not found:
+            print(f"Unfound stays of {name}.")
+            return pd.DataFrame()
+        table = pd.concat(found, ignore_index=True)
+        # the property first
+        return table[["property"] + [column for column in table.columns if column != "property"]]
+
+    def housekeeping_load(self):
+        # today's cleanings of every property: the rooms to clean, the minutes of work and the part of the staff's
+        # time they take, with the busiest hour; the last row is the whole group
+        def plan_load(hms):
+            hms.refresh()
+            plan = hms.housekeeping_plan
+            scheduled = [hour for hour in plan.defaults.values() if hour is not None]
+            return {"Requests": len(plan.requests), "Defaults": len(scheduled),
+                    "Unscheduled": len(plan.defaults) - len(scheduled), "used": plan.used.copy(),
+                    "capacity": plan.capacity.copy()}
+
+        loads = self.scatter(plan_load)
+        rows = []
+        for property_name, load in list(loads.items()) + [("All", {
+                "Requests": sum(load["Requests"] for load in loads.values()),
+                "Defaults": sum(load["Defaults"] for load in loads.values()),
+                "Unscheduled": sum(load["Unscheduled"] for load in loads.values()),
+                "used": sum(load["used"] for load in loads.values()),
+                "capacity": sum(load["capacity"] for load in loads.values())})]:
+            used, capacity = np.asarray(load["used"]), np.asarray(load["capacity"])
+            share = used / np.where(capacity > 0, capacity, 1)
+            rows.append({"Property": property_name, "Requests": load["Requests"], "Defaults": load["Defaults"],
+                         "Unscheduled": load["Unscheduled"], "Minutes": int(used.sum()),
+                         "Load": round(float(used.sum() / capacity.sum()), 4) if capacity.sum() else None,
+                         "Busiest Hour": int(share.argmax()), "Busiest Load": round(float(share.max()), 4)})
+        return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the properties of a hotel group and run the group queries")
+    parser.add_argument("root", help="a folder with one data folder per property")
+    parser.add_argument("--processes", action="store_true", help="load the tables in worker processes")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--room-type", default="SingleRoom")
+    parser.add_argument("--start", default=time.strftime("%Y%m%d"))
+    parser.add_argument("--nights", type=int, default=1)
+    args = parser.parse_args()
+    with HotelGroup.from_directory(args.root, args.workers) as group:
+        group.load(processes=args.processes)
+        print(group.availability(args.room_type, args.start, args.nights).to_string(index=False))
+        print(group.housekeeping_load().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import bisect
+import difflib
+import re
+
+from lazy_import import LazyImport
+
+np = LazyImport("numpy")
+pd = LazyImport("pandas")
+
+# the keys added are kept in a sorted list, and merged into the sorted arrays once there are this many of them
+MERGE_EVERY = 4096
+# two contacts ending with the same digits are the same phone: "0086 13800138000" and "13800138000"
+PHONE_DIGITS = 8
+# the duplicate search compares the guests of a phone or a name with each other, and every name with the names
+# next to it in the sorted order; a phone or a name shared by more guests than this is left out (a hotel number,
+# a very common name), it would be thousands of pairs
+BLOCK_LIMIT = 50
+NEIGHBOURS = 3
+# after every other character, the end of a prefix range
+LAST = "\U0010ffff"
+
+
+def normalize_name(name):
+    # "  John   SMITH " -> "john smith"
+    return " ".join(str(name).lower().split())
+
+
+def normalize_phone(contact):
+    # the digits of the contact, "+86 138-0013-8000" -> "8613800138000", 100000001.0 -> "100000001"
+    if isinstance(contact, float) and contact == contact and contact == int(contact):
+        contact = int(contact)
+    return re.sub(r"\D", "", str(contact))
+
+
+def name_column(names):
+    # (the python string methods are faster than the .str accessor here)
+    return [" ".join(str(name).lower().split()) for name in names.tolist()]
+
+
+def phone_column(contacts):
+    if contacts.dtype.kind in "iu":
+        return contacts.to_numpy().astype(str).tolist()
+    return [normalize_phone(contact) for contact in contacts.tolist()]
+
+
+def similarity(first, second):
+    return difflib.SequenceMatcher(None, first, second).ratio()
+
+
+def close_phones(first, second):
+    # the same number with or without its country code, or with one digit typed wrong
+    if first[-PHONE_DIGITS:] == second[-PHONE_DIGITS:]:
+        return True
+    return len(first) == len(second) and sum(a != b for a, b in zip(first, second)) <= 1
+
+
+class SortedKeys:
+    # text keys and their rows sorted by key, for the prefix searches: numpy arrays sorted once, and the keys added
+    # since then in a sorted python list. the (key, row) taken away stay in the arrays until the next merge, they
+    # are skipped by the searches
+    def __init__(self, keys = (), rows = ()):
+        keys = np.asarray(keys, dtype=str)
+        rows = np.asarray(rows, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.rows = rows[order]
+        self.added = []
+        self.removed = set()
+
+    def __len__(self):
+        return len(self.keys) + len(self.added) - len(self.removed)
+
+    def add(self, key, row):
+        if (key, row) in self.removed:
+            # taken away and added again (a row that changed), it is still in the arrays
+            self.removed.discard((key, row))
+            return
+        bisect.insort(self.added, (key, row))
+        if len(self.added) >= MERGE_EVERY:
+            self.merge()
+
+    def remove(self, key, row):
+        position = bisect.bisect_left(self.added, (key, row))
+        if position < len(self.added) and self.added[position] == (key, row):
+            del self.added[position]
+        else:
+            self.removed.add((key, row))
+            if len(self.removed) >= MERGE_EVERY:
+                self.merge()
+
+    def merge(self):
+        # the arrays with the keys added and without the keys taken away
+        keys, rows = self.keys, self.rows
+        if self.removed:
+            keep = np.ones(len(keys), dtype=bool)
+            for position in np.flatnonzero(np.isin(rows, [row for key, row in self.removed])).tolist():
+                keep[position] = (str(keys[position]), int(rows[position])) not in self.removed
+            keys, rows = keys[keep], rows[keep]
+        if self.added:
+            new_keys = np.array([key for key, row in self.added], dtype=str)
+            # a longer key than the longest one so far needs wider strings
+            keys = keys.astype(np.result_type(keys, new_keys))
+            positions = np.searchsorted(keys, new_keys, "right")
+            keys = np.insert(keys, positions, new_keys)
+            rows = np.insert(rows, positions, [row for key, row in self.added])
+        self.keys, self.rows = keys, rows
+        self.added = []
+        self.removed = set()
+
+    def search(self, prefix, limit = None):
+        # the (key, row) of the keys starting with prefix in key order, the first limit of them
+        # a query wider than the keys would cast the whole array to its width on every search
+        width = self.keys.dtype.itemsize // 4
+        if len(prefix) > width:
+            start = end = 0
+        elif len(prefix) == width:
+            start, end = np.searchsorted(self.keys, prefix, "left"), np.searchsorted(self.keys, prefix, "right")
+        else:
+            start, end = np.searchsorted(self.keys, [prefix, prefix + LAST])
+        if limit is not None:
+            end = min(end, start + limit + len(self.removed))
+        found = [(key, row) for key, row in zip(self.keys[start:end].tolist(), self.rows[start:end].tolist())
+                 if (key, row) not in self.removed]
+        start = bisect.bisect_left(self.added, (prefix,))
+        end = bisect.bisect_left(self.added, (prefix + LAST,))
+        if end > start:
+            found = sorted(found + self.added[start:end])
+        return found if limit is None else found[:limit]
+
+    def runs(self):
+        # the rows of every key held by more than one row, BLOCK_LIMIT rows at most
+        self.merge()
+        if not len(self.keys):
+            return
+        starts = np.flatnonzero(np.r_[True, self.keys[1:] != self.keys[:-1]])
+        ends = np.r_[starts[1:], len(self.keys)]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if 1 < end - start <= BLOCK_LIMIT:
+                yield self.rows[start:end].tolist()
+
+
+class GuestSearch:
+    # the search indexes of the guests table, kept up to date by index_rows like the other indexes:
+    # - names: the normalized name and every end of it from a word on ("john smith", "smith"), so a prefix
+    #   finds a guest by the start of any of the names
+    # - contacts: the digits of the contact, for the prefix of a number
+    # - phones: the last PHONE_DIGITS digits reversed, so the guests with the same phone are one prefix range
+    # a search is a binary search of the sorted keys, the rows found are the index labels of the guests table
+    def __init__(self):
+        self.full_names = SortedKeys()
+        self.names = SortedKeys()
+        self.contacts = SortedKeys()
+        self.phones = SortedKeys()
+
+    @classmethod
+    def from_tables(cls, guests):
+        search = cls()
+        if guests.empty or "name" not in guests.columns:
+            return search
+        names = name_column(guests["name"])
+        phones = phone_column(guests["contact"])
+        rows = guests.index.to_numpy()
+        search.full_names = SortedKeys(names, rows)
+        ends, end_rows = [], []
+        for name, row in zip(names, rows.tolist()):
+            space = name.find(" ")
+            while space >= 0:
+                ends.append(name[space + 1:])
+                end_rows.append(row)
+                space = name.find(" ", space + 1)
+        search.names = SortedKeys(ends, end_rows)
+        search.contacts = SortedKeys(phones, rows)
+        search.phones = SortedKeys([phone[-PHONE_DIGITS:][::-1] for phone in phones], rows)
+        return search
+
+    def keys(self, name, contact):
+        # the keys of one guest in every index
+        name = normalize_name(name)
+        phone = normalize_phone(contact)
+        words = name.split(" ")
+        return [(self.full_names, name), (self.contacts, phone), (self.phones, phone[-PHONE_DIGITS:][::-1])] + \
+            [(self.names, " ".join(words[i:])) for i in range(1, len(words))]
+
+    def add_rows(self, rows, sign = 1):
+        # add the guests to the indexes, sign -1 takes them away
+        if rows is None or rows.empty or "name" not in rows.columns:
+            return
+        for row, name, contact in zip(rows.index.tolist(), rows["name"].tolist(), rows["contact"].tolist()):
+            for index, key in self.keys(name, contact):
+                if sign > 0:
+                    index.add(key, row)
+                else:
+                    index.remove(key, row)
+
+    def by_name(self, prefix, limit = None):
+        # the rows of the guests with a name or a word of it starting with prefix, the full names first
+        prefix = normalize_name(prefix)
+        rows = [row for key, row in self.full_names.search(prefix, limit)]
+        if limit is None or len(rows) < limit:
+            rows += [row for key, row in self.names.search(prefix, limit)]
+        return list(dict.fromkeys(rows))[:limit]
+
+    def by_contact(self, prefix, limit = None):
+        prefix = normalize_phone(prefix)
+        if not prefix:
+            return []
+        return [row for key, row in self.contacts.search(prefix, limit)]
+
+    def by_phone(self, contact):
+        # the rows of the guests whose contact ends with the same PHONE_DIGITS digits
+        phone = normalize_phone(contact)
+        if not phone:
+            return []
+        return [row for key, row in self.phones.search(phone[-PHONE_DIGITS:][::-1])
+                if len(key) == min(len(phone), PHONE_DIGITS)]
+
+    def search(self, name = None, contact = None, limit = 20):
+        # the rows of the guests matching the name prefix and the contact prefix (both when both are given)
+        if name is not None and contact is not None:
+            numbers = set(self.by_contact(contact))
+            return [row for row in self.by_name(name) if row in numbers][:limit]
+        if name is not None:
+            return self.by_name(name, limit)
+        if contact is not None:
+            return self.by_contact(contact, limit)
+        return []
+
+    def duplicates(self, guests, threshold = 0.85):
+        # the pairs of guests that are likely the same person: the same phone with a similar name, or a similar name
+        # (next to each other in the sorted names) with the same or a close phone
+        names = dict(zip(guests.index.tolist(), name_column(guests["name"])))
+        phones = dict(zip(guests.index.tolist(), phone_column(guests["contact"])))
+        pairs = {}
+
+        def compare(first, second, reason):
+            if first == second or (min(first, second), max(first, second)) in pairs:
+                return
+            # the phones first, comparing them is much cheaper than comparing the names
+            if reason != "same phone" and not close_phones(phones[first], phones[second]):
+                return
+            score = similarity(names[first], names[second])
+            if score >= threshold:
+                pairs[(min(first, second), max(first, second))] = (round(score, 3), reason)
+
+        for rows in self.phones.runs():
+            for i, first in enumerate(rows):
+                for second in rows[i + 1:]:
+                    compare(first, second, "same phone")
+        self.full_names.merge()
+        rows = self.full_names.rows.tolist()
+        for i, first in enumerate(rows):
+            for second in rows[i + 1:i + 1 + NEIGHBOURS]:
+                compare(first, second, "similar name")
+        for rows in self.full_names.runs():
+            for i, first in enumerate(rows):
+                for second in rows[i + 1:]:
+                    compare(first, second, "similar name")
+
+        table = pd.DataFrame([(first, second, score, reason) for (first, second), (score, reason) in pairs.items()],
+                             columns=["first", "second", "similarity", "reason"])
+        for column in ("first", "second"):
+            table[f"{column}_name"] = guests.loc[table[column], "name"].to_numpy()
+            table[f"{column}_contact"] = guests.loc[table[column], "contact"].to_numpy()
+        return table.sort_values(["similarity", "first"], ascending=[False, True], ignore_index=True)
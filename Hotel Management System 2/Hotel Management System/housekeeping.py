@@ -0,0 +1,137 @@
+from lazy_import import LazyImport
+
+np = LazyImport("numpy")
+pd = LazyImport("pandas")
+
+# minutes one cleaner needs for a room of the type, the other types take DEFAULT_MINUTES
+CLEANING_MINUTES = {"SingleRoom": 30, "DoubleRoom": 45, "LuxuryRoom": 60}
+DEFAULT_MINUTES = 30
+# the hours [first, last) the available rooms of the type are cleaned in when no guest asked for a time
+DEFAULT_HOURS = {"SingleRoom": (9, 14), "DoubleRoom": (9, 14), "LuxuryRoom": (7, 9)}
+
+
+def period(hour):
+    return f"{hour:02d}:00-{hour + 1:02d}:00"
+
+
+class HousekeepingPlan:
+    # the cleanings of one day in hour slots, every slot has staff x 60 minutes of work.
+    # the guest requests are put at the hour they asked for, and every available room is cleaned in the first slot
+    # of its default hours with time left. the plan is changed in place when a request is added or a room changes
+    # status, so showing it does not build it again.
+    def __init__(self, day, staff = 3, minutes = None):
+        self.day = day
+        self.minutes = dict(CLEANING_MINUTES if minutes is None else minutes)
+        self.capacity = np.full(24, staff * 60, dtype=np.int32)
+        self.used = np.zeros(24, dtype=np.int32)
+        # room -> (room type, status)
+        self.rooms = {}
+        # room -> hour of its default cleaning, None when there is no time left in its default hours
+        self.defaults = {}
+        # the rooms with a default cleaning in every hour, to move them when a guest asks for that hour
+        self.default_rooms = [dict() for hour in range(24)]
+        # (room, hour) of the guest requests
+        self.requests = []
+
+    @classmethod
+    def from_tables(cls, day, rooms, requests, staff = 3, minutes = None):
+        plan = cls(day, staff, minutes)
+        if "Room Number" in rooms.columns:
+            for number, room_type in zip(rooms["Room Number"].astype(str), rooms["Room Type"]):
+                plan.rooms[number] = (room_type, None)
+        # the requests already accepted keep their hour, even if the staff is smaller now
+        if "Room" in requests.columns:
+            for room, schedule_time in zip(requests["Room"].astype(str), requests["Schedule Time"].astype(str)):
+                hour = int(schedule_time[:2]) if schedule_time[:2].isdigit() else None
+                if hour is not None and 0 <= hour < 24:
+                    plan.request(room, hour, force=True)
+        if "Room Number" in rooms.columns:
+            for number, room_type, status in zip(rooms["Room Number"].astype(str), rooms["Room Type"],
+                                                 rooms["Status"]):
+                plan.set_room(number, room_type, status)
+        return plan
+
+    def duration(self, room):
+        room_type = self.rooms.get(room, (None, None))[0]
+        return self.minutes.get(room_type, DEFAULT_MINUTES)
+
+    def free(self, hour):
+        return int(self.capacity[hour] - self.used[hour])
+
+    def set_room(self, room, room_type, status):
+        # a room added or changing status: only the available rooms get a default cleaning
+        if self.rooms.get(room) == (room_type, status):
+            return
+        self.remove_default(room)
+        self.rooms[room] = (room_type, status)
+        if status == "Available":
+            self.place_default(room)
+
+    def default_hour(self, room, skip = None):
+        # the first of the room's default hours with time left for it
+        first, last = DEFAULT_HOURS.get(self.rooms[room][0], (9, 14))
+        minutes = self.duration(room)
+        for hour in range(first, last):
+            if hour != skip and self.free(hour) >= minutes:
+                return hour
+        return None
+
+    def place_default(self, room, hour = None):
+        hour = self.default_hour(room) if hour is None else hour
+        self.defaults[room] = hour
+        if hour is not None:
+            minutes = self.duration(room)
+            self.used[hour] += minutes
+            self.default_rooms[hour][room] = minutes
+        return hour
+
+    def remove_default(self, room):
+        hour = self.defaults.pop(room, None)
+        if hour is None:
+            return
+        self.used[hour] -= self.default_rooms[hour].pop(room)
+        self.fill(hour)
+
+    def fill(self, hour):
+        # time was freed in the hour, give it to the default cleanings that did not fit anywhere
+        for room in [room for room, placed in self.defaults.items() if placed is None]:
+            if self.default_hour(room) == hour:
+                self.place_default(room, hour)
+
+    def request(self, room, hour, force = False):
+        # put the guest's cleaning at the hour, the default cleanings of the hour are moved to other hours when
+        # the hour is full. False when there is still no time for it, unless force
+        minutes = self.duration(room)
+        for moved in list(self.default_rooms[hour]):
+            if self.free(hour) >= minutes:
+                break
+            other = self.default_hour(moved, skip=hour)
+            if other is not None:
+                self.used[hour] -= self.default_rooms[hour].pop(moved)
+                self.place_default(moved, other)
+        if self.free(hour) < minutes and not force:
+            return False
+        self.used[hour] += minutes
+        self.requests.append((room, hour))
+        return True
+
+    def next_free_hour(self, room, hour):
+        # the first hour from hour on with time for the room, None when the day is full
+        minutes = self.duration(room)
+        for later in range(hour, 24):
+            if self.free(later) >= minutes:
+                return later
+        return None
+
+    def free_hours(self, room = None):
+        minutes = DEFAULT_MINUTES if room is None else self.duration(room)
+        return [hour for hour in range(24) if self.free(hour) >= minutes]
+
+    def table(self):
+        # the plan of the day sorted by time, the rooms without time left are at the end as "Unscheduled"
+        rows = [(hour, room, period(hour), self.rooms.get(room, (None, None))[1], "Request")
+                for room, hour in self.requests]
+        rows += [(24 if hour is None else hour, room, "Unscheduled" if hour is None else period(hour),
+                  self.rooms[room][1], "Default") for room, hour in self.defaults.items()]
+        rows.sort(key=lambda row: row[0])
+        return pd.DataFrame([row[1:] for row in rows], columns=["Room", "Schedule Time", "Status", "Cleaning"])
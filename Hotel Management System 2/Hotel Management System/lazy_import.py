@@ -0,0 +1,14 @@
+import importlib
+
+
+class LazyImport:
+    # stands in for a module and imports it the first time one of its attributes is used,
+    # so "pd = LazyImport("pandas")" does not pay for importing pandas until pandas is needed
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
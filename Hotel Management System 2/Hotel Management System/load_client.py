@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from lazy_import import LazyImport
+
+np = LazyImport("numpy")
+
+
+class Connection:
+    # one keep-alive http connection to the server
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body = None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = b"" if body is None else json.dumps(body).encode("utf-8")
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(payload)}\r\n\r\n".encode("latin-1") + payload)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if not line.strip():
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            if key.strip().lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+
+
+def random_request(write_ratio):
+    # a reservation or a read, the reads are availability, quote and reservation lookups
+    room_type = random.choice(["SingleRoom", "DoubleRoom", "LuxuryRoom"])
+    day = (datetime.now() + timedelta(days=random.randint(30, 400))).strftime("%Y%m%d")
+    if random.random() < write_ratio:
+        guest = random.randint(1, 1000)
+        return "POST", "/reserve", {"client_name": f"load{guest}", "client_contact": guest, "room_type": room_type,
+                                    "reserved_date": day, "days": random.randint(1, 5)}
+    choice = random.random()
+    if choice < 0.5:
+        return "GET", f"/availability?room_type={room_type}&start={day}&nights=2", None
+    if choice < 0.8:
+        return "GET", f"/quote?room_type={room_type}&start={day}&nights=3", None
+    return "GET", f"/reservations?contact={random.randint(1, 1000)}", None
+
+
+async def run_load(host, port, connections, requests, write_ratio):
+    # send the requests over the connections at once, the latency of every request is measured
+    latencies = {"GET": [], "POST": []}
+    failed = 0
+    remaining = [requests]
+
+    async def worker():
+        nonlocal failed
+        connection = Connection(host, port)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                method, path, body = random_request(write_ratio)
+                start = time.perf_counter()
+                status, result = await connection.request(method, path, body)
+                latencies[method].append(time.perf_counter() - start)
+                if status != 200:
+                    failed += 1
+        finally:
+            await connection.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for i in range(connections)))
+    elapsed = time.perf_counter() - start
+    stats = (await Connection(host, port).request("GET", "/stats"))[1]
+    print(f"{requests} requests over {connections} connections in {elapsed:.2f}s, "
+          f"{requests / elapsed:.0f} requests/s, {failed} failed")
+    for method, values in latencies.items():
+        if values:
+            p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+            print(f"{method}: {len(values)} requests, p50 {p50:.2f}ms p95 {p95:.2f}ms p99 {p99:.2f}ms")
+    print(f"server: {stats['writes']} writes saved in {stats['saves']} saves")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="the part of the requests that are reservations")
+    args = parser.parse_args()
+    asyncio.run(run_load(args.host, args.port, args.connections, args.requests, args.write_ratio))
+
+
+if __name__ == "__main__":
+    main()
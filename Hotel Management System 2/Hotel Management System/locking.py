@@ -0,0 +1,56 @@
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    # an exclusive lock on a file, shared by all the processes using the same data directory.
+    # the lock can be taken again by its holder, it is released when the outermost holder is done.
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.depth = 0
+
+    def acquire(self):
+        if self.depth == 0:
+            self.file = open(self.path, "a+")
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            else:
+                self.file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(0.05)
+        self.depth += 1
+
+    def release(self):
+        self.depth -= 1
+        if self.depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def data_lock_path(file_path):
+    # one lock file for the directory of the data files
+    return os.path.join(os.path.dirname(os.path.abspath(file_path)), ".hms.lock")
@@ -0,0 +1,127 @@
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from lazy_import import LazyImport
+
+pd = LazyImport("pandas")
+
+# the guests of a segment of message_delivery
+SEGMENTS = {"member": {"membership": True}, "regular": {"membership": False}, "all": {}}
+
+
+def guest_key(guest):
+    return str(guest["name"]).strip(), str(guest["contact"]).strip()
+
+
+class FileSink:
+    # a stand-in for sms / email: every message is appended as one json line to the file.
+    # a sink only needs send(guest, text), which raises an exception when the message could not be sent
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def send(self, guest, text):
+        line = json.dumps({"name": guest["name"], "contact": guest["contact"], "text": text}, default=str) + "\n"
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class RateLimiter:
+    # at most rate sends per second over all the workers
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(self.next_time, now) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class Campaign:
+    # sends one message to every guest of a segment through the sink, with a bounded pool of workers.
+    # the guests are read chunk_size at a time and at most workers x 4 sends are waiting. the result of every
+    # guest is appended to "<status_dir>/<name>.status" with the guest's name and contact, and running the campaign
+    # again skips the guests already sent to, wherever their rows are now. a guest whose message can not be made
+    # from the template (a {field} the guests do not have) is recorded as failed, the others go on.
+    def __init__(self, name, template, sink = None, status_dir = "campaigns", workers = 8, rate = 100.0,
+                 retries = 3, backoff = 0.5, chunk_size = 10000):
+        self.name = name
+        self.template = template
+        self.status_path = os.path.join(status_dir, f"{name}.status")
+        self.sink = sink if sink is not None else FileSink(os.path.join(status_dir, f"{name}.outbox.jsonl"))
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.chunk_size = chunk_size
+
+    def sent_keys(self):
+        # the (name, contact) of the guests the message was sent to
+        if not os.path.exists(self.status_path):
+            return set()
+        with open(self.status_path, newline="", encoding="utf-8") as f:
+            return {(row[0], row[1]) for row in csv.reader(f) if len(row) == 4 and row[2] == "sent"}
+
+    def deliver(self, guest):
+        key = guest_key(guest)
+        try:
+            text = self.template.format(**guest)
+        except (KeyError, IndexError, ValueError, AttributeError):
+            return key, "failed", 0
+        for attempt in range(1, self.retries + 2):
+            self.limiter.wait()
+            try:
+                self.sink.send(guest, text)
+                return key, "sent", attempt
+            except Exception:
+                if attempt <= self.retries:
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+        return key, "failed", self.retries + 1
+
+    def run(self, chunks, conditions = None):
+        # chunks: dataframes of guests, conditions: {column: value or values}
+        os.makedirs(os.path.dirname(self.status_path) or ".", exist_ok=True)
+        sent_before = self.sent_keys()
+        counts = {"sent": 0, "failed": 0, "skipped": 0}
+        pending = set()
+
+        def record(finished, status_file):
+            for future in finished:
+                key, status, attempts = future.result()
+                counts[status] += 1
+                csv.writer(status_file).writerow([*key, status, attempts])
+            status_file.flush()
+
+        with ThreadPoolExecutor(self.workers) as pool, \
+                open(self.status_path, "a", newline="", encoding="utf-8") as status_file:
+            for chunk in chunks:
+                mask = pd.Series(True, index=chunk.index)
+                for column, value in (conditions or {}).items():
+                    values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+                    mask &= chunk[column].isin(values)
+                for guest in chunk[mask].to_dict("records"):
+                    if guest_key(guest) in sent_before:
+                        counts["skipped"] += 1
+                        continue
+                    if len(pending) >= self.workers * 4:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        record(finished, status_file)
+                    pending.add(pool.submit(self.deliver, guest))
+            finished, pending = wait(pending)
+            record(finished, status_file)
+        return counts
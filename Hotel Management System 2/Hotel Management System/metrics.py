@@ -0,0 +1,232 @@
+import atexit
+import bisect
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+
+# the upper bounds (seconds) of the latency histogram buckets, the last bucket is +Inf
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def table_name(file_path):
+    # rooms.csv -> rooms
+    return os.path.splitext(os.path.basename(str(file_path)))[0]
+
+
+def data_directory(file_path):
+    return os.path.dirname(os.path.abspath(str(file_path)))
+
+
+class Registry:
+    # the metrics of the process: calls, errors and latency histogram of every operation, and per table the rows
+    # loaded / scanned / written and the bytes written to disk. everything is kept in plain dicts under one lock.
+    # the tables of the properties of a hotel group are counted apart, by the property of their data directory
+    # (see name_property), the tables of the other directories have the property "".
+    #
+    # HMS_PROFILE=cprofile,tracemalloc turns on the capture mode: the operations run under cProfile, and / or the
+    # peak memory of every outermost operation is traced; the profile is written to HMS_PROFILE_DIR (./profiles)
+    # at exit or by dump_profile(). HMS_METRICS_FILE=<path> writes the prometheus text file at most every
+    # HMS_METRICS_INTERVAL seconds (10) after an operation, and at exit.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.operations = {}
+        self.tables = {}
+        self.property_names = {}
+        profile = {mode.strip() for mode in os.environ.get("HMS_PROFILE", "").lower().split(",") if mode.strip()}
+        self.profile_dir = os.environ.get("HMS_PROFILE_DIR", "profiles")
+        self.profiler = None
+        self.trace_memory = "tracemalloc" in profile
+        if "cprofile" in profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+        self.metrics_file = os.environ.get("HMS_METRICS_FILE")
+        self.metrics_interval = float(os.environ.get("HMS_METRICS_INTERVAL", 10))
+        self.last_export = 0.0
+        if self.metrics_file or profile:
+            atexit.register(self.at_exit)
+
+    def operation(self, name):
+        # the metrics of one operation, created the first time
+        metrics = self.operations.get(name)
+        if metrics is None:
+            metrics = self.operations[name] = {"calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0,
+                                               "buckets": [0] * (len(BUCKETS) + 1), "peak_memory": 0}
+        return metrics
+
+    def name_property(self, directory, name):
+        # the tables of the data directory are counted as the tables of the property
+        with self.lock:
+            self.property_names[os.path.abspath(directory)] = name
+
+    def table(self, file_path):
+        key = (self.property_names.get(data_directory(file_path), ""), table_name(file_path))
+        metrics = self.tables.get(key)
+        if metrics is None:
+            metrics = self.tables[key] = {"rows_loaded": 0, "rows_scanned": 0, "rows_written": 0,
+                                          "bytes_written": 0, "saves": 0}
+        return metrics
+
+    def count(self, file_path, **amounts):
+        # add the amounts (rows_loaded=..., bytes_written=...) to the table of the file
+        with self.lock:
+            metrics = self.table(file_path)
+            for key, amount in amounts.items():
+                metrics[key] += int(amount)
+
+    def observe(self, name, seconds, failed = False, peak_memory = 0):
+        with self.lock:
+            metrics = self.operation(name)
+            metrics["calls"] += 1
+            metrics["errors"] += failed
+            metrics["seconds"] += seconds
+            metrics["max_seconds"] = max(metrics["max_seconds"], seconds)
+            metrics["buckets"][bisect.bisect_left(BUCKETS, seconds)] += 1
+            metrics["peak_memory"] = max(metrics["peak_memory"], peak_memory)
+        if self.metrics_file and time.monotonic() - self.last_export >= self.metrics_interval:
+            # called when the operation is over, a metrics file that cannot be written does not fail it
+            try:
+                self.export(self.metrics_file)
+            except OSError as error:
+                print(f"Cannot write the metrics file {self.metrics_file}: {error}", file=sys.stderr)
+
+    def timed(self, name, method):
+        # the method with its calls measured, the profiler / memory tracing only cover the outermost call
+        @functools.wraps(method)
+        def timed_method(*args, **kwargs):
+            depth = getattr(self.local, "depth", 0)
+            self.local.depth = depth + 1
+            outermost = depth == 0
+            if outermost and self.trace_memory:
+                import tracemalloc
+                tracemalloc.reset_peak()
+            if outermost and self.profiler is not None:
+                self.profiler.enable()
+            failed = True
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                seconds = time.perf_counter() - start
+                if outermost and self.profiler is not None:
+                    self.profiler.disable()
+                peak_memory = 0
+                if outermost and self.trace_memory:
+                    import tracemalloc
+                    peak_memory = tracemalloc.get_traced_memory()[1]
+                self.local.depth = depth
+                self.observe(name, seconds, failed, peak_memory)
+        return timed_method
+
+    def snapshot(self):
+        # a copy of all the metrics, with the mean latency of every operation. the tables are named "rooms", or
+        # "<property>/rooms" for the tables of a property
+        with self.lock:
+            operations = {}
+            for name, metrics in self.operations.items():
+                operations[name] = dict(metrics, buckets=dict(zip([str(bound) for bound in BUCKETS] + ["+Inf"],
+                                                                  metrics["buckets"])),
+                                        mean_seconds=metrics["seconds"] / metrics["calls"] if metrics["calls"] else 0)
+            tables = {f"{place}/{name}" if place else name: dict(metrics, property=place, table=name)
+                      for (place, name), metrics in self.tables.items()}
+            return {"operations": operations, "tables": tables}
+
+    def prometheus(self):
+        # the metrics in the prometheus text format
+        snapshot = self.snapshot()
+        lines = []
+
+        def family(name, kind, description):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family("hms_operation_calls_total", "counter", "Calls of the HotelManagementSystem operations.")
+        for name, metrics in snapshot["operations"].items():
+            lines.append(f'hms_operation_calls_total{{operation="{name}"}} {metrics["calls"]}')
+        family("hms_operation_errors_total", "counter", "Calls that raised an exception.")
+        for name, metrics in snapshot["operations"].items():
+            lines.append(f'hms_operation_errors_total{{operation="{name}"}} {metrics["errors"]}')
+        family("hms_operation_seconds", "histogram", "Latency of the operations.")
+        for name, metrics in snapshot["operations"].items():
+            total = 0
+            for bound, count in metrics["buckets"].items():
+                total += count
+                lines.append(f'hms_operation_seconds_bucket{{operation="{name}",le="{bound}"}} {total}')
+            lines.append(f'hms_operation_seconds_sum{{operation="{name}"}} {metrics["seconds"]:.6f}')
+            lines.append(f'hms_operation_seconds_count{{operation="{name}"}} {metrics["calls"]}')
+        if self.trace_memory:
+            family("hms_operation_peak_memory_bytes", "gauge", "Highest traced memory during the operation.")
+            for name, metrics in snapshot["operations"].items():
+                lines.append(f'hms_operation_peak_memory_bytes{{operation="{name}"}} {metrics["peak_memory"]}')
+        for key, description in (("rows_loaded", "Rows read from the storage."),
+                                 ("rows_scanned", "Rows filtered by the searches."),
+                                 ("rows_written", "Rows inserted or updated in the storage."),
+                                 ("bytes_written", "Bytes written to the data files."),
+                                 ("saves", "Writes of the table to the storage.")):
+            family(f"hms_table_{key}_total", "counter", description)
+            for metrics in snapshot["tables"].values():
+                lines.append(f'hms_table_{key}_total{{property="{metrics["property"]}",table="{metrics["table"]}"}} '
+                             f'{metrics[key]}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        # write the prometheus text file in one step, so a scraper never reads half of it
+        self.last_export = time.monotonic()
+        # the name of the temporary file is the one of the thread, two threads exporting do not write the same file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.prometheus())
+        os.replace(temp_path, path)
+        return path
+
+    def dump_profile(self):
+        # write the cProfile stats and the top memory allocations of the capture mode, the paths written
+        written = []
+        if self.profiler is None and not self.trace_memory:
+            return written
+        os.makedirs(self.profile_dir, exist_ok=True)
+        if self.profiler is not None:
+            path = os.path.join(self.profile_dir, f"hms-{os.getpid()}.prof")
+            self.profiler.dump_stats(path)
+            written.append(path)
+        if self.trace_memory:
+            import tracemalloc
+            path = os.path.join(self.profile_dir, f"hms-{os.getpid()}.memory.txt")
+            with open(path, "w") as f:
+                for stat in tracemalloc.take_snapshot().statistics("lineno")[:50]:
+                    f.write(f"{stat}\n")
+            written.append(path)
+        return written
+
+    def at_exit(self):
+        if self.metrics_file:
+            self.export(self.metrics_file)
+        self.dump_profile()
+
+
+REGISTRY = Registry()
+
+
+def helper(method):
+    # a method used by the operations to load, search, change and index the tables, not measured by itself: its
+    # time is in the time of the operations calling it
+    method.measured = False
+    return method
+
+
+def instrument(cls):
+    # measure every public method of the class but the helpers
+    for name, value in list(vars(cls).items()):
+        if name.startswith("_") or not getattr(value, "measured", True) or not inspect.isfunction(value) \
+                or inspect.isgeneratorfunction(value):
+            continue
+        setattr(cls, name, REGISTRY.timed(name, value))
+    return cls
@@ -0,0 +1,164 @@
+from datetime import date, datetime
+
+from lazy_import import LazyImport
+
+np = LazyImport("numpy")
+pd = LazyImport("pandas")
+
+
+def to_night(value):
+    # turn 20250102 / "20250102" / date / datetime into a numpy day, None if it is not a valid date
+    if isinstance(value, np.datetime64):
+        return None if np.isnat(value) else value.astype("datetime64[D]")
+    if isinstance(value, (date, datetime, pd.Timestamp)):
+        return np.datetime64(pd.Timestamp(value).date(), "D")
+    text = str(value).strip()
+    if len(text) != 8:
+        return None
+    try:
+        return np.datetime64(datetime.strptime(text, "%Y%m%d").date(), "D")
+    except ValueError:
+        return None
+
+
+def to_nights(values):
+    # the same as to_night for a whole column, the invalid dates become NaT
+    values = pd.Series(values)
+    if values.dtype.kind == "M":
+        return values.to_numpy().astype("datetime64[D]")
+    text = values.astype(str).str.strip()
+    nights = pd.to_datetime(text.where(text.str.len() == 8), format="%Y%m%d", errors="coerce")
+    return nights.to_numpy().astype("datetime64[D]")
+
+
+def nights_between(later, earlier):
+    return int((later - earlier) // np.timedelta64(1, "D"))
+
+
+class OccupancyCalendar:
+    # number of booked rooms per night and room type, kept in a numpy array of nights x room types.
+    # a range query is one slice of the array, so it does not depend on how many reservations there are.
+    def __init__(self, capacity, first_night = None, nights = 366):
+        self.room_types = {}
+        self.capacity = np.zeros(0, dtype=np.int32)
+        self.first_night = first_night if first_night is not None else np.datetime64("today", "D")
+        self.booked = np.zeros((nights, 0), dtype=np.int32)
+        # reservation row -> (room type, first night, nights) of the stays booked in the calendar
+        self.stays = {}
+        for room_type, count in capacity.items():
+            self.add_room(room_type, count)
+
+    @classmethod
+    def from_tables(cls, rooms, reservations):
+        capacity = rooms["Room Type"].value_counts().to_dict() if "Room Type" in rooms.columns else {}
+        calendar = cls(capacity)
+        if "reservation_id" not in reservations.columns:
+            return calendar
+        active = reservations[reservations["is_check-in"].isin(["un-check-in", "Checked-in"])]
+        first = to_nights(active["reserved_date"])
+        valid = ~np.isnat(first)
+        active = active[valid]
+        first = first[valid]
+        nights = active["day"].to_numpy().astype(np.int64)
+        if not len(active):
+            return calendar
+        calendar.offset(first.min(), nights_between((first + nights).max(), first.min()))
+        for room_type in active["room_type"].unique():
+            calendar.column(room_type)
+        columns = active["room_type"].map(calendar.room_types).to_numpy().astype(np.int64)
+        start = (first - calendar.first_night).astype(np.int64)
+        # add +1 at the first night and -1 after the last night, the running sum is the booked rooms per night
+        change = np.zeros((len(calendar.booked) + 1, len(calendar.room_types)), dtype=np.int32)
+        np.add.at(change, (start, columns), 1)
+        np.add.at(change, (start + nights, columns), -1)
+        calendar.booked += np.cumsum(change[:-1], axis=0, dtype=np.int32)
+        calendar.stays = dict(zip(active.index, zip(active["room_type"], first, nights.tolist())))
+        return calendar
+
+    def column(self, room_type):
+        # the column of the room type, a new room type gets a new column with no rooms
+        if room_type not in self.room_types:
+            self.room_types[room_type] = len(self.room_types)
+            self.capacity = np.append(self.capacity, np.int32(0))
+            self.booked = np.hstack([self.booked, np.zeros((len(self.booked), 1), dtype=np.int32)])
+        return self.room_types[room_type]
+
+    def offset(self, night, nights = 1):
+        # the row of the night, the array grows in front or at the end when the stay is outside of it
+        start = nights_between(night, self.first_night)
+        if start < 0:
+            grow = max(-start, len(self.booked))
+            self.booked = np.vstack([np.zeros((grow, self.booked.shape[1]), dtype=np.int32), self.booked])
+            self.first_night = self.first_night - grow
+            start += grow
+        if start + nights > len(self.booked):
+            grow = max(start + nights - len(self.booked), len(self.booked))
+            self.booked = np.vstack([self.booked, np.zeros((grow, self.booked.shape[1]), dtype=np.int32)])
+        return start
+
+    def add_room(self, room_type, count = 1):
+        column = self.column(room_type)
+        self.capacity[column] += count
+
+    def availability(self, room_type, start, nights = 1):
+        # the number of rooms of the type that are free for every night of the stay
+        if room_type not in self.room_types:
+            return 0
+        night = to_night(start)
+        if night is None or nights <= 0:
+            return 0
+        column = self.room_types[room_type]
+        first = nights_between(night, self.first_night)
+        last = first + int(nights)
+        if last <= 0 or first >= len(self.booked):
+            return int(self.capacity[column])
+        booked = self.booked[max(first, 0):last, column].max()
+        return max(int(self.capacity[column] - booked), 0)
+
+    def overbooked(self, room_type, start, nights = 1):
+        # True when a night of the stay has more rooms of the type booked than the hotel has, so no room of the
+        # type is free for the whole stay
+        night = to_night(start)
+        if room_type not in self.room_types or night is None:
+            return False
+        column = self.room_types[room_type]
+        first = max(nights_between(night, self.first_night), 0)
+        last = min(nights_between(night, self.first_night) + int(nights), len(self.booked))
+        if first >= last:
+            return False
+        return bool(self.booked[first:last, column].max() > self.capacity[column])
+
+    def book(self, key, room_type, start, nights):
+        night = to_night(start)
+        if night is None:
+            return False
+        column = self.column(room_type)
+        first = self.offset(night, int(nights))
+        self.booked[first:first + int(nights), column] += 1
+        self.stays[key] = (room_type, night, int(nights))
+        return True
+
+    def release(self, key, from_night = None):
+        # free the nights of the stay, from from_night on when the guest leaves early
+        stay = self.stays.pop(key, None)
+        if stay is None:
+            return
+        room_type, night, nights = stay
+        column = self.room_types[room_type]
+        first = nights_between(night, self.first_night)
+        last = first + nights
+        if from_night is not None:
+            first = max(first, nights_between(to_night(from_night), self.first_night))
+        if first < last:
+            self.booked[first:last, column] -= 1
+
+    def check_in(self, key, arrival = None):
+        # a guest arriving on another day than reserved keeps the length of the stay from the arrival day
+        stay = self.stays.get(key)
+        arrival = to_night(arrival if arrival is not None else date.today())
+        if stay is not None and stay[1] != arrival:
+            self.release(key)
+            self.book(key, stay[0], arrival, stay[2])
+
+    def check_out(self, key, departure = None):
+        self.release(key, departure if departure is not None else date.today())
@@ -0,0 +1,154 @@
+import os
+from datetime import date
+
+from lazy_import import LazyImport
+from occupancy import to_nights
+
+np = LazyImport("numpy")
+pd = LazyImport("pandas")
+
+# the price per night of the room types when the rates file does not say otherwise
+BASE_RATES = {"SingleRoom": 150, "DoubleRoom": 250, "LuxuryRoom": 500}
+
+
+# the day number (date.toordinal) of 1970-01-01, numpy days count from there
+EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+
+def day_number(value):
+    # YYYYMMDD as the day number of date.toordinal(), None if it is not a valid date.
+    # plain python ints, so quoting one stay costs a few microseconds
+    text = str(value).strip()
+    if len(text) != 8 or not text.isdigit():
+        return None
+    try:
+        return date(int(text[:4]), int(text[4:6]), int(text[6:])).toordinal()
+    except ValueError:
+        return None
+
+
+def season_day(value):
+    day = day_number(value)
+    if day is None:
+        raise ValueError(f"Invalid date {value}, please use the YYYYMMDD format.")
+    return day
+
+
+class RateTable:
+    # the price of every night for every room type. the rates are kept as a running sum over the nights, so the price
+    # of a stay is one subtraction, whatever its length and however many room types there are.
+    # the rates are: the base rate of the room type, then the seasons in the order they were set; a season has a rate
+    # for the weekdays and one for the friday and saturday nights, and is for one room type or for all of them.
+    # members pay member_discount less (0.1 is 10%); it is 0 by default, so the members pay the room price as they
+    # always did until a discount is given
+    def __init__(self, base_rates = None, member_discount = 0.0):
+        self.base_rates = dict(BASE_RATES if base_rates is None else base_rates)
+        self.member_discount = member_discount
+        # (room type or None, first night or None, last night or None, rate, weekend rate)
+        self.seasons = []
+        self.reset()
+
+    @classmethod
+    def from_csv(cls, file_path, member_discount = 0.0):
+        # rows of Room Type, From, To, Rate, Weekend Rate. an empty room type is for all the types, empty From / To
+        # have no limit, an empty Weekend Rate is the Rate. a row without dates and weekend rate is a base rate
+        table = cls(member_discount=member_discount)
+        if not os.path.exists(file_path):
+            return table
+        rates = pd.read_csv(file_path, dtype=str, keep_default_na=False)
+        for row in rates.to_dict("records"):
+            room_type = row.get("Room Type", "").strip() or None
+            start = row.get("From", "").strip() or None
+            end = row.get("To", "").strip() or None
+            weekend_rate = row.get("Weekend Rate", "").strip() or None
+            table.set_rate(room_type, float(row["Rate"]), start, end,
+                           None if weekend_rate is None else float(weekend_rate))
+        return table
+
+    def reset(self):
+        # forget the running sums, they are made again for the nights asked for next time
+        self.room_types = {}
+        self.first_day = None
+        self.last_day = None
+        self.totals = None
+
+    def set_rate(self, room_type, rate, start = None, end = None, weekend_rate = None):
+        # the rate of the room type (None for all) from start to end (YYYYMMDD, both included)
+        if room_type is not None and start is None and end is None and weekend_rate is None:
+            self.base_rates[room_type] = rate
+        else:
+            self.seasons.append((room_type, None if start is None else season_day(start),
+                                 None if end is None else season_day(end), rate,
+                                 rate if weekend_rate is None else weekend_rate))
+        self.reset()
+
+    def build(self, first_day, nights):
+        # the rate of every night from first_day for every room type, and their running sums
+        room_types = list(self.base_rates)
+        for season in self.seasons:
+            if season[0] is not None and season[0] not in room_types:
+                room_types.append(season[0])
+        self.room_types = {room_type: row for row, room_type in enumerate(room_types)}
+        days = first_day + np.arange(nights)
+        # friday and saturday nights, date.weekday() is (day number + 6) % 7
+        weekend = np.isin((days + 6) % 7, [4, 5])
+        rates = np.empty((len(room_types), nights), dtype=np.float64)
+        rates[:] = np.array([self.base_rates.get(room_type, np.nan) for room_type in room_types])[:, None]
+        for room_type, start, end, rate, weekend_rate in self.seasons:
+            in_season = np.ones(nights, dtype=bool)
+            if start is not None:
+                in_season &= days >= start
+            if end is not None:
+                in_season &= days <= end
+            rows = slice(None) if room_type is None else self.room_types[room_type]
+            rates[rows, in_season & ~weekend] = rate
+            rates[rows, in_season & weekend] = weekend_rate
+        self.first_day = first_day
+        self.last_day = first_day + nights
+        self.totals = np.zeros((len(room_types), nights + 1), dtype=np.float64)
+        np.cumsum(rates, axis=1, out=self.totals[:, 1:])
+
+    def cover(self, first, last):
+        # make the running sums reach from the day first to the day last (the day after the last night)
+        if self.totals is not None and self.first_day <= first and last <= self.last_day:
+            return
+        if self.totals is not None:
+            first = min(first, self.first_day)
+            last = max(last, self.last_day)
+        # some room to grow on both sides, so the next stays do not build it again
+        self.build(first - 366, last - first + 2 * 366)
+
+    def quote(self, room_type, start, nights, member = False):
+        # the price of the stay, None when the room type or the date is unknown
+        day = day_number(start)
+        nights = int(nights)
+        if day is None or nights <= 0:
+            return None
+        self.cover(day, day + nights)
+        row = self.room_types.get(room_type)
+        if row is None:
+            return None
+        first = day - self.first_day
+        amount = float(self.totals[row, first + nights] - self.totals[row, first])
+        if amount != amount:
+            return None
+        return amount * (1 - self.member_discount) if member else amount
+
+    def quote_many(self, room_types, starts, nights, members = None):
+        # the prices of many stays in one pass, NaN for the unknown room types and dates
+        first = to_nights(starts)
+        valid = ~np.isnat(first)
+        first = first.astype(np.int64) + EPOCH_DAY
+        nights = np.asarray(nights, dtype=np.int64)
+        amounts = np.full(len(first), np.nan)
+        valid &= nights > 0
+        if valid.any():
+            self.cover(int(first[valid].min()), int((first[valid] + nights[valid]).max()))
+            rows = pd.Series(room_types).map(self.room_types).to_numpy(dtype=np.float64)
+            valid &= ~np.isnan(rows)
+            rows = rows[valid].astype(np.int64)
+            start = first[valid] - self.first_day
+            amounts[valid] = self.totals[rows, start + nights[valid]] - self.totals[rows, start]
+        if members is not None:
+            amounts = np.where(np.asarray(members, dtype=bool), amounts * (1 - self.member_discount), amounts)
+        return amounts
@@ -0,0 +1,324 @@
+from datetime import datetime
+
+from lazy_import import LazyImport
+
+np = LazyImport("numpy")
+pd = LazyImport("pandas")
+
+# the types of the columns in memory. the files keep the old text: the dates as 20250102 (yyyymmdd) or 25-01-02
+# (yy-mm-dd), the hours as 09:00-10:00. a category lists the values it always has, the others found are added.
+# a column is left as pandas read it when its values do not fit the type
+SCHEMAS = {
+    "rooms": {
+        "Room Type": ("category", ["SingleRoom", "DoubleRoom", "LuxuryRoom"]),
+        "Status": ("category", ["Available", "Occupied"])
+    },
+    "guests": {
+        "contact": "int64",
+        "membership": "bool"
+    },
+    "reservations": {
+        "reservation_id": "int64",
+        "contact": "int64",
+        "room_number": ("category", ["Un-Arrange"]),
+        "room_type": ("category", ["SingleRoom", "DoubleRoom", "LuxuryRoom"]),
+        "reserved_date": "yyyymmdd",
+        "day": "int16",
+        "is_check-in": ("category", ["un-check-in", "Checked-in", "Checked-out"]),
+        "order_amount": "float64"
+    },
+    "housekeeping_schedule": {
+        "Room": ("category", []),
+        "Date": "yy-mm-dd",
+        "Schedule Time": "hour"
+    },
+    "feedback": {
+        "contact": "int64",
+        "rate": "int8",
+        "date": "yyyymmdd"
+    },
+    "waitlist": {
+        "reservation_id": "int64",
+        "contact": "int64",
+        "room_type": ("category", ["SingleRoom", "DoubleRoom", "LuxuryRoom"]),
+        "reserved_date": "yyyymmdd",
+        "status": ("category", ["Waiting", "Assigned", "Left"]),
+        "room_number": ("category", ["Un-Arrange"])
+    }
+}
+DATE_FORMATS = {"yyyymmdd": "%Y%m%d", "yy-mm-dd": "%y-%m-%d"}
+# up to this many new rows are converted value by value
+SMALL_ROWS = 64
+
+
+def kind_of(column_type):
+    return column_type[0] if isinstance(column_type, tuple) else column_type
+
+
+def typed_column(values, column_type):
+    # the column in its memory type, None when the values do not fit
+    kind = kind_of(column_type)
+    if kind == "category":
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return values
+        known = column_type[1]
+        if values.dtype.kind == "f" and (values.dropna() == values.dropna().round()).all():
+            # room numbers in a column with empty cells are read as floats, 101.0 is 101
+            values = values.astype("Int64")
+        if values.dtype != "str":
+            values = values.where(values.isna(), values.astype(str))
+        values = values.astype("category")
+        found = values.cat.categories.tolist()
+        return values.cat.set_categories(known + sorted(set(found) - set(known)))
+    if kind in DATE_FORMATS:
+        if values.dtype.kind == "M":
+            return values
+        if values.dtype.kind == "f":
+            # a column with empty cells is read as floats, 20250102.0 is 20250102
+            values = values.astype("Int64")
+        if kind == "yyyymmdd" and values.dtype.kind in "iu":
+            dates = yyyymmdd_dates(values)
+        else:
+            text = values.astype(str).str.strip()
+            if kind == "yyyymmdd":
+                text = text.where(text.str.len() == 8)
+            dates = pd.to_datetime(text, format=DATE_FORMATS[kind], errors="coerce").astype("datetime64[s]")
+        # a value that is not a date would be lost when the table is saved
+        if (dates.isna() & values.notna()).any():
+            return None
+        return dates
+    if kind == "hour":
+        if values.dtype.kind in "iu":
+            return values
+        hours = pd.to_numeric(values.astype(str).str[:2], errors="coerce")
+        if hours.isna().any() or not hours.between(0, 23).all():
+            return None
+        return hours.astype(np.int8)
+    if kind == "bool":
+        if values.dtype.kind == "b":
+            return values
+        text = values.astype(str).str.strip().str.lower()
+        if not text.isin(["true", "false", "1", "0"]).all():
+            return None
+        return text.isin(["true", "1"])
+    # numbers
+    if values.dtype == kind:
+        return values
+    numbers = pd.to_numeric(values, errors="coerce")
+    if kind == "float64":
+        return None if (numbers.isna() & values.notna()).any() else numbers.astype(kind)
+    # whole numbers only, without empty cells, in the range of the type
+    if numbers.isna().any() or not (numbers == numbers.round()).all():
+        return None
+    limits = np.iinfo(kind)
+    if len(numbers) and (numbers.min() < limits.min or numbers.max() > limits.max):
+        return None
+    return numbers.astype(kind)
+
+
+def yyyymmdd_dates(values):
+    # whole numbers 20250102 as dates with numpy, NaT for the numbers that are not a date
+    numbers = values.to_numpy(dtype=np.int64, na_value=0)
+    years, months, days = numbers // 10000, numbers // 100 % 100, numbers % 100
+    # eight digits like the dates typed in, 241226 is not a date
+    valid = (years >= 1000) & (years <= 9999) & (months >= 1) & (months <= 12) & (days >= 1)
+    first = ((np.where(valid, years, 1970) - 1970).astype("datetime64[Y]")
+             + (np.where(valid, months, 1) - 1).astype("timedelta64[M]")).astype("datetime64[D]")
+    dates = first + (np.where(valid, days, 1) - 1).astype("timedelta64[D]")
+    # 20250231 is not a date: the day goes past the end of its month
+    valid &= dates.astype("datetime64[M]") == first.astype("datetime64[M]")
+    return pd.Series(np.where(valid, dates, np.datetime64("NaT")).astype("datetime64[s]"), index=values.index)
+
+
+def typed(schema, data):
+    # the frame read from the storage with the columns in their memory types
+    if not schema or data is None or not len(data.columns):
+        return data
+    data = data.copy()
+    for column, column_type in schema.items():
+        if column in data.columns:
+            values = typed_column(data[column], column_type)
+            if values is not None:
+                data[column] = values
+    return data
+
+
+def stored_column(values, column_type):
+    # the column as it is written to the files
+    # (the categories are written as their text by the storages already)
+    kind = kind_of(column_type)
+    if kind in DATE_FORMATS and values.dtype.kind == "M":
+        if kind == "yyyymmdd":
+            # the year, month and day with numpy, much faster than the .dt accessors
+            days = values.to_numpy().astype("datetime64[D]")
+            months = days.astype("datetime64[M]")
+            numbers = (months.astype("datetime64[Y]").astype(np.int64) + 1970) * 10000 \
+                + (months.astype(np.int64) % 12 + 1) * 100 + (days - months).astype(np.int64) + 1
+            valid = ~np.isnat(days)
+            if valid.all():
+                return pd.Series(numbers, index=values.index)
+            return pd.Series(np.where(valid, numbers.astype(object), None), index=values.index)
+        return values.dt.strftime(DATE_FORMATS[kind]).astype(object).where(values.notna(), None)
+    if kind == "hour" and values.dtype.kind in "iu":
+        return values.map(lambda hour: f"{hour:02d}:00-{hour + 1:02d}:00")
+    return values
+
+
+def stored(schema, data):
+    # the frame with the columns back in the text the files have always had
+    if not schema or data is None:
+        return data
+    columns = [column for column in schema if column in data.columns]
+    if not columns:
+        return data
+    data = data.copy()
+    for column in columns:
+        data[column] = stored_column(data[column], schema[column])
+    return data
+
+
+def stored_value(value, column_type):
+    # one value of an update as it is written to the files
+    kind = kind_of(column_type)
+    if kind in DATE_FORMATS and isinstance(value, (pd.Timestamp, np.datetime64)):
+        value = pd.Timestamp(value)
+        if pd.isna(value):
+            return None
+        return int(value.strftime(DATE_FORMATS[kind])) if kind == "yyyymmdd" else value.strftime(DATE_FORMATS[kind])
+    if kind == "hour" and isinstance(value, (int, np.integer)):
+        return f"{value:02d}:00-{value + 1:02d}:00"
+    return value
+
+
+def stored_values(schema, changes):
+    if not schema:
+        return changes
+    return {column: stored_value(value, schema[column]) if column in schema else value
+            for column, value in changes.items()}
+
+
+def stored_records(schema, data):
+    # the rows as dicts of plain python values in the text of the files, the empty cells as None. a few rows are
+    # converted value by value, like the new rows of an insert
+    if len(data) > SMALL_ROWS:
+        data = stored(schema, data).astype(object)
+        return data.where(data.notna(), None).to_dict("records")
+    schema = schema or {}
+    columns = data.columns.tolist()
+    return [{column: None if value is None or value != value
+             else stored_value(value, schema[column]) if column in schema else value
+             for column, value in zip(columns, row)} for row in data.to_numpy(dtype=object).tolist()]
+
+
+def date_value(value, kind):
+    # one date of the format as numpy seconds, NaT when it is not a date
+    if isinstance(value, (pd.Timestamp, np.datetime64, datetime)):
+        return np.datetime64(pd.Timestamp(value), "s")
+    if isinstance(value, float) and value == value:
+        value = int(value)
+    text = str(value).strip()
+    if kind == "yyyymmdd" and len(text) != 8:
+        return np.datetime64("NaT", "s")
+    try:
+        return np.datetime64(datetime.strptime(text, DATE_FORMATS[kind]), "s")
+    except ValueError:
+        return np.datetime64("NaT", "s")
+
+
+def hour_value(value):
+    # "09:00-10:00" (or 9) as the hour 9, None when it is not an hour
+    if isinstance(value, (int, np.integer)):
+        return int(value) if 0 <= value <= 23 else None
+    text = str(value).strip()[:2]
+    return int(text) if text.isdigit() and int(text) <= 23 else None
+
+
+def category_codes(data, column, values, dtype = None):
+    # the codes of the values in the categories of the column, the new values are added to the categories.
+    # the categorical dtype of the column after that
+    dtype = data[column].dtype if dtype is None else dtype
+    new = [str(value) for value in dict.fromkeys(values)
+           if value is not None and value == value and str(value) not in dtype.categories]
+    if new:
+        data[column] = data[column].cat.add_categories(new)
+        dtype = data[column].dtype
+    categories = dtype.categories
+    return [categories.get_loc(str(value)) if value is not None and value == value else -1 for value in values], dtype
+
+
+def typed_like(schema, data, rows):
+    # a few new rows (a list of dicts) in the types of the columns of data, value by value: converting the columns
+    # of a small frame with pandas costs more than the rest of an insert
+    dtypes = data.dtypes.to_dict()
+    columns = {}
+    for column in dict.fromkeys(column for row in rows for column in row):
+        values = [row.get(column, np.nan) for row in rows]
+        dtype = dtypes.get(column)
+        kind = kind_of(schema[column]) if schema and column in schema else None
+        if isinstance(dtype, pd.CategoricalDtype):
+            codes, dtype = category_codes(data, column, values, dtype)
+            columns[column] = pd.Categorical.from_codes(codes, dtype=dtype)
+        elif dtype is not None and dtype.kind == "M" and kind in DATE_FORMATS:
+            columns[column] = np.array([date_value(value, kind) for value in values], dtype="datetime64[s]")
+        elif dtype is not None and dtype.kind in "iu" and kind == "hour" \
+                and None not in [hour_value(value) for value in values]:
+            columns[column] = np.array([hour_value(value) for value in values], dtype=dtype)
+        elif dtype is not None:
+            try:
+                columns[column] = pd.array(values, dtype=dtype)
+            except (ValueError, TypeError, OverflowError):
+                columns[column] = values
+        elif kind is not None:
+            columns[column] = typed_column(pd.Series(values), schema[column])
+            if columns[column] is None:
+                columns[column] = values
+        else:
+            columns[column] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def append(schema, data, rows):
+    # the frame with the new rows (a dataframe or a list of dicts) at the end, the categories of both are kept
+    if not len(data.columns):
+        return typed(schema, pd.DataFrame(rows)).reset_index(drop=True)
+    if not isinstance(rows, pd.DataFrame) and len(rows) <= SMALL_ROWS:
+        return pd.concat([data, typed_like(schema, data, rows)], ignore_index=True)
+    rows = typed(schema, pd.DataFrame(rows))
+    for column in rows.columns:
+        if not schema or column not in schema or column not in data.columns \
+                or data[column].dtype.kind == rows[column].dtype.kind:
+            continue
+        # a column left as it was read on one side (a value did not fit the type): both get the values as they are
+        # in the file
+        if rows[column].dtype.kind in "Mi":
+            rows[column] = stored_column(rows[column], schema[column])
+        if data[column].dtype.kind in "Mi":
+            data[column] = stored_column(data[column], schema[column])
+    for column in data.columns:
+        if isinstance(data[column].dtype, pd.CategoricalDtype) and column in rows.columns:
+            values = rows[column].astype(object)
+            new = pd.Index(values.dropna().astype(str).unique()).difference(data[column].cat.categories)
+            if len(new):
+                data[column] = data[column].cat.add_categories(new)
+            rows[column] = values.astype(data[column].dtype)
+    return pd.concat([data, rows], ignore_index=True)
+
+
+def set_value(schema, data, index, column, value):
+    # data.loc[index, column] = value, with the value turned into the type of the column
+    if column in data.columns:
+        dtype = data[column].dtype
+        kind = kind_of(schema[column]) if schema and column in schema else None
+        if isinstance(dtype, pd.CategoricalDtype):
+            category_codes(data, column, [value], dtype)
+            value = str(value) if value is not None and value == value else np.nan
+        elif dtype.kind == "M" and kind in DATE_FORMATS:
+            value = date_value(value, kind)
+        elif dtype.kind in "iu" and kind == "hour" and hour_value(value) is not None:
+            value = hour_value(value)
+    data.loc[index, column] = value
+
+
+def memory(data):
+    # the bytes the frame takes, with the python strings it holds
+    return int(data.memory_usage(deep=True).sum())
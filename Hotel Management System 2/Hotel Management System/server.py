@@ -0,0 +1,264 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+from batch import OPERATIONS, run_commands
+from HMS import HotelManagementSystem, outcome
+
+
+def records(data):
+    return data.reset_index(drop=True).to_dict("records")
+
+
+# the read only requests: GET /<name>?<parameters>, answered from the saved tables, see HotelServer
+def get_availability(hms, room_type, start, nights = 1):
+    rooms = hms.availability(room_type, start, int(nights))
+    return outcome(True, f"{rooms} {room_type} available", rooms=rooms)
+
+
+def get_rooms(hms, **conditions):
+    return outcome(True, "rooms", rooms=records(hms.find("rooms", **conditions)))
+
+
+def get_reservations(hms, start = None, end = None, **conditions):
+    # the archived orders too when the reserved dates are limited with start / end (YYYYMMDD)
+    history = start is not None or end is not None
+    return outcome(True, "reservations",
+                   reservations=records(hms.reservation_history(start, end, history, **conditions)))
+
+
+def get_guest(hms, name, contact):
+    # what the hotel knows about one guest: the guest, the orders and the feedback
+    guest = hms.find("guests", name=name, contact=contact)
+    if guest.empty:
+        return outcome(False, f"Unfound Guest {name}.")
+    return outcome(True, name, guest=records(guest)[0],
+                   reservations=records(hms.find("reservations", guest_name=name, contact=contact)),
+                   feedback=records(hms.find("feedback", name=name, contact=contact)))
+
+
+def get_guests(hms, **conditions):
+    return outcome(True, "guests", guests=records(hms.find("guests", **conditions)))
+
+
+def get_guest_search(hms, name = None, contact = None, limit = 20, history = False):
+    # the guests whose name / contact start with the text, with their orders when history=true
+    guests = hms.search_guests(name, contact, int(limit), str(history).lower() in ("true", "1"))
+    return outcome(True, f"{len(guests)} guests", guests=records(guests))
+
+
+def get_changes(hms, after = 0, limit = 1000):
+    # the change events numbered after `after`, a follower asks again with the number of the last one
+    events = hms.change_events(int(after), int(limit))
+    return outcome(True, f"{len(events)} changes", changes=events, last=events[-1]["seq"] if events else int(after))
+
+
+def get_feedback(hms, words = None, member = None, min_rate = None, max_rate = None, start = None, end = None,
+                 limit = 100):
+    # the feedback with the words from the members (member=true) or the other guests (member=false), with the
+    # rating totals of the same guests and period
+    member = None if member is None else str(member).lower() in ("true", "1")
+    found = hms.search_feedback(words, member, min_rate, max_rate, start, end, int(limit))
+    return outcome(True, f"{len(found)} feedback", feedback=records(found),
+                   ratings=hms.feedback_ratings(start, end, member))
+
+
+def get_waitlist(hms, room_type = None):
+    # the orders waiting for a room, in the order they will get one
+    return outcome(True, "waitlist", waitlist=records(hms.waitlist_queue.table(room_type)))
+
+
+def get_quote(hms, room_type, start, nights, name = None, contact = None):
+    amount = hms.quote(room_type, start, int(nights), name, contact)
+    if amount is None:
+        return outcome(False, f"There is no rate for {room_type} on {start}.")
+    return outcome(True, f"${amount}", order_amount=amount)
+
+
+def get_housekeeping(hms):
+    return outcome(True, "housekeeping plan", schedule=records(hms.housekeeping_plan.table()))
+
+
+def get_report(hms, start, end):
+    report = hms.analytics.report(start, end)
+    return outcome(True, f"{start} - {end}", report=records(report), ratings=hms.analytics.rating_report(start, end))
+
+
+READS = {
+    "availability": get_availability,
+    "rooms": get_rooms,
+    "reservations": get_reservations,
+    "guest": get_guest,
+    "guests": get_guests,
+    "guest_search": get_guest_search,
+    "quote": get_quote,
+    "housekeeping": get_housekeeping,
+    "report": get_report,
+    "changes": get_changes,
+    "waitlist": get_waitlist,
+    "feedback": get_feedback
+}
+
+
+class HotelServer:
+    # a local http / json service in front of one HotelManagementSystem.
+    # POST /<operation> (the operations of batch.py) is queued for the writer task, which runs the queued operations
+    # one after another in the writer thread and saves the tables once for all of them, so a burst of requests is
+    # one save. the answer of a POST is sent after its changes are saved.
+    # GET /<read> is answered by the reader, a second system on the same data that only sees the saved tables (it
+    # loads again the tables saved since it last read them). without a reader the GETs run in the writer thread
+    # between two groups, so they never see the changes of a group not saved yet either
+    def __init__(self, hms, max_batch = 1000, reader = None):
+        self.hms = hms
+        self.reader = reader
+        self.max_batch = max_batch
+        self.queue = None
+        self.saves = 0
+        self.writes = 0
+        # one thread for each system, a system is used by one thread at a time
+        self.write_thread = ThreadPoolExecutor(1, "hms-writer")
+        self.read_thread = ThreadPoolExecutor(1, "hms-reader") if reader is not None else self.write_thread
+
+    async def writer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(self.write_thread, self.run_group,
+                                                     [command for command, future in batch])
+                self.saves += 1
+                self.writes += len(batch)
+            except Exception as error:
+                # nothing of the group is saved, every request of it gets the error and the writer goes on
+                results = [outcome(False, f"{type(error).__name__}: {error}", op=command.get("op"))
+                           for command, future in batch]
+            for (command, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def run_group(self, commands):
+        # the lock of the data directory is held from the first command until the tables are saved, so no other
+        # process changes them in between
+        self.hms.autosave = False
+        try:
+            with self.hms.locked():
+                try:
+                    # the operations print their messages for the console, they are in the results already. a command
+                    # going wrong half way is taken out of the group, see run_commands
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        results = run_commands(self.hms, commands)
+                    self.hms.flush()
+                except BaseException:
+                    # nothing of the group is saved, the tables are loaded again from the files
+                    self.hms.discard_unsaved()
+                    raise
+        finally:
+            self.hms.autosave = True
+        return results
+
+    def read(self, name, parameters):
+        hms = self.hms
+        if self.reader is not None:
+            hms = self.reader
+            hms.refresh()
+        return READS[name](hms, **parameters)
+
+    async def write(self, command):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((command, future))
+        return await future
+
+    async def answer(self, method, target, body):
+        url = urlsplit(target)
+        name = url.path.strip("/")
+        parameters = dict(parse_qsl(url.query))
+        if method == "GET" and name == "stats":
+            return 200, outcome(True, "stats", writes=self.writes, saves=self.saves, queued=self.queue.qsize())
+        if method == "GET" and name in READS:
+            try:
+                return 200, await asyncio.get_running_loop().run_in_executor(self.read_thread, self.read, name,
+                                                                             parameters)
+            except (TypeError, ValueError, KeyError) as error:
+                return 400, outcome(False, f"{type(error).__name__}: {error}")
+            except Exception as error:
+                return 500, outcome(False, f"{type(error).__name__}: {error}")
+        if method == "POST" and name in OPERATIONS:
+            try:
+                command = json.loads(body or b"{}")
+            except ValueError:
+                return 400, outcome(False, "The body is not json.")
+            if not isinstance(command, dict):
+                return 400, outcome(False, "The body must be a json object.")
+            command["op"] = name
+            return 200, await self.write(command)
+        return 404, outcome(False, f"Unknown request {method} /{name}.")
+
+    async def handle(self, reader, writer):
+        # http/1.1 with keep-alive, one request after the other on the connection
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split(maxsplit=2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, result = await self.answer(method.upper(), target, body)
+                payload = json.dumps(result, default=str).encode("utf-8")
+                close = headers.get("connection", "").lower() == "close" or version.strip() == "HTTP/1.0"
+                writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                             f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode("latin-1") + payload)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host = "127.0.0.1", port = 8080, ready = None):
+        self.queue = asyncio.Queue()
+        writer_task = asyncio.create_task(self.writer())
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Hotel Management System serving on http://{host}:{server.sockets[0].getsockname()[1]}")
+        if ready is not None:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            writer_task.cancel()
+            self.write_thread.shutdown(wait=False)
+            self.read_thread.shutdown(wait=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Hotel Management System as a local json api")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--journal", action="store_true", help="use the journal storage")
+    parser.add_argument("--change-log", action="store_true", help="write the change events to changes/")
+    args = parser.parse_args()
+    server = HotelServer(HotelManagementSystem(journal=args.journal, change_log=args.change_log),
+                         reader=HotelManagementSystem(journal=args.journal, change_log=args.change_log))
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,652 @@
+import contextlib
+import io
+import json
+import os
+import pickle
+import sqlite3
+import threading
+from datetime import datetime
+
+from columnar import ColumnTable, columns_path, read_current, write_columns
+from lazy_import import LazyImport
+from locking import FileLock, data_lock_path
+from metrics import REGISTRY
+from schema import stored, stored_values, typed
+
+pd = LazyImport("pandas")
+
+
+def write_atomic(file_path, write, mode="w"):
+    # write(f) writes the content into a temporary file, which then replaces the file in one step
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(temp_path, mode, **({} if "b" in mode else {"newline": ""})) as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, file_path)
+
+
+def file_stamp(path):
+    # the inode, modified time and size of the file, None when there is no file
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _json_value(value):
+    # numpy scalars are not json serializable, turn them into the python value
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+# an id is the creation second yymmddHHMMSS followed by a sequence of ID_SEQUENCE_DIGITS digits, so the ids sort by
+# creation time and are always greater than the old 12 digit ids made of the second only
+ID_SEQUENCE_DIGITS = 4
+
+
+def first_id(last_id):
+    # the first id after last_id, more ids than the sequence can hold in one second take the next second's numbers
+    now = int(datetime.now().strftime("%y%m%d%H%M%S")) * 10 ** ID_SEQUENCE_DIGITS
+    return max(now, last_id + 1)
+
+
+class CsvStorage:
+    # the original storage: every change rewrites the whole csv file.
+    # with a cache_dir the parsed frame is also pickled next to the csv file, and used again as long as
+    # the size and the modified time of the csv file are the same.
+    # the files in columnar are kept in the columnar format of columnar.py instead, next to the csv file.
+    # schemas: file -> the column types of schema.py, the tables are loaded with them and saved as text again
+    def __init__(self, cache_dir=None, columnar=(), schemas=None):
+        self.cache_dir = cache_dir
+        self.columnar = set(columnar)
+        self.schemas = schemas or {}
+        self.depth = 0
+        self.pending = {}
+        self.staged = set()
+        self.locks = {}
+
+    def column_table(self, file_path):
+        # the columnar table of the file, None when the file is not kept in the columnar format (yet)
+        if file_path in self.columnar and read_current(columns_path(file_path)):
+            return ColumnTable(columns_path(file_path))
+        return None
+
+    def load(self, file_path):
+        return typed(self.schemas.get(file_path), self.read(file_path))
+
+    def read(self, file_path):
+        # the table as it is in the file
+        table = self.column_table(file_path)
+        if table is not None:
+            return table.to_frame()
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return pd.DataFrame()
+        if stat.st_size <= 2:
+            # an empty table without columns is saved as a blank line
+            return pd.DataFrame()
+        if self.cache_dir is None:
+            return pd.read_csv(file_path)
+
+        cache_path = os.path.join(os.path.dirname(os.path.abspath(file_path)), self.cache_dir,
+                                  os.path.basename(file_path) + ".pkl")
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        try:
+            with open(cache_path, "rb") as f:
+                cached_stamp, data = pickle.load(f)
+            if cached_stamp == stamp:
+                return data
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            pass
+        data = pd.read_csv(file_path)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        write_atomic(cache_path, lambda f: pickle.dump((stamp, data), f, protocol=pickle.HIGHEST_PROTOCOL), "wb")
+        return data
+
+    def save(self, file_path, data):
+        data = stored(self.schemas.get(file_path), data)
+        if file_path in self.columnar:
+            REGISTRY.count(file_path, saves=1, bytes_written=write_columns(data, columns_path(file_path)))
+            return
+        # write a temporary file and rename it, so other processes never read a half written file
+        write_atomic(file_path, lambda f: data.to_csv(f, index=False))
+        REGISTRY.count(file_path, saves=1, bytes_written=os.path.getsize(file_path))
+
+    def lock(self, file_path):
+        # the lock of the data directory of the file, held while changing the tables
+        path = data_lock_path(file_path)
+        if path not in self.locks:
+            self.locks[path] = FileLock(path)
+        return self.locks[path]
+
+    def version_path(self, file_path):
+        return file_path + ".version"
+
+    def version(self, file_path):
+        # the number of times the table was changed, by any process
+        try:
+            with open(self.version_path(file_path)) as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def bump_version(self, file_path):
+        version = self.version(file_path) + 1
+        write_atomic(self.version_path(file_path), lambda f: f.write(str(version)))
+        return version
+
+    def stage_version(self, file_path):
+        # the version the table will have once the transaction is committed: it is bumped right after the file is
+        # written, so a version reached means the changes of the table were saved
+        if not self.depth:
+            return self.bump_version(file_path)
+        self.staged.add(file_path)
+        return self.version(file_path) + 1
+
+    def ids_path(self, file_path):
+        return file_path + ".ids"
+
+    def allocate_ids(self, file_path, count=1):
+        # a block of count new ids for the table, the last id handed out is kept in "<file>.ids" so no two
+        # processes using the data directory ever get the same id
+        with self.lock(file_path):
+            try:
+                with open(self.ids_path(file_path)) as f:
+                    last_id = int(f.read().strip() or 0)
+            except (FileNotFoundError, ValueError):
+                last_id = 0
+            start = first_id(last_id)
+            write_atomic(self.ids_path(file_path), lambda f: f.write(str(start + count - 1)))
+        return list(range(start, start + count))
+
+    def insert(self, file_path, data, start):
+        self.write(file_path, data, [])
+
+    def update(self, file_path, data, index, changes):
+        self.write(file_path, data, [])
+
+    def compact(self, file_path, data, background=False):
+        self.save(file_path, data)
+
+    def chunks(self, file_path, chunk_size):
+        # the rows of the table chunk_size at a time, without loading the whole table
+        table = self.column_table(file_path)
+        schema = self.schemas.get(file_path)
+        if table is not None:
+            for start in range(0, len(table), chunk_size):
+                yield typed(schema, table.to_frame(rows=list(range(start, min(start + chunk_size, len(table))))))
+        elif os.path.exists(file_path):
+            for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+                yield typed(schema, chunk)
+
+    def find(self, file_path, conditions):
+        # the csv storage can not search without loading the file, the caller filters the loaded table.
+        # a columnar table only reads the columns of the conditions, and the other columns of the matching rows
+        table = self.column_table(file_path)
+        if table is None:
+            return None
+        return typed(self.schemas.get(file_path), table.find(conditions))
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # the changes made inside the transaction are written together when the outermost one ends,
+        # and not at all when it ends with an error. together is one file after the other: only the sqlite
+        # storage commits the changes of several tables at once
+        self.depth += 1
+        try:
+            yield
+        except BaseException:
+            self.depth -= 1
+            if self.depth == 0:
+                self.pending = {}
+                self.staged = set()
+            raise
+        else:
+            self.depth -= 1
+            if self.depth == 0:
+                pending, self.pending = self.pending, {}
+                staged, self.staged = self.staged, set()
+                # the files are written one after the other: a failure half way leaves the tables written before
+                # it saved (with their versions bumped), the csv storages can not commit several files at once
+                for file_path, (data, records) in pending.items():
+                    self.commit(file_path, data, records)
+                    if file_path in staged:
+                        staged.discard(file_path)
+                        self.bump_version(file_path)
+                # the tables saved whole during the transaction
+                for file_path in sorted(staged):
+                    self.bump_version(file_path)
+
+    def replace(self, file_path, data):
+        # save the whole table with the other changes of the transaction, instead of its row changes waiting
+        # (records None is a full save)
+        if self.depth:
+            self.pending[file_path] = (data, None)
+        else:
+            self.save(file_path, data)
+
+    def write(self, file_path, data, records):
+        if self.depth:
+            waiting = self.pending.get(file_path, (None, []))[1]
+            # the rows changed after a full save of the table are in the data it saves
+            self.pending[file_path] = (data, None if waiting is None else waiting + records)
+        else:
+            self.commit(file_path, data, records)
+
+    def commit(self, file_path, data, records):
+        self.save(file_path, data)
+
+
+class JournalStorage(CsvStorage):
+    # every change is appended as one json line to "<file>.journal", the csv file is only a snapshot.
+    # the records carry the row position, so replaying a record already in the snapshot changes nothing.
+    def __init__(self, compact_every=10000, cache_dir=None, columnar=(), schemas=None):
+        super().__init__(cache_dir, columnar, schemas)
+        self.compact_every = compact_every
+        self.journal_size = {}
+        self.compacting = {}
+
+    def journal_path(self, file_path):
+        return file_path + ".journal"
+
+    def sealed_path(self, file_path):
+        return file_path + ".journal.old"
+
+    def load(self, file_path):
+        # the records are replayed on the text of the file, the types are set after
+        while True:
+            stamps = self.stamps(file_path)
+            data = self.read(file_path)
+            count = 0
+            for path in (self.sealed_path(file_path), self.journal_path(file_path)):
+                try:
+                    data, replayed = self.replay(path, data)
+                    count += replayed
+                except FileNotFoundError:
+                    pass
+            if self.stamps(file_path) == stamps:
+                break
+            # another process has sealed the journal or replaced the snapshot while reading, so the records read
+            # may not go with the snapshot read: read them again
+        self.journal_size[file_path] = count
+        return typed(self.schemas.get(file_path), data)
+
+    def snapshot_stamp(self, file_path):
+        # changes whenever a compaction writes a new snapshot of the file
+        if file_path in self.columnar:
+            return file_stamp(os.path.join(columns_path(file_path), "CURRENT"))
+        return file_stamp(file_path)
+
+    def stamps(self, file_path):
+        # the snapshot, the sealed journal and the journal file (not its size, it only grows) of the table
+        journal = file_stamp(self.journal_path(file_path))
+        return self.snapshot_stamp(file_path), file_stamp(self.sealed_path(file_path)), journal and journal[0]
+
+    def find(self, file_path, conditions):
+        # the snapshot can only be searched when there are no journal records to add to it
+        for path in (self.sealed_path(file_path), self.journal_path(file_path)):
+            if os.path.exists(path) and os.path.getsize(path):
+                return None
+        return super().find(file_path, conditions)
+
+    def chunks(self, file_path, chunk_size):
+        # the journal records are only right on top of the whole snapshot
+        for path in (self.sealed_path(file_path), self.journal_path(file_path)):
+            if os.path.exists(path) and os.path.getsize(path):
+                data = self.load(file_path)
+                for start in range(0, len(data), chunk_size):
+                    yield data.iloc[start:start + chunk_size]
+                return
+        yield from super().chunks(file_path, chunk_size)
+
+    def replay(self, path, data):
+        new_rows = []
+        count = 0
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a half written last line from a crash, ignore it
+                    continue
+                # the changes of one transaction are written as one "batch" line
+                for record in record["records"] if record["op"] == "batch" else [record]:
+                    count += 1
+                    row = record["row"]
+                    if record["op"] == "insert":
+                        if row >= len(data) + len(new_rows):
+                            new_rows.append(record["values"])
+                    else:
+                        # the inserts have to be in the frame before updating them
+                        if new_rows:
+                            data = self.concat_rows(data, new_rows)
+                            new_rows = []
+                        for column, value in record["values"].items():
+                            data.loc[row, column] = value
+        if new_rows:
+            data = self.concat_rows(data, new_rows)
+        return data, count
+
+    def concat_rows(self, data, rows):
+        # go through the csv parser so the replayed rows get the same types as rows read from the csv file
+        text = pd.DataFrame(rows).to_csv(index=False)
+        return pd.concat([data, pd.read_csv(io.StringIO(text))], ignore_index=True)
+
+    def append(self, file_path, records, batch=False):
+        if batch and len(records) > 1:
+            lines = json.dumps({"op": "batch", "records": records}, default=_json_value) + "\n"
+        else:
+            lines = "".join(json.dumps(record, default=_json_value) + "\n" for record in records)
+        with open(self.journal_path(file_path), "a") as f:
+            f.write(lines)
+            f.flush()
+        REGISTRY.count(file_path, saves=1, bytes_written=len(lines.encode("utf-8")))
+        self.journal_size[file_path] = self.journal_size.get(file_path, 0) + len(records)
+
+    def insert(self, file_path, data, start):
+        columns = list(data.columns)
+        records = []
+        rows = stored(self.schemas.get(file_path), data.iloc[start:])
+        for row, values in enumerate(rows.itertuples(index=False, name=None), start):
+            records.append({"op": "insert", "row": row, "values": dict(zip(columns, values))})
+        self.write(file_path, data, records)
+
+    def update(self, file_path, data, index, changes):
+        changes = stored_values(self.schemas.get(file_path), changes)
+        self.write(file_path, data, [{"op": "update", "row": int(index), "values": changes}])
+
+    def commit(self, file_path, data, records):
+        if records is None:
+            self.save(file_path, data)
+            return
+        self.append(file_path, records, batch=True)
+        self.check_size(file_path, data)
+
+    def save(self, file_path, data):
+        # a full save is a compaction in journal mode
+        self.compact(file_path, data)
+
+    def check_size(self, file_path, data):
+        if self.compact_every and self.journal_size.get(file_path, 0) >= self.compact_every:
+            self.compact(file_path, data, background=True)
+
+    def compact(self, file_path, data, background=False):
+        # fold the journal back into the csv snapshot.
+        # the journal is sealed under the lock of the data directory, and the snapshot replaces the csv file
+        # under it too, so no process reads the new csv file with the sealed records or the old one without them
+        journal = self.journal_path(file_path)
+        sealed = self.sealed_path(file_path)
+        with self.lock(file_path):
+            if os.path.exists(journal):
+                if os.path.exists(sealed):
+                    # a crash (or a compaction still running) left an old journal, keep its records in front of
+                    # the new ones
+                    with open(sealed, "a") as old, open(journal) as new:
+                        old.write(new.read())
+                    os.remove(journal)
+                else:
+                    os.replace(journal, sealed)
+            self.journal_size[file_path] = 0
+            if not background:
+                CsvStorage.save(self, file_path, data)
+                if os.path.exists(sealed):
+                    os.remove(sealed)
+                return
+            stamps = self.snapshot_stamp(file_path), file_stamp(sealed)
+        snapshot = data.copy()
+
+        def write_snapshot():
+            # the thread takes the lock with its own file, the lock of the storage only counts its holders
+            temp_path = None
+            if file_path not in self.columnar:
+                temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                rows = stored(self.schemas.get(file_path), snapshot)
+                with open(temp_path, "w", newline="") as f:
+                    rows.to_csv(f, index=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+            with FileLock(data_lock_path(file_path)):
+                if (self.snapshot_stamp(file_path), file_stamp(sealed)) != stamps:
+                    # a later compaction has sealed more records or written its snapshot, which is newer than
+                    # this one
+                    if temp_path is not None:
+                        os.remove(temp_path)
+                    return
+                if temp_path is None:
+                    CsvStorage.save(self, file_path, snapshot)
+                else:
+                    os.replace(temp_path, file_path)
+                    REGISTRY.count(file_path, saves=1, bytes_written=os.path.getsize(file_path))
+                if os.path.exists(sealed):
+                    os.remove(sealed)
+
+        worker = threading.Thread(target=write_snapshot, daemon=True)
+        self.compacting[file_path] = worker
+        worker.start()
+
+
+def _sql_name(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_value(value):
+    # numpy scalars and NaN are stored as python values / NULL
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+# the columns searched by the operations get an index in the database
+SQL_INDEXES = {
+    "rooms": [["Room Number"], ["Status", "Room Type"]],
+    "guests": [["name", "contact"], ["contact"]],
+    "reservations": [["reservation_id"], ["room_number"], ["contact"], ["is_check-in"]]
+}
+
+
+class SqliteStorage:
+    # every table of the system is a table of one sqlite database, "row_id" is the row of the dataframe.
+    # a change is one insert / update statement, and the changes of a transaction() are committed together.
+    # find() and chunks() search the database only while the table is not loaded: the operations looking a row up
+    # in the dictionary indexes (check in, check out, ...) load the whole table once, then only the rows they
+    # change are written
+    def __init__(self, database, schemas=None):
+        self.database = database
+        self.schemas = schemas or {}
+        self.connection = sqlite3.connect(database, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS hms_columns "
+                                "(table_name TEXT, column_name TEXT, position INTEGER, dtype TEXT)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS hms_versions (table_name TEXT PRIMARY KEY, version INTEGER)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS hms_ids (table_name TEXT PRIMARY KEY, last_id INTEGER)")
+        self.depth = 0
+
+    def table_name(self, file_path):
+        # rooms.csv -> rooms
+        return os.path.splitext(os.path.basename(file_path))[0]
+
+    def columns(self, table):
+        rows = self.connection.execute("SELECT column_name, dtype FROM hms_columns WHERE table_name = ? "
+                                       "ORDER BY position", (table,)).fetchall()
+        return dict(rows)
+
+    def create_table(self, table, data):
+        columns = []
+        for position, (column, dtype) in enumerate(data.dtypes.items()):
+            sql_type = "INTEGER" if dtype.kind in "iub" else "REAL" if dtype.kind == "f" else "TEXT"
+            columns.append(f"{_sql_name(column)} {sql_type}")
+            self.connection.execute("INSERT INTO hms_columns VALUES (?, ?, ?, ?)",
+                                    (table, column, position, "bool" if dtype.kind == "b" else str(dtype.kind)))
+        self.connection.execute(f"CREATE TABLE {_sql_name(table)} (row_id INTEGER PRIMARY KEY, {', '.join(columns)})")
+        for index_columns in SQL_INDEXES.get(table, []):
+            if all(column in data.columns for column in index_columns):
+                name = _sql_name(f"{table}_{'_'.join(index_columns)}".replace(" ", "_"))
+                self.connection.execute(f"CREATE INDEX {name} ON {_sql_name(table)} "
+                                        f"({', '.join(_sql_name(column) for column in index_columns)})")
+
+    def add_columns(self, table, columns):
+        known = self.columns(table)
+        for column in columns:
+            if column not in known:
+                self.connection.execute(f"ALTER TABLE {_sql_name(table)} ADD COLUMN {_sql_name(column)}")
+                self.connection.execute("INSERT INTO hms_columns VALUES (?, ?, ?, ?)",
+                                        (table, column, len(known), "O"))
+                known[column] = "O"
+
+    def to_frame(self, table, rows):
+        columns = self.columns(table)
+        data = pd.DataFrame.from_records(rows, columns=["row_id"] + list(columns), index="row_id")
+        data.index.name = None
+        for column, dtype in columns.items():
+            if dtype == "bool":
+                data[column] = data[column].astype(bool)
+        return data
+
+    def load(self, file_path):
+        table = self.table_name(file_path)
+        if not self.columns(table):
+            # the first time, the table is imported from the csv file if there is one
+            if not os.path.exists(file_path):
+                return pd.DataFrame()
+            self.import_csv(file_path)
+        rows = self.connection.execute(f"SELECT * FROM {_sql_name(table)} ORDER BY row_id").fetchall()
+        return typed(self.schemas.get(file_path), self.to_frame(table, rows))
+
+    def chunks(self, file_path, chunk_size):
+        table = self.table_name(file_path)
+        if not self.columns(table):
+            return
+        cursor = self.connection.cursor()
+        cursor.execute(f"SELECT * FROM {_sql_name(table)} ORDER BY row_id")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield typed(self.schemas.get(file_path), self.to_frame(table, rows))
+
+    def find(self, file_path, conditions):
+        # the rows matching all the conditions {column: value or list of values}, searched by sqlite
+        table = self.table_name(file_path)
+        if not self.columns(table):
+            return None
+        where = []
+        params = []
+        for column, value in conditions.items():
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            where.append(f"{_sql_name(column)} IN ({', '.join('?' * len(values))})")
+            params += [_sql_value(item) for item in values]
+        sql = f"SELECT * FROM {_sql_name(table)}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = self.connection.execute(sql + " ORDER BY row_id", params).fetchall()
+        return typed(self.schemas.get(file_path), self.to_frame(table, rows))
+
+    def insert(self, file_path, data, start):
+        table = self.table_name(file_path)
+        data = stored(self.schemas.get(file_path), data.iloc[start:])
+        with self.transaction():
+            if not self.columns(table):
+                self.create_table(table, data)
+            self.add_columns(table, data.columns)
+            columns = ["row_id"] + list(data.columns)
+            rows = ([_sql_value(value) for value in row]
+                    for row in data.itertuples(index=True, name=None))
+            self.connection.executemany(f"INSERT OR REPLACE INTO {_sql_name(table)} "
+                                        f"({', '.join(_sql_name(column) for column in columns)}) "
+                                        f"VALUES ({', '.join('?' * len(columns))})", rows)
+            REGISTRY.count(file_path, saves=1)
+
+    def update(self, file_path, data, index, changes):
+        table = self.table_name(file_path)
+        changes = stored_values(self.schemas.get(file_path), changes)
+        with self.transaction():
+            self.add_columns(table, changes)
+            assignments = ", ".join(f"{_sql_name(column)} = ?" for column in changes)
+            self.connection.execute(f"UPDATE {_sql_name(table)} SET {assignments} WHERE row_id = ?",
+                                    [_sql_value(value) for value in changes.values()] + [int(index)])
+            REGISTRY.count(file_path, saves=1)
+
+    def save(self, file_path, data):
+        # replace the whole table
+        table = self.table_name(file_path)
+        data = stored(self.schemas.get(file_path), data)
+        with self.transaction():
+            if self.columns(table):
+                self.connection.execute(f"DROP TABLE {_sql_name(table)}")
+                self.connection.execute("DELETE FROM hms_columns WHERE table_name = ?", (table,))
+            if len(data.columns):
+                self.create_table(table, data)
+                self.insert(file_path, data, 0)
+
+    def compact(self, file_path, data, background=False):
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def replace(self, file_path, data):
+        # the changes are in the sqlite transaction already, the save replaces them in it
+        self.save(file_path, data)
+
+    def lock(self, file_path):
+        # BEGIN IMMEDIATE takes the write lock of the database, readers are not blocked in WAL mode
+        return self.transaction()
+
+    def version(self, file_path):
+        row = self.connection.execute("SELECT version FROM hms_versions WHERE table_name = ?",
+                                      (self.table_name(file_path),)).fetchone()
+        return row[0] if row else 0
+
+    def bump_version(self, file_path):
+        with self.transaction():
+            version = self.version(file_path) + 1
+            self.connection.execute("INSERT OR REPLACE INTO hms_versions VALUES (?, ?)",
+                                    (self.table_name(file_path), version))
+        return version
+
+    def stage_version(self, file_path):
+        # bumped in the transaction, so it is committed with the changes of the table
+        return self.bump_version(file_path)
+
+    def allocate_ids(self, file_path, count=1):
+        # a block of count new ids for the table, the last id handed out is kept in hms_ids
+        table = self.table_name(file_path)
+        with self.transaction():
+            row = self.connection.execute("SELECT last_id FROM hms_ids WHERE table_name = ?", (table,)).fetchone()
+            start = first_id(row[0] if row else 0)
+            self.connection.execute("INSERT OR REPLACE INTO hms_ids VALUES (?, ?)", (table, start + count - 1))
+        return list(range(start, start + count))
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # one sqlite transaction, the inner ones are part of the outermost one
+        if self.depth == 0:
+            self.connection.execute("BEGIN IMMEDIATE")
+        self.depth += 1
+        try:
+            yield
+        except BaseException:
+            self.depth -= 1
+            if self.depth == 0:
+                self.connection.execute("ROLLBACK")
+            raise
+        else:
+            self.depth -= 1
+            if self.depth == 0:
+                self.connection.execute("COMMIT")
+
+    def import_csv(self, file_path):
+        # replace the table with the rows of the csv file
+        self.save(file_path, pd.read_csv(file_path))
+
+    def export_csv(self, file_path, out_path=None):
+        # write the table back to the csv file (or to out_path)
+        data = stored(self.schemas.get(file_path), self.load(file_path))
+        data.to_csv(out_path or file_path, index=False)
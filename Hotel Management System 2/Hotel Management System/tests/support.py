@@ -0,0 +1,39 @@
+import os
+import shutil
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HERE)
+
+from HMS import HotelManagementSystem
+
+# the arguments of HotelManagementSystem for the files of a data directory
+FILES = {
+    "rooms_file": "rooms.csv",
+    "guests_file": "guests.csv",
+    "reservations_file": "reservations.csv",
+    "house_keeping_file": "housekeeping_schedule.csv",
+    "feedback_file": "feedback.csv",
+    "rates_file": "rates.csv",
+    "waitlist_file": "waitlist.csv"
+}
+# the storages a system can use, the options of HotelManagementSystem
+BACKENDS = {"csv": {}, "journal": {"journal": True}, "sqlite": {"database": "hotel.db"}}
+
+
+def data_copy():
+    # a temporary directory with a copy of the shipped csv files
+    directory = tempfile.TemporaryDirectory()
+    for name in os.listdir(HERE):
+        if name.endswith(".csv"):
+            shutil.copy(os.path.join(HERE, name), directory.name)
+    return directory
+
+
+def open_hms(directory, backend = "csv", **options):
+    files = {argument: os.path.join(directory, name) for argument, name in FILES.items()}
+    options = dict(BACKENDS[backend], **options)
+    if "database" in options:
+        options["database"] = os.path.join(directory, options["database"])
+    return HotelManagementSystem(**files, **options)
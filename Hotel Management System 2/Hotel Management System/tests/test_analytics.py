@@ -0,0 +1,55 @@
+import contextlib
+import io
+import unittest
+from datetime import date, timedelta
+
+from support import BACKENDS, data_copy, open_hms
+
+FUTURE = int((date.today() + timedelta(days=20)).strftime("%Y%m%d"))
+
+
+class AnalyticsTest(unittest.TestCase):
+    def operations(self, backend):
+        # the analytics are made before the changes, and followed incrementally
+        directory = data_copy()
+        self.addCleanup(directory.cleanup)
+        hms = open_hms(directory.name, backend)
+        hms.analytics
+        order = hms.reservations[hms.reservations["is_check-in"] == "un-check-in"].iloc[-1]
+        with contextlib.redirect_stdout(io.StringIO()):
+            reserved = hms.reserve("Jack", 100000001, "DoubleRoom", FUTURE, 3)
+            hms.check_in_order(reserved["reservation_id"])
+            room = hms.check_in_order(order["reservation_id"])["room_number"]
+            hms.check_out_room(room)
+            hms.check_out_room("L333")
+            hms.post_feedback("Jack", 100000001, 8, "Quiet room")
+            hms.post_feedback("Ryan", 445, 3, "Noisy")
+            hms.register_to_member("Ryan", 445)
+            hms.archive_reservations()
+        return hms
+
+    def test_incremental_is_rebuild(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                hms = self.operations(backend)
+                self.assertTrue(hms.check_analytics(repair=False))
+                today = int(date.today().strftime("%Y%m%d"))
+                report = hms.analytics.report(today, FUTURE + 5)
+                self.assertGreater(report.loc[report["Room Type"] == "All", "Revenue"].iloc[0], 0)
+                self.assertEqual(hms.analytics.rating_report()["count"], len(hms.feedback))
+
+    def test_report_of_the_shipped_data(self):
+        directory = data_copy()
+        self.addCleanup(directory.cleanup)
+        hms = open_hms(directory.name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = hms.analytics_report(20250101, 20250131)
+        self.assertTrue(result["ok"])
+        hotel = result["report"][-1]
+        self.assertEqual(hotel["Room Type"], "All")
+        self.assertEqual(hotel["Rooms"], len(hms.rooms))
+        self.assertFalse(hms.analytics_report(20250131, 20250101)["ok"])
+
+
+if __name__ == "__main__":
+    unittest.main()
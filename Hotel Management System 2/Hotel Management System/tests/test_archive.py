@@ -0,0 +1,85 @@
+import contextlib
+import io
+import os
+import unittest
+
+from support import BACKENDS, data_copy, open_hms
+
+
+class Broken(Exception):
+    pass
+
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = data_copy()
+        self.addCleanup(self.directory.cleanup)
+
+    def archive_on_check_out(self, backend):
+        directory = data_copy()
+        self.addCleanup(directory.cleanup)
+        # 4 orders of the shipped data are Checked-out, the check out of L333 makes the 5th
+        hms = open_hms(directory.name, backend, archive_every=5)
+        reserve_id = str(hms.reservations.loc[hms.room_reservation["L333"], "reservation_id"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(hms.check_out_room("L333")["ok"])
+        self.assertEqual(hms.checked_out_count, 0)
+        self.assertTrue(os.listdir(hms.archive.directory))
+
+        for system in (hms, open_hms(directory.name, backend)):
+            self.assertNotIn(reserve_id, system.reservation_index)
+            self.assertFalse((system.reservations["is_check-in"] == "Checked-out").any())
+            history = system.reservation_history(20250101, 20250131, guest_name="Jack")
+            found = history[history["reservation_id"].astype(str) == reserve_id]
+            self.assertEqual(len(found), 1)
+            self.assertEqual(found["is_check-in"].iloc[0], "Checked-out")
+            self.assertTrue(system.check_indexes()["ok"])
+
+        # the count goes on from the smaller table
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(hms.check_out_room("L444")["ok"])
+        self.assertEqual(hms.checked_out_count, 1)
+
+    def test_archive_on_check_out(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                self.archive_on_check_out(backend)
+
+    def test_no_archive_by_default(self):
+        hms = open_hms(self.directory.name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(hms.check_out_room("L333")["ok"])
+        self.assertFalse(os.path.exists(hms.archive.directory))
+        self.assertEqual(hms.checked_out_count, 5)
+        self.assertEqual(hms.checked_out_count, int((hms.reservations["is_check-in"] == "Checked-out").sum()))
+
+    def test_failed_archive_keeps_the_order_once(self):
+        # the archive files are written, then saving the tables fails: the order is found once, in the table
+        hms = open_hms(self.directory.name, archive_every=5)
+        reserve_id = str(hms.reservations.loc[hms.room_reservation["L333"], "reservation_id"])
+
+        def broken(*args, **kwargs):
+            raise Broken()
+
+        hms.storage.commit = broken
+        with contextlib.redirect_stdout(io.StringIO()), self.assertRaises(Broken):
+            hms.check_out_room("L333")
+        self.assertTrue(os.listdir(hms.archive.directory))
+
+        system = open_hms(self.directory.name, archive_every=5)
+        history = system.reservation_history()
+        found = history[history["reservation_id"].astype(str) == reserve_id]
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found["is_check-in"].iloc[0], "Checked-in")
+        self.assertEqual(history["reservation_id"].duplicated().sum(), 0)
+
+        # the next archiving replaces the archived copies
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(system.check_out_room("L333")["ok"])
+        history = system.reservation_history()
+        self.assertEqual(history["reservation_id"].duplicated().sum(), 0)
+        self.assertEqual(len(system.reservations), len(history) - 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
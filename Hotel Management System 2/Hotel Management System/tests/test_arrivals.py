@@ -0,0 +1,75 @@
+import contextlib
+import io
+import os
+import unittest
+from datetime import date, timedelta
+
+import pandas as pd
+
+# support puts the source directory on the path
+from support import data_copy, open_hms
+from HMS import LuxuryRoom, SingleRoom
+
+DAY = date.today() + timedelta(days=20)
+FUTURE = int(DAY.strftime("%Y%m%d"))
+NEXT = int((DAY + timedelta(days=1)).strftime("%Y%m%d"))
+RYAN = 241223163121
+
+
+class ArrivalsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = data_copy()
+        self.addCleanup(self.directory.cleanup)
+
+    def order(self, reservation_id, room_type, reserved_date, day, name = "Jack", contact = 100000001):
+        return {"reservation_id": reservation_id, "guest_name": name, "contact": contact, "room_number": "Un-Arrange",
+                "room_type": room_type, "reserved_date": reserved_date, "day": day, "is_check-in": "un-check-in",
+                "order_amount": 250.0 * day}
+
+    def add_orders(self, orders):
+        path = os.path.join(self.directory.name, "reservations.csv")
+        pd.concat([pd.read_csv(path), pd.DataFrame(orders)]).to_csv(path, index=False)
+
+    def test_longest_stays_in_room_number_order(self):
+        hms = open_hms(self.directory.name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            hms.add_room(SingleRoom("S9"))
+            short = hms.reserve("Jack", 100000001, "SingleRoom", FUTURE, 1)["reservation_id"]
+            long = hms.reserve("Kai", 100000002, "SingleRoom", FUTURE, 3)["reservation_id"]
+            result = hms.check_in_arrivals(FUTURE)
+        rooms = {row["reservation_id"]: row["room_number"] for row in result["assignments"]}
+        self.assertEqual(rooms, {long: "S9", short: "S101"})
+
+    def test_room_free_for_the_whole_stay(self):
+        # every DoubleRoom is booked from the next day on, so the three night stay has no room for all its nights
+        orders = [self.order(300000000000 + n, "DoubleRoom", NEXT, 2) for n in range(10)]
+        orders.append(self.order(300000000100, "DoubleRoom", FUTURE, 3))
+        orders.append(self.order(300000000101, "DoubleRoom", FUTURE, 1))
+        self.add_orders(orders)
+        hms = open_hms(self.directory.name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = hms.check_in_arrivals(FUTURE)
+        self.assertEqual([row["reservation_id"] for row in result["assignments"]], [300000000101])
+        self.assertEqual([(row["reservation_id"], row["reason"]) for row in result["unassigned"]],
+                         [(300000000100, "no room free for the whole stay")])
+        self.assertNotIn("300000000100", hms.waitlist_queue)
+
+    def test_waitlist_first(self):
+        hms = open_hms(self.directory.name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for room in hms.available_rooms["LuxuryRoom"].copy():
+                hms.room_status_modify(room)
+            self.assertEqual(hms.check_in_order(RYAN)["position"], 1)
+            arrival = hms.reserve("Jack", 100000001, "LuxuryRoom", FUTURE, 2)["reservation_id"]
+            # a new room does not go to the waitlist by itself
+            hms.add_room(LuxuryRoom("L1000"))
+            result = hms.check_in_arrivals(FUTURE)
+        self.assertEqual([(row["reservation_id"], row["room_number"]) for row in result["waitlist"]],
+                         [(str(RYAN), "L1000")])
+        self.assertEqual(result["assignments"], [])
+        self.assertEqual(result["unassigned"][0]["position"], 1)
+        self.assertEqual(open_hms(self.directory.name).waitlist_queue.position(arrival), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+import pandas as pd
+
+from support import HERE, data_copy, open_hms
+from batch import run_batch
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        # a copy of the data files, the batches run in it
+        self.directory = data_copy()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def commands(self, name, commands):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as f:
+            for command in commands:
+                f.write(json.dumps(command) + "\n")
+        return path
+
+    def run_batches(self, paths, journal = False):
+        # run the batch files at the same time, one process each
+        arguments = ["--journal"] if journal else []
+        processes = [subprocess.Popen([sys.executable, os.path.join(HERE, "batch.py"), path] + arguments,
+                                      cwd=self.directory.name, stdout=subprocess.DEVNULL) for path in paths]
+        for process in processes:
+            self.assertEqual(process.wait(), 0)
+
+    def feedback_batches(self, journal = False):
+        before = len(pd.read_csv(os.path.join(self.directory.name, "feedback.csv")))
+        paths = [self.commands(f"batch{i}.jsonl",
+                               [{"op": "feedback", "name": f"Guest{i}", "contact": 100000000 + n, "rate": 5,
+                                 "comment": f"batch {i} line {n}"} for n in range(300)])
+                 for i in range(2)]
+        self.run_batches(paths, journal)
+        from storage import CsvStorage, JournalStorage
+        storage = JournalStorage() if journal else CsvStorage()
+        feedback = storage.load(os.path.join(self.directory.name, "feedback.csv"))
+        self.assertEqual(len(feedback), before + 600)
+        for i in range(2):
+            self.assertEqual((feedback["name"] == f"Guest{i}").sum(), 300)
+
+    def test_two_batches_keep_both(self):
+        # two processes running a batch on the same data directory, neither overwrites the rows of the other
+        self.feedback_batches()
+
+    def test_two_batches_keep_both_journal(self):
+        self.feedback_batches(journal=True)
+
+    def test_bad_line_saves_nothing(self):
+        path = self.commands("bad.jsonl", [{"op": "feedback", "name": "Guest", "contact": 100000000, "rate": 5,
+                                            "comment": "first"}])
+        with open(path, "a") as f:
+            f.write("{not json\n")
+        before = len(pd.read_csv(os.path.join(self.directory.name, "feedback.csv")))
+        process = subprocess.run([sys.executable, os.path.join(HERE, "batch.py"), path], cwd=self.directory.name,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.assertNotEqual(process.returncode, 0)
+        self.assertEqual(len(pd.read_csv(os.path.join(self.directory.name, "feedback.csv"))), before)
+
+    def test_command_failing_half_way_saves_nothing_of_itself(self):
+        # the check in changes the reservation, then fails before the room is Occupied
+        hms = open_hms(self.directory.name)
+
+        def broken(*args):
+            raise RuntimeError("calendar down")
+
+        hms.calendar.check_in = broken
+        files = {name: self.read(name) for name in ("reservations.csv", "rooms.csv")}
+        feedback = len(pd.read_csv(os.path.join(self.directory.name, "feedback.csv")))
+        path = self.commands("half.jsonl", [
+            {"op": "feedback", "name": "Guest", "contact": 100000000, "rate": 5, "comment": "before"},
+            {"op": "check_in", "reserve_id": "241222224005"},
+            {"op": "add_guest", "name": "Zoe", "contact": 100000009},
+            {"op": "feedback", "name": "Guest", "contact": 100000000, "rate": 4, "comment": "after"}])
+        results = run_batch(hms, path)
+        self.assertEqual([result["ok"] for result in results], [True, False, True, True])
+        self.assertIn("calendar down", results[1]["message"])
+        self.assertEqual({name: self.read(name) for name in files}, files)
+        self.assertEqual(len(pd.read_csv(os.path.join(self.directory.name, "feedback.csv"))), feedback + 2)
+        self.assertIn("Zoe", pd.read_csv(os.path.join(self.directory.name, "guests.csv"))["name"].tolist())
+        self.assertEqual(hms.reservations.loc[hms.reservation_index["241222224005"], "is_check-in"], "un-check-in")
+        self.assertTrue(hms.check_indexes()["ok"])
+
+    def read(self, name):
+        with open(os.path.join(self.directory.name, name), "rb") as f:
+            return f.read()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import contextlib
+import io
+import unittest
+from datetime import date, timedelta
+
+# support puts the source directory on the path
+from support import data_copy, open_hms
+from HMS import LuxuryRoom
+
+FUTURE = int((date.today() + timedelta(days=60)).strftime("%Y%m%d"))
+
+
+class BulkTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = data_copy()
+        self.addCleanup(self.directory.cleanup)
+        self.hms = open_hms(self.directory.name)
+
+    def bulk(self, method, rows):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return getattr(self.hms, method)(rows)
+
+    def test_add_rooms(self):
+        before = len(self.hms.rooms)
+        report = self.bulk("add_rooms", [LuxuryRoom("L333"), {"Room Number": "L101", "Room Type": "LuxuryRoom"},
+                                         {"Room Number": "L101", "Room Type": "LuxuryRoom"},
+                                         {"Room Number": "S201", "Room Type": "SingleRoom"}])
+        self.assertEqual(report["result"].tolist(), ["exist", "added", "exist", "added"])
+        self.assertEqual(len(self.hms.rooms), before + 2)
+        self.assertIn("L101", self.hms.available_rooms["LuxuryRoom"])
+        self.assertTrue(self.hms.check_indexes()["ok"])
+        self.assertEqual(len(open_hms(self.directory.name).rooms), before + 2)
+
+    def test_add_guests(self):
+        before = len(self.hms.guests)
+        report = self.bulk("add_guests", [{"name": "Jack", "contact": 100000001},
+                                          {"name": "Mia", "contact": 555},
+                                          {"name": "Mia", "contact": 555},
+                                          {"name": "Noah", "contact": 556, "membership": True}])
+        self.assertEqual(report["result"].tolist(), ["exist", "added", "exist", "added"])
+        system = open_hms(self.directory.name)
+        self.assertEqual(len(system.guests), before + 2)
+        self.assertFalse(system.guests.loc[system.guest_index[("Mia", "555")], "membership"])
+        self.assertTrue(system.guests.loc[system.guest_index[("Noah", "556")], "membership"])
+
+    def test_add_reservations(self):
+        before = len(self.hms.reservations)
+        existing = self.hms.reservations["reservation_id"].iloc[0]
+        luxury = len(self.hms.find("rooms", **{"Room Type": "LuxuryRoom"}))
+        orders = [{"reservation_id": existing, "guest_name": "Jack", "contact": 100000001,
+                   "room_type": "SingleRoom", "reserved_date": FUTURE, "day": 1},
+                  {"guest_name": "Mia", "contact": 555, "room_type": "SingleRoom", "reserved_date": 20251399,
+                   "day": 1}]
+        orders += [{"guest_name": f"Guest{n}", "contact": 600 + n, "room_type": "LuxuryRoom",
+                    "reserved_date": FUTURE, "day": 2} for n in range(luxury + 1)]
+        report = self.bulk("add_reservations", orders)
+        self.assertEqual(report["result"].tolist(),
+                         ["duplicate", "invalid date"] + ["added"] * luxury + ["fully booked"])
+        added = report[report["result"] == "added"]
+        # new ids and prices for the orders without them
+        self.assertTrue(added["reservation_id"].notna().all())
+        self.assertFalse(added["reservation_id"].duplicated().any())
+        self.assertEqual(added["order_amount"].tolist(), [1000.0] * luxury)
+        self.assertEqual(self.hms.availability("LuxuryRoom", FUTURE, 2), 0)
+        self.assertTrue(self.hms.check_indexes()["ok"])
+        self.assertEqual(len(open_hms(self.directory.name).reservations), before + luxury)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import contextlib
+import io
+import json
+import os
+import unittest
+
+from support import BACKENDS, data_copy, open_hms
+
+
+class Broken(Exception):
+    pass
+
+
+class ChangeLogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = data_copy()
+        self.addCleanup(self.directory.cleanup)
+
+    def check_in_and_out(self, hms):
+        order = hms.reservations[hms.reservations["is_check-in"] == "un-check-in"].iloc[-1]
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = hms.check_in_order(order["reservation_id"])
+            hms.check_out_room(result["room_number"])
+        return str(order["reservation_id"])
+
+    def test_off_by_default(self):
+        hms = open_hms(self.directory.name)
+        self.check_in_and_out(hms)
+        self.assertIsNone(hms.changes)
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, "changes")))
+
+    def replica_follows(self, backend):
+        directory = data_copy()
+        self.addCleanup(directory.cleanup)
+        hms = open_hms(directory.name, backend, change_log=True)
+        replica = hms.replica()
+        reserve_id = self.check_in_and_out(hms)
+        events = hms.change_events()
+        self.assertEqual([event["seq"] for event in events], list(range(1, len(events) + 1)))
+        self.assertIn("checked_in", [event["event"] for event in events])
+        self.assertEqual(events[-1]["event"], "room_status_changed")
+        self.assertFalse([name for name in os.listdir(hms.changes.directory) if name.startswith("prepared.")])
+
+        self.assertEqual(replica.sync(), len(events))
+        self.assertEqual(replica.tables["reservations"][(reserve_id,)]["is_check-in"], "Checked-out")
+
+    def test_replica_follows(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                self.replica_follows(backend)
+
+    def test_failed_save_writes_no_events(self):
+        hms = open_hms(self.directory.name, change_log=True)
+
+        def broken(*args, **kwargs):
+            raise Broken()
+
+        hms.storage.commit = broken
+        with contextlib.redirect_stdout(io.StringIO()), self.assertRaises(Broken):
+            hms.post_feedback("Jack", 100000001, 9, "Nice stay")
+        self.assertEqual(hms.change_events(), [])
+        self.assertEqual(hms.changes.prepared_paths(), [])
+
+    def test_crash_after_save(self):
+        # the process stops after the tables are saved and before the events are appended: the next operation of
+        # any process appends them first
+        hms = open_hms(self.directory.name, change_log=True)
+        hms.changes.commit = lambda path: None
+        with contextlib.redirect_stdout(io.StringIO()):
+            hms.post_feedback("Jack", 100000001, 9, "Nice stay")
+        self.assertEqual(len(hms.changes.prepared_paths()), 1)
+
+        other = open_hms(self.directory.name, change_log=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            other.post_feedback("Ryan", 445, 3, "Noisy")
+        events = other.change_events()
+        self.assertEqual([event["row"]["name"] for event in events], ["Jack", "Ryan"])
+        self.assertEqual(other.changes.prepared_paths(), [])
+
+    def test_crash_before_save(self):
+        # events prepared for versions the tables never reached are dropped
+        hms = open_hms(self.directory.name, change_log=True)
+        os.makedirs(hms.changes.directory)
+        prepared = {"last": 0, "versions": {"feedback": hms.storage.version(hms.feedback_file) + 1},
+                    "events": [{"event": "feedback_posted", "table": "feedback", "kind": "insert", "key": None,
+                                "row": {"name": "Ghost"}}]}
+        with open(os.path.join(hms.changes.directory, f"prepared.{0:020d}.1.json"), "w") as f:
+            json.dump(prepared, f)
+        with contextlib.redirect_stdout(io.StringIO()):
+            hms.post_feedback("Jack", 100000001, 9, "Nice stay")
+        self.assertEqual([event["row"]["name"] for event in hms.change_events()], ["Jack"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import os
+import unittest
+
+import pandas as pd
+
+# support puts the source directory on the path
+from support import data_copy
+from columnar import ColumnTable, write_columns
+
+
+class ColumnarTest(unittest.TestCase):
+    def setUp(self):
+        directory = data_copy()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "reservations.cols")
+
+    def test_lookups_keep_the_type(self):
+        write_columns(pd.DataFrame({"contact": [1, 2, 445], "amount": [1.5, 2.0, 3.0]}), self.path)
+        table = ColumnTable(self.path)
+        self.assertEqual(table.find({"contact": 1.5})["contact"].tolist(), [])
+        self.assertEqual(table.find({"contact": [1.0, "445"]})["contact"].tolist(), [1, 445])
+        self.assertEqual(table.find({"contact": "Ryan"})["contact"].tolist(), [])
+        self.assertEqual(table.find({"amount": "1.5"})["contact"].tolist(), [1])
+
+    def test_previous_generation_kept_until_the_next_save(self):
+        write_columns(pd.DataFrame({"contact": [1, 2]}), self.path)
+        opened = ColumnTable(self.path)
+        write_columns(pd.DataFrame({"contact": [3]}), self.path)
+        # the table opened before the save still reads its rows
+        self.assertEqual(opened.column("contact").tolist(), [1, 2])
+        self.assertEqual(ColumnTable(self.path).column("contact").tolist(), [3])
+        write_columns(pd.DataFrame({"contact": [4]}), self.path)
+        self.assertEqual(sorted(name for name in os.listdir(self.path) if name.startswith("g")),
+                         ["g000002", "g000003"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import contextlib
+import io
+import unittest
+from datetime import date
+
+from support import data_copy, open_hms
+
+TODAY = int(date.today().strftime("%Y%m%d"))
+
+
+class FeedbackIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = data_copy()
+        self.addCleanup(self.directory.cleanup)
+        self.hms = open_hms(self.directory.name)
+        # the index is made first, then followed
+        self.hms.feedback_index
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.hms.post_feedback("Ryan", 445, 3, "Noisy room, the noise of the street all night")
+            self.hms.post_feedback("Jack", 100000001, 4, "Noisier than last time")
+            self.hms.post_feedback("Kai", 100000002, 9, "Quiet night, perfect")
+
+    def names(self, found):
+        return sorted(found["name"].tolist())
+
+    def test_postings(self):
+        self.assertEqual(self.names(self.hms.search_feedback("noise")), ["Ryan"])
+        self.assertEqual(self.names(self.hms.search_feedback("nois*")), ["Jack", "Ryan"])
+        self.assertEqual(self.names(self.hms.search_feedback("NIGHT")), ["Kai", "Ryan"])
+        # all the words
+        self.assertEqual(self.names(self.hms.search_feedback("nois* night")), ["Ryan"])
+        self.assertEqual(self.names(self.hms.search_feedback("perf*")), ["Kai", "running2"])
+        self.assertTrue(self.hms.search_feedback("breakfast").empty)
+
+    def test_filters(self):
+        self.assertEqual(self.names(self.hms.search_feedback("nois*", member=True)), ["Jack"])
+        self.assertEqual(self.names(self.hms.search_feedback("nois*", member=False)), ["Ryan"])
+        self.assertEqual(self.names(self.hms.search_feedback(max_rate=3, start=TODAY, end=TODAY)), ["Ryan"])
+        self.assertEqual(self.names(self.hms.search_feedback(min_rate=9, start=TODAY)), ["Kai"])
+        # the newest first
+        self.assertEqual(self.hms.search_feedback("nois*")["name"].tolist(), ["Jack", "Ryan"])
+        self.assertEqual(self.hms.search_feedback(limit=1)["name"].tolist(), ["Kai"])
+
+    def test_ratings_after_updates(self):
+        members = self.hms.feedback_ratings(TODAY, TODAY, member=True)
+        self.assertEqual((members["count"], members["average"]), (2, 6.5))
+        self.assertEqual(self.hms.feedback_ratings(TODAY, TODAY, member=False)["count"], 1)
+        # Ryan's rates move to the members
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.hms.register_to_member("Ryan", 445)
+        members = self.hms.feedback_ratings(TODAY, TODAY, member=True)
+        self.assertEqual((members["count"], members["average"]), (3, 5.33))
+        self.assertEqual(members["histogram"][3], 1)
+        self.assertEqual(self.hms.feedback_ratings(TODAY, TODAY, member=False)["count"], 0)
+        self.assertEqual(self.names(self.hms.search_feedback("nois*", member=True)), ["Jack", "Ryan"])
+        self.assertEqual(self.hms.feedback_ratings(name="Jack", contact=100000001), {"count": 2, "average": 2.5})
+        # the same as the index made again from the tables
+        rebuilt = open_hms(self.directory.name)
+        for member in (None, True, False):
+            self.assertEqual(rebuilt.feedback_ratings(member=member), self.hms.feedback_ratings(member=member))
+        self.assertEqual(self.names(rebuilt.search_feedback("nois*", member=True)), ["Jack", "Ryan"])
+
+
+if __name__ == "__main__":
+    unittest.main()
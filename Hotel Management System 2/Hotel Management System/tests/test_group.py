@@ -0,0 +1,65 @@
+import contextlib
+import io
+import unittest
+from datetime import date, timedelta
+
+# support puts the source directory on the path
+from support import data_copy, open_hms
+from group import HotelGroup
+
+FUTURE = int((date.today() + timedelta(days=20)).strftime("%Y%m%d"))
+
+
+class GroupTest(unittest.TestCase):
+    def setUp(self):
+        # two properties from the sample data, the second with one more booking and one more stay of Jack
+        self.directories = {"north": data_copy(), "south": data_copy()}
+        for directory in self.directories.values():
+            self.addCleanup(directory.cleanup)
+        south = open_hms(self.directories["south"].name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            south.reserve("Jack", 100000001, "SingleRoom", FUTURE, 2)
+            south.request_housekeeping("Jack", 100000001, 10, "L444")
+        self.group = HotelGroup({name: directory.name for name, directory in self.directories.items()}, workers=2)
+        self.addCleanup(self.group.close)
+
+    def hotels(self):
+        # every property opened by itself
+        return {name: open_hms(directory.name) for name, directory in self.directories.items()}
+
+    def test_load_in_processes(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.group.load(processes=True)
+        for name, hms in self.hotels().items():
+            for table in ("rooms", "guests", "reservations"):
+                self.assertTrue(getattr(self.group[name], table).equals(getattr(hms, table)), (name, table))
+            self.assertEqual(self.group[name].reservation_index, hms.reservation_index)
+
+    def test_availability(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            table = self.group.availability("SingleRoom", FUTURE, 2)
+        expected = {name: hms.availability("SingleRoom", FUTURE, 2) for name, hms in self.hotels().items()}
+        self.assertEqual(dict(zip(table["Property"], table["Rooms"])), expected)
+        self.assertEqual(expected["north"] - expected["south"], 1)
+        # the most free first
+        self.assertEqual(table["Property"].tolist(), ["north", "south"])
+
+    def test_guest_stays(self):
+        stays = self.group.guest_stays("Jack", 100000001)
+        for name, hms in self.hotels().items():
+            orders = hms.reservation_history(guest_name="Jack", contact=100000001)
+            self.assertEqual((stays["property"] == name).sum(), len(orders))
+        self.assertEqual(stays.columns[0], "property")
+
+    def test_housekeeping_load(self):
+        load = self.group.housekeeping_load().set_index("Property")
+        for name, hms in self.hotels().items():
+            self.assertEqual(load.loc[name, "Requests"], len(hms.housekeeping_plan.requests))
+            self.assertEqual(load.loc[name, "Minutes"], int(hms.housekeeping_plan.used.sum()))
+        for column in ("Requests", "Defaults", "Unscheduled", "Minutes"):
+            self.assertEqual(load.loc["All", column], load.loc[["north", "south"], column].sum())
+        self.assertEqual(load.loc["south", "Requests"], load.loc["north", "Requests"] + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import contextlib
+import io
+import unittest
+
+# support puts the source directory on the path
+from support import data_copy, open_hms
+from HMS import Guest
+
+
+class GuestSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = data_copy()
+        self.addCleanup(self.directory.cleanup)
+        self.hms = open_hms(self.directory.name)
+
+    def names(self, guests):
+        return sorted(guests["name"].tolist())
+
+    def test_name_prefix(self):
+        self.assertEqual(self.names(self.hms.search_guests("jac")), ["Jack"])
+        # any word of the name, whatever the case and the spaces
+        self.assertEqual(self.names(self.hms.search_guests("  WEN")), ["Wang Wen"])
+        self.assertEqual(self.names(self.hms.search_guests("run")), ["Running", "running2"])
+        self.assertEqual(len(self.hms.search_guests("fr", limit=2)), 2)
+        self.assertTrue(self.hms.search_guests("nobody").empty)
+
+    def test_contact_prefix(self):
+        self.assertEqual(self.names(self.hms.search_guests(contact="1000000")), ["Jack", "Kai"])
+        self.assertEqual(self.names(self.hms.search_guests("fra", "139")), ["frank"])
+        self.assertEqual(self.hms.search_guests("fra", "139")["contact"].tolist(), [13955555555])
+
+    def test_same_phone(self):
+        # with the country code and the separators
+        self.assertEqual(self.names(self.hms.guests_with_phone("+86 100-000-001")), ["Jack"])
+        self.assertEqual(self.names(self.hms.guests_with_phone(445)), ["Ryan"])
+
+    def test_history(self):
+        found = self.hms.search_guests("jack", history=True)
+        self.assertEqual(found["reservations"].tolist(), [2])
+        self.assertEqual(found["nights"].tolist(), [4])
+
+    def test_new_and_changed_guests(self):
+        self.hms.search_guests("jac")
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.hms.add_guest(Guest("jack", "86100000001"))
+            self.hms.add_guest(Guest("Jacqueline Moreau", 100000009))
+            self.hms.register_to_member("Jacqueline Moreau", 100000009)
+        self.assertEqual(self.names(self.hms.search_guests("jac")), ["Jack", "Jacqueline Moreau", "jack"])
+        self.assertEqual(self.names(self.hms.search_guests("mor")), ["Jacqueline Moreau"])
+        self.assertEqual(self.names(self.hms.guests_with_phone(100000001)), ["Jack", "jack"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            pairs = self.hms.duplicate_guests()
+        self.assertIn(("Jack", "jack", "same phone"),
+                      list(zip(pairs["first_name"], pairs["second_name"], pairs["reason"])))
+        # the same as the indexes made again from the table
+        rebuilt = open_hms(self.directory.name)
+        self.assertEqual(self.names(rebuilt.search_guests("jac")), ["Jack", "Jacqueline Moreau", "jack"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import contextlib
+import io
+import unittest
+
+import pandas as pd
+
+# support puts the source directory on the path
+from support import data_copy, open_hms
+from housekeeping import HousekeepingPlan
+
+ROOMS = pd.DataFrame({"Room Number": ["S1", "S2", "L1", "L2"],
+                      "Room Type": ["SingleRoom", "SingleRoom", "LuxuryRoom", "LuxuryRoom"],
+                      "Status": ["Available", "Available", "Occupied", "Occupied"]})
+NO_REQUESTS = pd.DataFrame({"Room": [], "Schedule Time": []})
+
+
+class HousekeepingPlanTest(unittest.TestCase):
+    def test_staff_capacity(self):
+        # one cleaner: 60 minutes an hour, a LuxuryRoom takes them all
+        plan = HousekeepingPlan.from_tables("25-03-01", ROOMS, NO_REQUESTS, staff=1)
+        self.assertTrue(plan.request("L1", 15))
+        self.assertFalse(plan.request("L2", 15))
+        self.assertEqual(plan.next_free_hour("L2", 15), 16)
+        self.assertNotIn(15, plan.free_hours("L2"))
+        self.assertTrue(plan.request("L2", 16))
+
+    def test_defaults_move_for_requests(self):
+        # the two available SingleRooms are cleaned at 09:00 by default, a guest asking for 09:00 moves one
+        plan = HousekeepingPlan.from_tables("25-03-01", ROOMS, NO_REQUESTS, staff=1)
+        self.assertEqual(plan.defaults, {"S1": 9, "S2": 9})
+        self.assertTrue(plan.request("L1", 9))
+        self.assertEqual(sorted(plan.defaults.values()), [10, 10])
+        self.assertEqual(int(plan.used[9]), 60)
+
+    def test_room_status_changes(self):
+        plan = HousekeepingPlan.from_tables("25-03-01", ROOMS, NO_REQUESTS, staff=1)
+        plan.set_room("L1", "LuxuryRoom", "Available")
+        self.assertEqual(plan.defaults["L1"], 7)
+        plan.set_room("L2", "LuxuryRoom", "Available")
+        plan.set_room("L3", "LuxuryRoom", "Available")
+        # 07:00 and 08:00 are full, the third LuxuryRoom waits for time left
+        self.assertIsNone(plan.defaults["L3"])
+        self.assertEqual(plan.table()["Schedule Time"].iloc[-1], "Unscheduled")
+        plan.set_room("L1", "LuxuryRoom", "Occupied")
+        self.assertEqual(plan.defaults["L3"], 7)
+
+    def test_accepted_requests_keep_their_hour(self):
+        requests = pd.DataFrame({"Room": ["L1", "L2"], "Schedule Time": ["15:00-16:00", "15:00-16:00"]})
+        plan = HousekeepingPlan.from_tables("25-03-01", ROOMS, requests, staff=1)
+        self.assertEqual(plan.requests, [("L1", 15), ("L2", 15)])
+        self.assertEqual(plan.free(15), -60)
+
+
+class HousekeepingRequestTest(unittest.TestCase):
+    def test_fully_booked_hour(self):
+        directory = data_copy()
+        self.addCleanup(directory.cleanup)
+        hms = open_hms(directory.name)
+        hms.set_housekeeping_staff(1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Jack is in L333 and L444
+            self.assertTrue(hms.request_housekeeping("Jack", 100000001, 15, "L333")["ok"])
+            refused = hms.request_housekeeping("Jack", 100000001, 15, "L444")
+        self.assertFalse(refused["ok"])
+        self.assertEqual(refused["next_free_hour"], 16)
+        schedule = open_hms(directory.name).housekeeping_schedule
+        self.assertEqual(schedule["Room"].tolist()[-1], "L333")
+        self.assertNotIn("L444", schedule["Room"].tolist()[3:])
+
+
+if __name__ == "__main__":
+    unittest.main()
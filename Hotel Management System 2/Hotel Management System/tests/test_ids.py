@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+# support puts the source directory on the path
+from support import HERE
+from storage import ID_SEQUENCE_DIGITS, CsvStorage, SqliteStorage
+
+# another process asks for blocks of ids and prints them
+ALLOCATOR = textwrap.dedent("""
+    import json
+    import sys
+    sys.path.insert(0, sys.argv[1])
+    from storage import CsvStorage, SqliteStorage
+
+    storage = SqliteStorage(sys.argv[3]) if sys.argv[3] != "-" else CsvStorage()
+    ids = []
+    for block in range(int(sys.argv[4])):
+        ids += storage.allocate_ids(sys.argv[2], block % 3 + 1)
+    print(json.dumps(ids))
+""")
+
+
+class IdAllocationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.file_path = os.path.join(self.directory.name, "reservations.csv")
+
+    def allocate(self, database = None, processes = 4, blocks = 300):
+        workers = [subprocess.Popen([sys.executable, "-c", ALLOCATOR, HERE, self.file_path, database or "-",
+                                     str(blocks)], stdout=subprocess.PIPE) for process in range(processes)]
+        results = []
+        for worker in workers:
+            output, _ = worker.communicate()
+            self.assertEqual(worker.returncode, 0)
+            results.append(json.loads(output))
+        return results
+
+    def check_ids(self, results):
+        ids = [reserve_id for result in results for reserve_id in result]
+        self.assertEqual(len(ids), len(set(ids)))
+        for result in results:
+            # every process gets ids growing with time
+            self.assertEqual(result, sorted(result))
+        # the creation second followed by the sequence, longer than the old 12 digit ids
+        self.assertTrue(all(len(str(reserve_id)) == 12 + ID_SEQUENCE_DIGITS for reserve_id in ids))
+
+    def test_csv_processes(self):
+        results = self.allocate()
+        self.check_ids(results)
+        # the next id is after all of them
+        self.assertGreater(CsvStorage().allocate_ids(self.file_path)[0], max(map(max, results)))
+
+    def test_sqlite_processes(self):
+        database = os.path.join(self.directory.name, "hotel.db")
+        results = self.allocate(database)
+        self.check_ids(results)
+        self.assertGreater(SqliteStorage(database).allocate_ids(self.file_path)[0], max(map(max, results)))
+
+    def test_ahead_of_the_clock(self):
+        # the last id is ahead of the clock (more ids than the sequence holds were asked for in a second)
+        with open(CsvStorage().ids_path(self.file_path), "w") as f:
+            f.write("991231235959" + "9" * ID_SEQUENCE_DIGITS)
+        block = CsvStorage().allocate_ids(self.file_path, 3)
+        self.assertEqual(block, list(range(block[0], block[0] + 3)))
+        self.assertGreater(block[0], int("991231235959" + "9" * ID_SEQUENCE_DIGITS))
+
+
+if __name__ == "__main__":
+    unittest.main()
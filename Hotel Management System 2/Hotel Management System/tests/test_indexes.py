@@ -0,0 +1,40 @@
+import contextlib
+import io
+import unittest
+
+from support import data_copy, open_hms
+
+
+class IndexesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = data_copy()
+        self.addCleanup(self.directory.cleanup)
+        self.hms = open_hms(self.directory.name)
+
+    def test_in_sync(self):
+        result = self.hms.check_indexes()
+        self.assertTrue(result["ok"])
+        self.assertEqual(result["mismatches"], [])
+
+    def test_broken_entries_found_and_rebuilt(self):
+        good = {"room_index": dict(self.hms.room_index), "reservation_index": dict(self.hms.reservation_index)}
+        self.hms.room_index["S101"] = self.hms.room_index["S102"]
+        del self.hms.reservation_index["241223163121"]
+        self.hms.reservation_index["999"] = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            found = self.hms.check_indexes(repair=False)
+        self.assertFalse(found["ok"])
+        self.assertFalse(found["repaired"])
+        self.assertEqual(found["mismatches"], [
+            {"index": "room_index", "missing": 0, "extra": 0, "different": 1},
+            {"index": "reservation_index", "missing": 1, "extra": 1, "different": 0}])
+        # still broken until repaired
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertFalse(self.hms.check_indexes()["ok"])
+        self.assertEqual(self.hms.room_index, good["room_index"])
+        self.assertEqual(self.hms.reservation_index, good["reservation_index"])
+        self.assertTrue(self.hms.check_indexes()["ok"])
+
+
+if __name__ == "__main__":
+    unittest.main()
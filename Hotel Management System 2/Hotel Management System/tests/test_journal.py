@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import pandas as pd
+
+# support puts the source directory on the path
+from support import HERE
+from storage import JournalStorage
+
+# another process adds rows one at a time, every few rows the journal is compacted in the background
+WRITER = textwrap.dedent("""
+    import sys
+    import pandas as pd
+    sys.path.insert(0, sys.argv[1])
+    from storage import JournalStorage
+
+    storage = JournalStorage(compact_every=int(sys.argv[3]))
+    file_path = sys.argv[2]
+    data = storage.load(file_path)
+    for row in range(len(data), len(data) + int(sys.argv[4])):
+        data = pd.concat([data, pd.DataFrame({"row": [row], "value": [row * 7]})], ignore_index=True)
+        with storage.lock(file_path):
+            storage.insert(file_path, data, row)
+    for worker in list(storage.compacting.values()):
+        worker.join()
+""")
+
+
+class JournalCompactionTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "table.csv")
+        pd.DataFrame({"row": [0], "value": [0]}).to_csv(self.file_path, index=False)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def writer(self, rows, compact_every = 5):
+        return subprocess.Popen([sys.executable, "-c", WRITER, HERE, self.file_path, str(compact_every), str(rows)])
+
+    def assert_table(self, data):
+        self.assertEqual(data["row"].tolist(), list(range(len(data))))
+        self.assertEqual(data["value"].tolist(), [row * 7 for row in range(len(data))])
+
+    def test_load_while_compacting(self):
+        # every table read while the other process compacts holds all the rows written before, in order
+        storage = JournalStorage(compact_every=0)
+        writer = self.writer(400)
+        seen = 0
+        while writer.poll() is None:
+            data = storage.load(self.file_path)
+            self.assert_table(data)
+            self.assertGreaterEqual(len(data), seen)
+            seen = len(data)
+        self.assertEqual(writer.returncode, 0)
+        data = storage.load(self.file_path)
+        self.assert_table(data)
+        self.assertEqual(len(data), 401)
+
+    def test_compactions_do_not_go_back(self):
+        # two background compactions in one process: the older snapshot never replaces the newer csv file
+        storage = JournalStorage(compact_every=0)
+        data = storage.load(self.file_path)
+        for row in range(1, 201):
+            data = pd.concat([data, pd.DataFrame({"row": [row], "value": [row * 7]})], ignore_index=True)
+            with storage.lock(self.file_path):
+                storage.insert(self.file_path, data, row)
+                if row % 10 == 0:
+                    storage.compact(self.file_path, data, background=True)
+        for worker in list(storage.compacting.values()):
+            worker.join()
+        storage.compact(self.file_path, data, background=True)
+        storage.compacting[self.file_path].join()
+        self.assertFalse(os.path.exists(storage.sealed_path(self.file_path)))
+        self.assert_table(pd.read_csv(self.file_path))
+        self.assertEqual(len(pd.read_csv(self.file_path)), 201)
+        self.assert_table(JournalStorage().load(self.file_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
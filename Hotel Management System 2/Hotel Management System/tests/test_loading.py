@@ -0,0 +1,61 @@
+import os
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+# support puts the source directory on the path
+from support import data_copy, open_hms
+
+
+class LoadingTest(unittest.TestCase):
+    def setUp(self):
+        directory = data_copy()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_tables_loaded_when_used(self):
+        hms = open_hms(self.directory)
+        self.assertEqual(hms.loaded_tables(), [])
+        self.assertNotIn("rooms", vars(hms))
+        len(hms.feedback)
+        self.assertEqual(hms.loaded_tables(), ["feedback"])
+        # an index loads its table, and only it
+        self.assertIn("S101", hms.room_index)
+        self.assertEqual(sorted(hms.loaded_tables()), ["feedback", "rooms"])
+        self.assertNotIn("reservations", vars(hms))
+
+    def test_cache_used_until_the_file_changes(self):
+        path = os.path.join(self.directory, "rooms.csv")
+        hms = open_hms(self.directory, cache=True)
+        self.assertEqual(hms.rooms.loc[hms.room_index["S101"], "Status"], "Available")
+        self.assertTrue(os.path.exists(os.path.join(self.directory, ".hms_cache", "rooms.csv.pkl")))
+
+        with mock.patch("pandas.read_csv", wraps=pd.read_csv) as read_csv:
+            hms = open_hms(self.directory, cache=True)
+            len(hms.rooms)
+        read_csv.assert_not_called()
+
+        # the same size, a new modified time
+        with open(path) as f:
+            text = f.read()
+        with open(path, "w") as f:
+            f.write(text.replace("S101,SingleRoom,Available", "S101,SingleRoom,Availabl_"))
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(os.path.getsize(path), stat.st_size)
+        with mock.patch("pandas.read_csv", wraps=pd.read_csv) as read_csv:
+            hms = open_hms(self.directory, cache=True)
+            status = hms.rooms.loc[hms.room_index["S101"], "Status"]
+        read_csv.assert_called_once()
+        self.assertEqual(status, "Availabl_")
+
+        # a new size
+        with open(path, "w") as f:
+            f.write(text.replace("S101,SingleRoom,Available", "S101,SingleRoom,Occupied"))
+        hms = open_hms(self.directory, cache=True)
+        self.assertEqual(hms.rooms.loc[hms.room_index["S101"], "Status"], "Occupied")
+
+
+if __name__ == "__main__":
+    unittest.main()
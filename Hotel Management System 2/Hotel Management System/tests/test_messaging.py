@@ -0,0 +1,56 @@
+import contextlib
+import io
+import json
+import os
+import unittest
+
+# support puts the source directory on the path
+from support import data_copy, open_hms
+from HMS import Guest
+from messaging import Campaign, FileSink
+
+
+class MessagingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = data_copy()
+        self.addCleanup(self.directory.cleanup)
+        self.hms = open_hms(self.directory.name)
+        self.status_dir = os.path.join(self.directory.name, "campaigns")
+
+    def deliver(self, obj, msg_type, **options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.hms.message_delivery(obj, msg_type, **options)
+
+    def test_braces_in_the_message_type(self):
+        # the campaign made by message_delivery keeps its status in ./campaigns
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.directory.name)
+        sink = FileSink(os.path.join(self.status_dir, "outbox.jsonl"))
+        result = self.deliver("member", "{sale}", sink=sink, campaign="braces")
+        self.assertTrue(result["ok"])
+        with open(sink.path) as f:
+            self.assertIn("we have a new {sale} for you!", json.loads(f.readline())["text"])
+
+    def test_a_guest_the_template_does_not_fit_fails_alone(self):
+        sink = FileSink(os.path.join(self.status_dir, "outbox.jsonl"))
+        campaign = Campaign("broken", "Dear {name}, your room is {room}", sink, self.status_dir)
+        result = self.deliver("member", "Sale", campaign=campaign)
+        self.assertFalse(result["ok"])
+        self.assertEqual(result["failed"], int(self.hms.guests["membership"].sum()))
+        self.assertFalse(os.path.exists(sink.path))
+
+    def test_sent_guests_are_skipped_by_their_key(self):
+        campaign = Campaign("event", "Dear {name}, see you soon", status_dir=self.status_dir)
+        members = int(self.hms.guests["membership"].sum())
+        self.assertEqual(self.deliver("member", "Event", campaign=campaign)["sent"], members)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.hms.add_guest(Guest("Zoe", 100000009))
+            self.hms.register_to_member("Zoe", 100000009)
+        # the rows of the guests are read in another order, only the new member is sent to
+        reordered = self.hms.guests.iloc[::-1]
+        counts = campaign.run([reordered], {"membership": True})
+        self.assertEqual(counts, {"sent": 1, "failed": 0, "skipped": members})
+
+
+if __name__ == "__main__":
+    unittest.main()
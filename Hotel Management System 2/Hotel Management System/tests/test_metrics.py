@@ -0,0 +1,85 @@
+import contextlib
+import io
+import os
+import threading
+import unittest
+
+# support puts the source directory on the path
+from support import data_copy, open_hms
+from group import HotelGroup
+from metrics import REGISTRY
+
+
+class MetricsTest(unittest.TestCase):
+    def test_only_the_operations_are_measured(self):
+        directory = data_copy()
+        self.addCleanup(directory.cleanup)
+        hms = open_hms(directory.name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            hms.post_feedback("Jack", 100000001, 8, "Quiet room")
+            hms.search_guests("jac")
+        operations = hms.stats()["operations"]
+        self.assertIn("post_feedback", operations)
+        self.assertIn("search_guests", operations)
+        for helper in ("insert_rows", "index_rows", "find", "locked", "refresh"):
+            self.assertNotIn(helper, operations)
+
+    def test_tables_of_every_property(self):
+        directories = [data_copy(), data_copy()]
+        for directory in directories:
+            self.addCleanup(directory.cleanup)
+        group = HotelGroup({"north": directories[0].name, "south": directories[1].name}, workers=2)
+        self.addCleanup(group.close)
+        # the registry is the one of the process, other tests may have counted properties of the same names
+        before = REGISTRY.snapshot()["tables"]
+        with contextlib.redirect_stdout(io.StringIO()):
+            group.load(["rooms"])
+        tables = REGISTRY.snapshot()["tables"]
+        for name in ("north", "south"):
+            loaded = before.get(f"{name}/rooms", {}).get("rows_loaded", 0)
+            self.assertEqual(tables[f"{name}/rooms"]["rows_loaded"] - loaded, len(group[name].rooms))
+            self.assertEqual(tables[f"{name}/rooms"]["property"], name)
+        self.assertIn('property="north",table="rooms"', REGISTRY.prometheus())
+
+
+    def test_metrics_file_not_written(self):
+        directory = data_copy()
+        self.addCleanup(directory.cleanup)
+        hms = open_hms(directory.name)
+        settings = (REGISTRY.metrics_file, REGISTRY.metrics_interval)
+        self.addCleanup(setattr, REGISTRY, "metrics_file", settings[0])
+        self.addCleanup(setattr, REGISTRY, "metrics_interval", settings[1])
+        REGISTRY.metrics_file = os.path.join(directory.name, "missing", "hms.prom")
+        REGISTRY.metrics_interval = 0
+        errors = io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(errors):
+            result = hms.post_feedback("Jack", 100000001, 8, "Quiet room")
+        self.assertTrue(result["ok"])
+        self.assertIn("Cannot write the metrics file", errors.getvalue())
+
+    def test_export_from_many_threads(self):
+        directory = data_copy()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "hms.prom")
+        errors = []
+
+        def export():
+            try:
+                for n in range(20):
+                    REGISTRY.export(path)
+            except OSError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=export) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        with open(path) as f:
+            self.assertIn("# TYPE hms_operation_calls_total counter", f.read())
+        self.assertEqual([name for name in os.listdir(directory.name) if name.endswith(".tmp")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
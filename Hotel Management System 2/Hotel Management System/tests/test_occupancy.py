@@ -0,0 +1,67 @@
+import contextlib
+import io
+import unittest
+from datetime import date, timedelta
+
+# support puts the source directory on the path
+from support import data_copy, open_hms
+from occupancy import OccupancyCalendar
+
+
+def night(days):
+    # the date days from today, YYYYMMDD
+    return int((date.today() + timedelta(days=days)).strftime("%Y%m%d"))
+
+
+class OccupancyCalendarTest(unittest.TestCase):
+    def test_range_availability(self):
+        calendar = OccupancyCalendar({"SingleRoom": 2})
+        calendar.book(1, "SingleRoom", night(10), 3)
+        calendar.book(2, "SingleRoom", night(11), 1)
+        self.assertEqual(calendar.availability("SingleRoom", night(9), 1), 2)
+        self.assertEqual(calendar.availability("SingleRoom", night(10), 1), 1)
+        # the second night of the range is full
+        self.assertEqual(calendar.availability("SingleRoom", night(9), 3), 0)
+        self.assertEqual(calendar.availability("SingleRoom", night(13), 5), 2)
+        self.assertEqual(calendar.availability("DoubleRoom", night(10), 1), 0)
+        # a stay before the first night of the calendar makes it grow in front
+        calendar.book(3, "SingleRoom", night(-400), 2)
+        self.assertEqual(calendar.availability("SingleRoom", night(-399), 1), 1)
+        calendar.release(2)
+        self.assertEqual(calendar.availability("SingleRoom", night(9), 3), 1)
+
+    def test_check_out_frees_the_nights_left(self):
+        calendar = OccupancyCalendar({"SingleRoom": 1})
+        calendar.book(1, "SingleRoom", night(0), 5)
+        calendar.check_out(1, night(2))
+        self.assertEqual(calendar.availability("SingleRoom", night(0), 2), 0)
+        self.assertEqual(calendar.availability("SingleRoom", night(2), 3), 1)
+
+
+class OverbookingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = data_copy()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_refuse_overbooked_reservation(self):
+        hms = open_hms(self.directory.name)
+        rooms = len(hms.find("rooms", **{"Room Type": "SingleRoom"}))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for guest in range(rooms):
+                self.assertTrue(hms.reserve(f"Guest{guest}", 100 + guest, "SingleRoom", night(30), 3)["ok"])
+            self.assertEqual(hms.availability("SingleRoom", night(31), 1), 0)
+            refused = hms.reserve("Late", 99, "SingleRoom", night(32), 2)
+            self.assertFalse(refused["ok"])
+            # the nights after the stays and the other room types are still free
+            self.assertTrue(hms.reserve("Late", 99, "SingleRoom", night(33), 2)["ok"])
+            self.assertTrue(hms.reserve("Late", 99, "DoubleRoom", night(32), 2)["ok"])
+
+        # the calendar made again from the saved tables agrees
+        system = open_hms(self.directory.name)
+        self.assertEqual(system.availability("SingleRoom", night(30), 3), 0)
+        self.assertEqual(system.availability("SingleRoom", night(33), 2), rooms - 1)
+        self.assertEqual(len(system.reservations), len(hms.reservations))
+
+
+if __name__ == "__main__":
+    unittest.main()
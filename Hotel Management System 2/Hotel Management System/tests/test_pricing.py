@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+# support puts the source directory on the path
+from support import data_copy, open_hms
+from pricing import RateTable
+
+
+class RateTableTest(unittest.TestCase):
+    def test_seasons_and_weekends(self):
+        rates = RateTable()
+        rates.set_rate(None, 300, 20251220, 20260105, weekend_rate=350)
+        rates.set_rate("LuxuryRoom", 800, 20251224, 20251225)
+        # 20250103 is a friday: thursday 150 + friday 150 + saturday 150, no season
+        self.assertEqual(rates.quote("SingleRoom", 20250102, 3), 450)
+        # friday 19th base, then saturday 20th in season (weekend), sunday 21st in season
+        self.assertEqual(rates.quote("SingleRoom", 20251219, 3), 150 + 350 + 300)
+        # the later LuxuryRoom season is over the one for all the types
+        self.assertEqual(rates.quote("LuxuryRoom", 20251223, 3), 300 + 800 + 800)
+        self.assertIsNone(rates.quote("FamilyRoom", 20251223, 3))
+        self.assertIsNone(rates.quote("SingleRoom", 20251399, 3))
+
+    def test_quote_many_is_quote(self):
+        rates = RateTable(member_discount=0.1)
+        rates.set_rate(None, 300, 20251220, 20260105, weekend_rate=350)
+        orders = pd.DataFrame({"room_type": ["SingleRoom", "LuxuryRoom", "DoubleRoom", "FamilyRoom", "SingleRoom"],
+                               "reserved_date": [20251218, 20251230, 20240101, 20251230, "bad"],
+                               "day": [5, 10, 1, 2, 1],
+                               "member": [False, True, True, False, False]})
+        amounts = rates.quote_many(orders["room_type"], orders["reserved_date"], orders["day"], orders["member"])
+        for amount, order in zip(amounts, orders.to_dict("records")):
+            expected = rates.quote(order["room_type"], order["reserved_date"], order["day"], order["member"])
+            if expected is None:
+                self.assertTrue(amount != amount)
+            else:
+                self.assertAlmostEqual(amount, expected)
+
+    def test_no_rates_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            rates = RateTable.from_csv(os.path.join(directory, "rates.csv"))
+        self.assertEqual(rates.quote("DoubleRoom", 20250102, 2), 500)
+
+
+class MemberPricingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = data_copy()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_members_pay_the_rate_by_default(self):
+        # as before the rate tables, a member pays the same as any guest unless a member_discount is given
+        hms = open_hms(self.directory.name)
+        self.assertEqual(hms.quote("DoubleRoom", 20250301, 2, "Jack", 100000001), 500)
+        self.assertEqual(hms.quote("DoubleRoom", 20250301, 2, "Ryan", 445), 500)
+
+    def test_member_discount(self):
+        hms = open_hms(self.directory.name, member_discount=0.1)
+        self.assertEqual(hms.quote("DoubleRoom", 20250301, 2, "Jack", 100000001), 450)
+        self.assertEqual(hms.quote("DoubleRoom", 20250301, 2, "Ryan", 445), 500)
+        self.assertEqual(hms.quote("DoubleRoom", 20250301, 2), 500)
+        # the bulk repricing gives every order the price quote gives it
+        amounts = hms.reprice()
+        for index, order in hms.reservations.iterrows():
+            expected = hms.quote(order["room_type"], order["reserved_date"], order["day"], order["guest_name"],
+                                 order["contact"])
+            if expected is None:
+                self.assertTrue(pd.isna(amounts[index]))
+            else:
+                self.assertAlmostEqual(amounts[index], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
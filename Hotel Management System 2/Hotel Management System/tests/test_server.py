@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+import pandas as pd
+
+# support puts the source directory on the path
+from support import HERE, data_copy, open_hms
+import server
+from server import HotelServer
+
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = data_copy()
+        self.server = HotelServer(open_hms(self.directory.name), reader=open_hms(self.directory.name))
+        ready = threading.Event()
+
+        def serve():
+            self.loop = asyncio.new_event_loop()
+
+            def started(server):
+                self.port = server.sockets[0].getsockname()[1]
+                ready.set()
+
+            try:
+                self.loop.run_until_complete(self.server.serve(port=0, ready=started))
+            except asyncio.CancelledError:
+                pass
+
+        self.thread = threading.Thread(target=serve, daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def tearDown(self):
+        for task in asyncio.all_tasks(self.loop):
+            self.loop.call_soon_threadsafe(task.cancel)
+        self.thread.join(5)
+        self.directory.cleanup()
+
+    def post(self, name, command):
+        request = urllib.request.Request(f"http://127.0.0.1:{self.port}/{name}", json.dumps(command).encode(),
+                                         method="POST")
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def get(self, path):
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/{path}") as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as error:
+            return error.code, json.loads(error.read())
+
+    def test_server_and_batch_keep_both(self):
+        # a batch process writes the same table while the server takes requests
+        before = len(pd.read_csv(os.path.join(self.directory.name, "feedback.csv")))
+        path = os.path.join(self.directory.name, "batch.jsonl")
+        with open(path, "w") as f:
+            for n in range(300):
+                f.write(json.dumps({"op": "feedback", "name": "Batch", "contact": 100000000 + n, "rate": 5,
+                                    "comment": f"line {n}"}) + "\n")
+        batch = subprocess.Popen([sys.executable, os.path.join(HERE, "batch.py"), path], cwd=self.directory.name,
+                                 stdout=subprocess.DEVNULL)
+        results = []
+
+        def client(first):
+            for n in range(first, first + 25):
+                results.append(self.post("feedback", {"name": "Server", "contact": 100000000 + n, "rate": 4,
+                                                      "comment": f"request {n}"}))
+
+        clients = [threading.Thread(target=client, args=(first,)) for first in range(0, 100, 25)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        self.assertTrue(all(result["ok"] for result in results))
+        self.assertEqual(batch.wait(), 0)
+        feedback = pd.read_csv(os.path.join(self.directory.name, "feedback.csv"))
+        self.assertEqual(len(feedback), before + 400)
+        self.assertEqual((feedback["name"] == "Server").sum(), 100)
+
+    def test_bad_command_fails_alone(self):
+        result = self.post("feedback", {"name": "Server", "contact": 100000000, "rate": "many", "comment": "x"})
+        self.assertFalse(result["ok"])
+        self.assertTrue(self.post("feedback", {"name": "Server", "contact": 100000000, "rate": 3,
+                                               "comment": "y"})["ok"])
+
+    def test_reads_see_the_saved_tables(self):
+        self.assertEqual(self.get("guests?name=Server")[1]["guests"], [])
+        self.assertTrue(self.post("feedback", {"name": "Server", "contact": 100000000, "rate": 3,
+                                               "comment": "y"})["ok"])
+        status, result = self.get("feedback?words=y&limit=1000")
+        self.assertIn("Server", [row["name"] for row in result["feedback"]])
+        # a group that could not be saved is not seen by the reads
+        flush = self.server.hms.flush
+        self.server.hms.flush = lambda: 1 / 0
+        try:
+            result = self.post("feedback", {"name": "Lost", "contact": 100000000, "rate": 3, "comment": "lost"})
+        finally:
+            self.server.hms.flush = flush
+        self.assertFalse(result["ok"])
+        self.assertIn("ZeroDivisionError", result["message"])
+        self.assertEqual(self.get("feedback?words=lost")[1]["feedback"], [])
+        # the writer goes on
+        self.assertTrue(self.post("feedback", {"name": "Server", "contact": 100000000, "rate": 4,
+                                               "comment": "z"})["ok"])
+
+    def test_command_failing_half_way_changes_nothing(self):
+        # the check in changes the reservation, then fails before the room is Occupied
+        def broken(*args):
+            raise RuntimeError("calendar down")
+
+        self.server.hms.calendar.check_in = broken
+        files = {}
+        for name in sorted(os.listdir(self.directory.name)):
+            with open(os.path.join(self.directory.name, name), "rb") as f:
+                files[name] = f.read()
+        result = self.post("check_in", {"reserve_id": "241222224005"})
+        self.assertFalse(result["ok"])
+        self.assertIn("calendar down", result["message"])
+        for name, data in files.items():
+            with open(os.path.join(self.directory.name, name), "rb") as f:
+                self.assertEqual(f.read(), data, name)
+        self.assertEqual(self.get("reservations?reservation_id=241222224005")[1]["reservations"][0]["is_check-in"],
+                         "un-check-in")
+        # the calendar is made again with the tables, the check in works now
+        self.assertEqual(self.post("check_in", {"reserve_id": "241222224005"})["room_number"], "L555")
+
+    def test_failing_read_answers_an_error(self):
+        server.READS["broken"] = lambda hms: 1 / 0
+        self.addCleanup(server.READS.pop, "broken")
+        status, result = self.get("broken")
+        self.assertEqual(status, 500)
+        self.assertFalse(result["ok"])
+        self.assertEqual(self.get("waitlist")[0], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import contextlib
+import io
+import unittest
+
+from support import BACKENDS, data_copy, open_hms
+
+
+class Broken(Exception):
+    pass
+
+
+class TransactionTest(unittest.TestCase):
+    def failing_check_in(self, backend):
+        # the check in fails after the reservation is changed and before the room is: nothing of it is saved
+        directory = data_copy()
+        self.addCleanup(directory.cleanup)
+        hms = open_hms(directory.name, backend)
+        order = hms.reservations[hms.reservations["is_check-in"] == "un-check-in"].iloc[0]
+        room_type = order["room_type"]
+        available = len(hms.available_rooms[room_type])
+
+        def broken(*args, **kwargs):
+            raise Broken()
+
+        hms.calendar.check_in = broken
+        with contextlib.redirect_stdout(io.StringIO()), self.assertRaises(Broken):
+            hms.check_in_order(order["reservation_id"])
+
+        for system in (hms, open_hms(directory.name, backend)):
+            index = system.reservation_index[str(order["reservation_id"])]
+            self.assertEqual(system.reservations.loc[index, "is_check-in"], "un-check-in")
+            self.assertEqual(system.reservations.loc[index, "room_number"], "Un-Arrange")
+            self.assertEqual(len(system.available_rooms[room_type]), available)
+            self.assertTrue(system.check_indexes()["ok"])
+
+        # the system goes on working after the failure
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(hms.check_in_order(order["reservation_id"])["ok"])
+        system = open_hms(directory.name, backend)
+        index = system.reservation_index[str(order["reservation_id"])]
+        self.assertEqual(system.reservations.loc[index, "is_check-in"], "Checked-in")
+        room = system.reservations.loc[index, "room_number"]
+        self.assertEqual(system.rooms.loc[system.room_index[room], "Status"], "Occupied")
+
+    def test_failing_check_in(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                self.failing_check_in(backend)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import contextlib
+import io
+import unittest
+from datetime import date, timedelta
+
+from support import BACKENDS, data_copy, open_hms
+from waitlist import Waitlist
+
+FUTURE = int((date.today() + timedelta(days=20)).strftime("%Y%m%d"))
+RYAN, RUNNING = 241223163121, 241223174254
+
+
+class WaitlistTest(unittest.TestCase):
+    def full_hotel(self, backend = "csv"):
+        # every LuxuryRoom occupied, Ryan and Running (regular guests) waiting, then Jack (a member)
+        directory = data_copy()
+        self.addCleanup(directory.cleanup)
+        hms = open_hms(directory.name, backend)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for room in hms.available_rooms["LuxuryRoom"].copy():
+                hms.room_status_modify(room)
+            self.assertEqual(hms.check_in_order(RYAN)["position"], 1)
+            self.assertEqual(hms.check_in_order(RUNNING)["position"], 2)
+            jack = hms.reserve("Jack", 100000001, "LuxuryRoom", FUTURE, 2)["reservation_id"]
+            self.assertEqual(hms.check_in_order(jack)["position"], 1)
+            # joining again keeps the place
+            self.assertEqual(hms.check_in_order(RUNNING)["position"], 3)
+        return directory, hms, jack
+
+    def test_members_first(self):
+        directory, hms, jack = self.full_hotel()
+        with contextlib.redirect_stdout(io.StringIO()):
+            table = hms.view_waitlist("LuxuryRoom")
+        self.assertEqual(table["reservation_id"].astype(str).tolist(), [str(jack), str(RYAN), str(RUNNING)])
+        self.assertEqual(table["member"].tolist(), [True, False, False])
+        # Running becomes a member and goes before Ryan, and before Jack who joined later
+        with contextlib.redirect_stdout(io.StringIO()):
+            hms.register_to_member("Running", 111111111)
+        self.assertEqual(hms.waitlist_queue.position(RUNNING), 1)
+        self.assertEqual(hms.waitlist_queue.position(RYAN), 3)
+        self.assertEqual(open_hms(directory.name).waitlist_queue.position(RUNNING), 1)
+
+    def test_earlier_check_in_first(self):
+        # Ryan arrives on 20250105 and Running on 20250201: Ryan goes first though he joined later
+        directory = data_copy()
+        self.addCleanup(directory.cleanup)
+        hms = open_hms(directory.name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for room in hms.available_rooms["LuxuryRoom"].copy():
+                hms.room_status_modify(room)
+            self.assertEqual(hms.check_in_order(RUNNING)["position"], 1)
+            self.assertEqual(hms.check_in_order(RYAN)["position"], 1)
+        self.assertEqual(hms.waitlist_queue.position(RUNNING), 2)
+        self.assertEqual(hms.waitlist_queue.table()["reserved_date"].tolist(), ["20250105", "20250201"])
+        self.assertEqual(open_hms(directory.name).waitlist_queue.position(RYAN), 1)
+
+    def test_orders_taken_out_are_skipped(self):
+        queue = Waitlist()
+        for n in range(200):
+            queue.add(n, "SingleRoom", ("Guest", str(n)), n % 5 == 1, "20250301", f"2025-02-01T00:00:{n:06d}", n)
+        for n in range(200):
+            if n % 4 != 1:
+                queue.remove(n)
+        # the heap was made again without most of the orders taken out
+        self.assertLess(len(queue.heaps["SingleRoom"]), 200)
+        self.assertEqual(queue.count("SingleRoom"), 50)
+        members = list(range(1, 200, 20))
+        self.assertEqual(queue.position(members[0]), 1)
+        self.assertEqual(queue.position(5), len(members) + 1)
+        popped = [queue.pop("SingleRoom")[4] for n in range(len(members) + 2)]
+        self.assertEqual(popped, [str(n) for n in members] + ["5", "9"])
+        self.assertEqual(queue.position(13), 1)
+        self.assertEqual(queue.count("SingleRoom"), 38)
+
+    def assigned_on_check_out(self, backend):
+        directory, hms, jack = self.full_hotel(backend)
+        with contextlib.redirect_stdout(io.StringIO()):
+            assigned = hms.check_out_room("L333")["assigned"]
+            self.assertEqual(assigned["reservation_id"], str(jack))
+            self.assertEqual(assigned["room_number"], "L333")
+            # a room set Available goes to the next one
+            self.assertEqual(hms.room_status_modify("L555")["assigned"]["reservation_id"], str(RYAN))
+            self.assertTrue(hms.cancel_waiting(RUNNING)["ok"])
+            self.assertIsNone(hms.room_status_modify("L777")["assigned"])
+
+        for system in (hms, open_hms(directory.name, backend)):
+            self.assertEqual(len(system.waitlist_queue), 0)
+            rooms = {str(system.reservations.loc[system.reservation_index[str(order)], "room_number"])
+                     for order in (jack, RYAN)}
+            self.assertEqual(rooms, {"L333", "L555"})
+            self.assertEqual(system.rooms.loc[system.room_index["L333"], "Status"], "Occupied")
+            self.assertEqual(system.rooms.loc[system.room_index["L777"], "Status"], "Available")
+            self.assertEqual(system.waitlist["status"].astype(str).tolist(), ["Assigned", "Left", "Assigned"])
+            self.assertTrue(system.check_indexes()["ok"])
+
+    def test_assigned_on_check_out(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                self.assigned_on_check_out(backend)
+
+
+if __name__ == "__main__":
+    unittest.main()
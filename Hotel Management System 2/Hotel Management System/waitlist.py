@@ -0,0 +1,145 @@
+import heapq
+from datetime import date, datetime
+
+from lazy_import import LazyImport
+
+pd = LazyImport("pandas")
+
+# the first part of the priority of an order, the members are served first
+MEMBER, GUEST = 0, 1
+# a heap is made again from its live orders when it holds more orders taken out than this
+STALE_LIMIT = 64
+
+
+def check_in_day(reserved_date, joined):
+    # the check in date of the order as yyyymmdd text, the day it joined when the row does not have one
+    if isinstance(reserved_date, (date, datetime)) and not pd.isna(reserved_date):
+        return reserved_date.strftime("%Y%m%d")
+    text = str(reserved_date).strip()
+    if len(text) == 8 and text.isdigit():
+        return text
+    return str(joined)[:10].replace("-", "")
+
+
+class Waitlist:
+    # the un-check-in orders waiting for a room, one heap per room type ordered by (members first, the check in
+    # date, the time they joined, the row of the waitlist table). an order taken out (assigned, left, a new priority)
+    # stays in its heap and is skipped when it comes to the top, so adding an order, taking it out and popping the
+    # best one are O(log n). the position of an order only looks at the heap of its room type.
+    # kept up to date by index_rows like the indexes, the rows are the index labels of the waitlist table
+    def __init__(self):
+        self.heaps = {}
+        # reservation_id -> its entry in the queue:
+        # (priority, check in date, joined, row, reservation_id, room type, guest key)
+        self.entries = {}
+        # guest key -> the reservation_ids of the guest waiting
+        self.guests = {}
+        # room type -> the orders waiting for it
+        self.counts = {}
+
+    @classmethod
+    def from_tables(cls, waitlist, is_member):
+        # is_member(name, contact): True for the members
+        queue = cls()
+        if waitlist.empty or "status" not in waitlist.columns:
+            return queue
+        queue.add_rows(waitlist, is_member)
+        return queue
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, reserve_id):
+        return str(reserve_id) in self.entries
+
+    def count(self, room_type):
+        # the orders waiting for the room type
+        return self.counts.get(str(room_type), 0)
+
+    def add(self, reserve_id, room_type, key, member, day, joined, row):
+        reserve_id = str(reserve_id)
+        self.remove(reserve_id)
+        entry = (MEMBER if member else GUEST, day, str(joined), row, reserve_id, str(room_type), key)
+        self.entries[reserve_id] = entry
+        self.guests.setdefault(key, set()).add(reserve_id)
+        self.counts[entry[5]] = self.counts.get(entry[5], 0) + 1
+        heapq.heappush(self.heaps.setdefault(entry[5], []), entry)
+
+    def remove(self, reserve_id):
+        entry = self.entries.pop(str(reserve_id), None)
+        if entry is not None:
+            self.counts[entry[5]] -= 1
+            self.compact(entry[5])
+            orders = self.guests.get(entry[6], set())
+            orders.discard(entry[4])
+            if not orders:
+                self.guests.pop(entry[6], None)
+        return entry
+
+    def live(self, entry):
+        return self.entries.get(entry[4]) is entry
+
+    def add_rows(self, rows, is_member, sign = 1):
+        # the Waiting rows of the waitlist table join the queue, sign -1 takes them out
+        if rows is None or rows.empty or "status" not in rows.columns:
+            return
+        days = rows["reserved_date"].tolist() if "reserved_date" in rows.columns else [None] * len(rows)
+        for row, reserve_id, name, contact, room_type, reserved_date, joined, status in zip(
+                rows.index.tolist(), rows["reservation_id"].tolist(), rows["guest_name"].tolist(),
+                rows["contact"].tolist(), rows["room_type"].tolist(), days, rows["joined"].tolist(),
+                rows["status"].tolist()):
+            if sign < 0:
+                self.remove(reserve_id)
+            elif status == "Waiting":
+                key = (str(name).strip(), str(contact).strip())
+                self.add(reserve_id, room_type, key, is_member(name, contact), check_in_day(reserved_date, joined),
+                         joined, row)
+
+    def set_member(self, key, member):
+        # a guest becoming a member (or not) moves up (or down) with all the orders waiting
+        for reserve_id in list(self.guests.get(key, ())):
+            entry = self.entries[reserve_id]
+            if entry[0] != (MEMBER if member else GUEST):
+                self.add(reserve_id, entry[5], key, member, entry[1], entry[2], entry[3])
+
+    def pop(self, room_type):
+        # take out the first order waiting for the room type, None when there is none
+        heap = self.heaps.get(str(room_type))
+        while heap:
+            entry = heapq.heappop(heap)
+            if self.live(entry):
+                self.remove(entry[4])
+                return entry
+        return None
+
+    def compact(self, room_type):
+        # the heap without the orders taken out, once they are more than the live ones
+        stale = len(self.heaps.get(room_type, ())) - self.counts.get(room_type, 0)
+        if stale > max(STALE_LIMIT, self.counts.get(room_type, 0)):
+            heap = [entry for entry in self.heaps[room_type] if self.live(entry)]
+            heapq.heapify(heap)
+            self.heaps[room_type] = heap
+
+    def waiting(self, room_type = None):
+        # the orders waiting (for the room type), in the order they will get a room
+        if room_type is not None:
+            return sorted(entry for entry in self.heaps.get(str(room_type), ()) if self.live(entry))
+        return sorted(self.entries.values())
+
+    def position(self, reserve_id):
+        # the place of the order in the queue of its room type, 1 is the next to get a room. it counts the live
+        # orders before it in the heap of the room type (a heap does not keep its orders sorted)
+        entry = self.entries.get(str(reserve_id))
+        if entry is None:
+            return None
+        return 1 + sum(1 for other in self.heaps[entry[5]] if other < entry and self.live(other))
+
+    def table(self, room_type = None):
+        entries = self.waiting(room_type)
+        table = pd.DataFrame([(entry[4], entry[6][0], entry[6][1], entry[5], entry[0] == MEMBER, entry[1],
+                               entry[2]) for entry in entries],
+                             columns=["reservation_id", "guest_name", "contact", "room_type", "member",
+                                      "reserved_date", "joined"])
+        # the position in the queue of the room type
+        table.insert(0, "position", table.groupby("room_type").cumcount() + 1)
+        return table